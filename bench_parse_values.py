@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark del parseo de fechas e importes de los atributos CFDI
+
+Compara el parseo anterior de fechas (strptime probando cada formato) con
+el camino rápido de fromisoformat, y el parseo de importes a float con el
+parseo exacto a Decimal, sobre un corpus sintético con la mezcla de
+valores que aparece en los XML (incluidos valores mal formados). Antes de
+medir verifica que ambos caminos den el mismo resultado.
+
+Uso:
+    python bench_parse_values.py [--size 50000] [--repeat 5]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime
+sys.path.append(os.path.dirname(__file__))
+
+from src.xml_parser import XMLParser
+
+DATE_FORMATS = ['%Y-%m-%dT%H:%M:%S', '%Y-%m-%dT%H:%M:%S.%f', '%Y-%m-%d']
+
+
+def strptime_date(date_str):
+    """Parseo de fechas anterior a fromisoformat"""
+    if not date_str:
+        return None
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(date_str, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def float_amount(value_str):
+    """Parseo de importes anterior a Decimal"""
+    try:
+        return float(value_str.replace(',', ''))
+    except (ValueError, TypeError, AttributeError):
+        return 0.0
+
+
+def build_corpus(size: int, seed: int = 2024):
+    """Genera fechas e importes con la proporción típica de formatos"""
+    rng = random.Random(seed)
+    dates, amounts = [], []
+    for _ in range(size):
+        moment = datetime(2024, 1, 1, 0, 0, 0).replace(
+            month=rng.randint(1, 12), day=rng.randint(1, 28),
+            hour=rng.randint(0, 23), minute=rng.randint(0, 59), second=rng.randint(0, 59))
+        kind = rng.random()
+        if kind < 0.80:
+            dates.append(moment.strftime('%Y-%m-%dT%H:%M:%S'))
+        elif kind < 0.90:
+            dates.append(moment.strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3])
+        elif kind < 0.97:
+            dates.append(moment.strftime('%Y-%m-%d'))
+        else:
+            dates.append(rng.choice(['', '2024-13-01', '10/05/2024', '2024-05-10T12:30:45Z']))
+
+        value = f"{rng.randint(0, 999999)}.{rng.randint(0, 99):02d}"
+        kind = rng.random()
+        if kind < 0.90:
+            amounts.append(value)
+        elif kind < 0.97:
+            amounts.append(f"{int(value.split('.')[0]):,}.{value.split('.')[1]}")
+        else:
+            amounts.append(rng.choice(['', 'N/A', '-']))
+    return dates, amounts
+
+
+def measure(func, values, repeat: int) -> float:
+    """Mejor tiempo en ns por valor"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for value in values:
+            func(value)
+        best = min(best, time.perf_counter() - start)
+    return best * 1e9 / len(values)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark del parseo de fechas e importes')
+    parser.add_argument('--size', type=int, default=50000, help='Valores por corpus (default 50000)')
+    parser.add_argument('--repeat', type=int, default=5, help='Repeticiones por caso (default 5)')
+    args = parser.parse_args()
+
+    xml_parser = XMLParser()
+    dates, amounts = build_corpus(args.size)
+
+    assert all(strptime_date(value) == xml_parser._parse_date(value) for value in dates)
+    assert all(float_amount(value) == float(xml_parser._parse_amount(value)) for value in amounts)
+
+    print(f"BENCHMARK DE FECHAS E IMPORTES ({args.size} valores)")
+    print("=" * 70)
+    for name, before, after, values in (
+        ('Fechas', strptime_date, xml_parser._parse_date, dates),
+        ('Importes', float_amount, xml_parser._parse_amount, amounts),
+    ):
+        before_ns = measure(before, values, args.repeat)
+        after_ns = measure(after, values, args.repeat)
+        print(f"{name:<10} anterior {before_ns:>8.0f} ns   nuevo {after_ns:>8.0f} ns   "
+              f"({before_ns / after_ns:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark del parseo de facturas CFDI con addendas de varios MB
+
+Compara el parseo anterior (decodificar los bytes a str y parsear el str)
+con el parseo directo de los bytes, y mide los backends disponibles.
+La memoria pico se mide con tracemalloc, que solo ve las asignaciones de
+Python: la copia a str aparece completa; los árboles de libxml2 (lxml) no.
+
+Uso:
+    python bench_xml_parser.py [--mb 8] [--repeat 3]
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+sys.path.append(os.path.dirname(__file__))
+
+from src.xml_parser import create_xml_parser
+
+CFDI = '''<?xml version="1.0" encoding="UTF-8"?>
+<cfdi:Comprobante xmlns:cfdi="http://www.sat.gob.mx/cfd/4" xmlns:tfd="http://www.sat.gob.mx/TimbreFiscalDigital" Version="4.0" Folio="1234" Fecha="2024-05-10T12:30:45" SubTotal="1000.00" Moneda="MXN" Total="1160.00" NoCertificado="00001000000504465028">
+  <cfdi:Emisor Rfc="AAA010101AAA" Nombre="EMPRESA SA DE CV" RegimenFiscal="601"/>
+  <cfdi:Receptor Rfc="XAXX010101000" Nombre="PÚBLICO EN GENERAL"/>
+  <cfdi:Conceptos>
+    <cfdi:Concepto Cantidad="1" Descripcion="Servicio de mantenimiento" ValorUnitario="1000.00" Importe="1000.00"/>
+  </cfdi:Conceptos>
+  <cfdi:Impuestos TotalTraslados="160.00"/>
+  <cfdi:Complemento>
+    <tfd:TimbreFiscalDigital UUID="6F1E7D5A-1234-4ABC-9DEF-0123456789AB" FechaTimbrado="2024-05-10T12:31:00" SelloSAT="xyz=="/>
+  </cfdi:Complemento>
+  <cfdi:Addenda>{addenda}</cfdi:Addenda>
+</cfdi:Comprobante>'''
+
+ADDENDA_ITEM = '<Partida Linea="{0}" Descripcion="Refacción número {0}">Texto de la partida</Partida>'
+
+
+def build_document(megabytes: float) -> bytes:
+    """Genera un CFDI con una addenda de aproximadamente el tamaño indicado"""
+    item_size = len(ADDENDA_ITEM.format(0).encode('utf-8'))
+    items = int(megabytes * 1024 * 1024 / item_size)
+    addenda = ''.join(ADDENDA_ITEM.format(i) for i in range(items))
+    return CFDI.format(addenda=addenda).encode('utf-8')
+
+
+def measure(func, xml_content: bytes, repeat: int):
+    """Devuelve (mejor tiempo en ms, memoria pico en MB) de func(xml_content)"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(xml_content)
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    func(xml_content)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best * 1000, peak / (1024 * 1024)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark del parseo de CFDI')
+    parser.add_argument('--mb', type=float, default=8, help='Tamaño de la addenda en MB (default 8)')
+    parser.add_argument('--repeat', type=int, default=3, help='Repeticiones por caso (default 3)')
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    xml_content = build_document(args.mb)
+
+    cases = [
+        ('etree: decode + str (anterior)', lambda content: ET.fromstring(content.decode('utf-8'))),
+        ('etree: bytes', lambda content: ET.fromstring(content)),
+    ]
+    for backend in ('etree', 'lxml', 'stream'):
+        xml_parser = create_xml_parser(backend)
+        cases.append((f"parse_xml [{type(xml_parser).__name__}]", xml_parser.parse_xml))
+
+    print(f"BENCHMARK DE PARSEO XML ({len(xml_content) / (1024 * 1024):.1f} MB)")
+    print("=" * 70)
+    for name, func in cases:
+        elapsed, peak = measure(func, xml_content, args.repeat)
+        print(f"{name:<40} {elapsed:>9.1f} ms {peak:>9.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
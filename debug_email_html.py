@@ -1,6 +1,8 @@
 #!/usr/bin/env python3
 """
 Script para obtener y analizar el HTML completo de un correo de depósito
+
+Con --offline analiza los correos del spool local sin conectarse al servidor.
 """
 
 import sys
@@ -11,19 +13,31 @@ from src.email_client import EmailClient
 from src.deposit_processor import DepositProcessor
 from src.logger import logger
 
-def debug_email_html():
-    """Obtiene el HTML completo de un correo de depósito para análisis"""
+def debug_email_html(offline: bool = False):
+    """
+    Obtiene el HTML completo de un correo de depósito para análisis
+
+    Args:
+        offline: Leer los correos del spool local en lugar del servidor
+    """
 
     logger.info("=== OBTENIENDO HTML COMPLETO DE CORREO DE DEPÓSITO ===\n")
 
-    # Conectar al servidor
     email_client = EmailClient()
-    if not email_client.connect():
-        logger.error("No se pudo conectar")
-        return
-
-    # Obtener correos
-    unread_emails = email_client.get_unread_emails()
+    if offline:
+        # Correos ya descargados en ciclos anteriores (no requiere conexión)
+        if not email_client.spool:
+            logger.error("El spool está deshabilitado (IMAP_SPOOL_ENABLED=false)")
+            return
+        unread_emails = list(email_client.spool.iter_messages())
+    else:
+        # Conectar al servidor
+        if not email_client.connect():
+            logger.error("No se pudo conectar")
+            return
+
+        # Obtener correos
+        unread_emails = email_client.get_unread_emails()
     if not unread_emails:
         logger.info("No hay correos no leídos")
         email_client.disconnect()
@@ -137,4 +151,4 @@ def debug_email_html():
     logger.info("\n=== ANÁLISIS COMPLETADO ===")
 
 if __name__ == "__main__":
-    debug_email_html()
\ No newline at end of file
+    debug_email_html(offline='--offline' in sys.argv)
\ No newline at end of file
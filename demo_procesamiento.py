@@ -59,10 +59,10 @@ def demo_procesamiento():
         return 1
     
     print("3. Parseando XML de demostración...")
-    from src.xml_parser import XMLParser
+    from src.xml_parser import create_xml_parser
     from src.factura_mapper import FacturaMapper
     
-    parser = XMLParser()
+    parser = create_xml_parser()
     xml_data = parser.parse_xml(xml_ejemplo.encode('utf-8'))
     
     if not xml_data:
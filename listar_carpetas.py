@@ -60,7 +60,8 @@ def main():
                     except Exception as e:
                         logger.error(f"   Error al seleccionar carpeta: {str(e)}")
 
-                    # Volver a INBOX
+                    # Volver a INBOX (el SELECT directo cambió el buzón de la sesión)
+                    email_client.selected_mailbox = None
                     email_client.select_inbox()
 
         else:
@@ -7,6 +7,7 @@ import sys
 import signal
 import argparse
 from src.processor import FacturaProcessor
+from src.async_processor import AsyncFacturaProcessor
 from src.config import Config
 from src.logger import logger
 
@@ -20,8 +21,8 @@ def signal_handler(signum, frame):
 def main():
     """Función principal del script"""
     parser = argparse.ArgumentParser(description='Sistema de procesamiento de facturas XML desde correo')
-    parser.add_argument('--mode', choices=['continuous', 'once'], default='continuous',
-                       help='Modo de ejecución: continuous (default) o once')
+    parser.add_argument('--mode', choices=['continuous', 'once', 'async'], default='continuous',
+                       help='Modo de ejecución: continuous (default), once o async (continuo con asyncio)')
     parser.add_argument('--test', action='store_true',
                        help='Ejecutar pruebas de conexión')
     parser.add_argument('--status', action='store_true',
@@ -39,7 +40,7 @@ def main():
         
         # Crear instancia del procesador
         global processor
-        processor = FacturaProcessor()
+        processor = AsyncFacturaProcessor() if args.mode == 'async' else FacturaProcessor()
         
         if args.test:
             # Modo prueba
@@ -86,8 +87,9 @@ def main():
                 return 0
         
         else:
-            # Modo continuo (default)
-            logger.info("Iniciando procesamiento continuo...")
+            # Modo continuo (default o async)
+            logger.info("Iniciando procesamiento continuo..." if args.mode == 'continuous'
+                        else "Iniciando procesamiento continuo con asyncio...")
             logger.info("Presiona Ctrl+C para detener el procesador")
             
             processor.start_processing()
@@ -1,6 +1,9 @@
 #!/usr/bin/env python3
 """
 Script para procesar correos de transferencia SPEI que ya están marcados como leídos
+
+Usa su propio punto de control: cada ejecución revisa solo los correos
+llegados desde la anterior. Con --completo se revisa toda la bandeja.
 """
 
 import sys
@@ -8,18 +11,26 @@ import os
 sys.path.append(os.path.dirname(__file__))
 
 from src.email_client import EmailClient
+from src.mailbox_checkpoint import MailboxCheckpoint
+from src.search_plan import SearchClass
+from src.config import Config
 from src.transfer_processor import TransferProcessor
 from src.supabase_client import SupabaseClient
 from src.logger import logger
-import email
 
-def procesar_transferencias_leidas():
-    """Procesa correos de transferencia SPEI aunque estén leídos"""
+def procesar_transferencias_leidas(completo: bool = False):
+    """
+    Procesa correos de transferencia SPEI aunque estén leídos
+
+    Args:
+        completo: Revisar toda la bandeja ignorando el punto de control
+    """
     
     logger.info("=== PROCESANDO TRANSFERENCIAS SPEI (INCLUYENDO LEÍDOS) ===")
     
     # Inicializar componentes
     email_client = EmailClient()
+    checkpoint = MailboxCheckpoint('transferencias_leidas')
     transfer_processor = TransferProcessor()
     supabase_client = SupabaseClient()
     
@@ -34,81 +45,93 @@ def procesar_transferencias_leidas():
             logger.error("No se pudo seleccionar la bandeja de entrada")
             return
         
-        # Buscar TODOS los correos (no solo no leídos)
+        # Buscar TODOS los correos (no solo no leídos) desde la ejecución anterior
         logger.info("Buscando correos en la bandeja de entrada...")
-        status, email_ids = email_client.imap_server.search(None, 'ALL')
-        
-        if status != 'OK':
-            logger.error("Error al buscar correos")
-            return
-        
-        email_id_list = email_ids[0].split()
-        logger.info(f"Se encontraron {len(email_id_list)} correos en total")
+        if completo:
+            checkpoint.reset(None)
+        email_id_list = email_client.search_new_uids(checkpoint, 'ALL')
+        logger.info(f"Se encontraron {len(email_id_list)} correos por revisar")
         
         # Invertir para procesar los más recientes primero
         email_id_list.reverse()
         
-        transfer_procesadas = 0
         transfer_insertadas = 0
         transfer_duplicadas = 0
         transfer_errores = 0
         
-        for email_id in email_id_list:
-            try:
-                # Obtener el correo sin marcar como leído (usando PEEK)
-                status, msg_data = email_client.imap_server.fetch(email_id, '(BODY.PEEK[HEADER])')
-                
-                if status != 'OK':
-                    continue
-                
-                raw_email = msg_data[0][1]
-                msg = email.message_from_bytes(raw_email)
-                
+        # Fase 1: identificar transferencias con una búsqueda por asunto en el servidor
+        matched = None
+        if Config.IMAP_SEARCH_PLAN_ENABLED and email_id_list:
+            transfer_class = SearchClass('transferencia', transfer_processor.search_criteria())
+            matched = email_client.search_class_uids(transfer_class, email_id_list)
+
+        if matched is not None:
+            transfer_ids = [email_id for email_id in email_id_list if email_id in matched]
+            logger.info(f"📧 El servidor identificó {len(transfer_ids)} transferencias SPEI")
+        else:
+            # Sin plan de búsqueda: descargar solo cabeceras, por lotes
+            transfer_ids = []
+            for email_id, msg in email_client.fetch_messages(email_id_list, items='BODY.PEEK[HEADER]'):
                 subject = msg.get('subject', 'Sin asunto')
                 
                 # Verificar si es transferencia SPEI
                 if transfer_processor.is_transfer_email(subject):
-                    logger.info(f"📧 Procesando transferencia SPEI: {subject}")
-                    transfer_procesadas += 1
-                    
-                    # Obtener el correo completo
-                    status, msg_data = email_client.imap_server.fetch(email_id, '(BODY.PEEK[])')
-                    if status == 'OK':
-                        raw_email = msg_data[0][1]
-                        msg = email.message_from_bytes(raw_email)
+                    logger.info(f"📧 Transferencia SPEI encontrada: {subject}")
+                    transfer_ids.append(email_id)
+        
+        transfer_procesadas = len(transfer_ids)
+        # Transferencias con error: se vuelven a revisar en la siguiente ejecución
+        fallidas = list(transfer_ids)
+        
+        # Fase 2: descargar completos, por lotes, solo los correos de transferencia
+        for email_id, msg in email_client.fetch_messages(transfer_ids):
+            try:
+                # Confirmar con las reglas del cliente (la búsqueda del servidor puede ser más amplia)
+                if matched is not None and not transfer_processor.is_transfer_email(msg.get('subject', '')):
+                    transfer_procesadas -= 1
+                    fallidas.remove(email_id)
+                    continue
+
+                # Procesar el correo
+                transfer_result = transfer_processor.process_transfer_email(msg)
+                
+                if transfer_result['processed'] and transfer_result['data']:
+                    # Insertar en Supabase
+                    if supabase_client.insert_movimiento_bancario(transfer_result['data']):
+                        transfer_insertadas += 1
+                        fallidas.remove(email_id)
+                        logger.info(f"✅ Transferencia SPEI insertada: {transfer_result['data'].get('rastreo')}")
                         
-                        # Procesar el correo
-                        transfer_result = transfer_processor.process_transfer_email(msg)
+                        # Marcar como leído (por si acaso)
+                        email_client.mark_email_as_read(email_id)
                         
-                        if transfer_result['processed'] and transfer_result['data']:
-                            # Insertar en Supabase
-                            if supabase_client.insert_movimiento_bancario(transfer_result['data']):
-                                transfer_insertadas += 1
-                                logger.info(f"✅ Transferencia SPEI insertada: {transfer_result['data'].get('rastreo')}")
-                                
-                                # Marcar como leído (por si acaso)
-                                email_client.mark_email_as_read(email_id)
-                                
-                                # Mover a carpeta BanBajio
-                                email_client.move_email_to_folder(email_id, 'BanBajio')
+                        # Mover a carpeta BanBajio
+                        email_client.move_email_to_folder(email_id, 'BanBajio')
+                    else:
+                        # Verificar si es duplicado
+                        if transfer_result['data'].get('rastreo'):
+                            existing = supabase_client.get_movimiento_by_rastreo(transfer_result['data']['rastreo'])
+                            if existing:
+                                transfer_duplicadas += 1
+                                fallidas.remove(email_id)
+                                logger.warning(f"⚠️ Transferencia SPEI duplicada: {transfer_result['data']['rastreo']}")
                             else:
-                                # Verificar si es duplicado
-                                if transfer_result['data'].get('rastreo'):
-                                    existing = supabase_client.get_movimiento_by_rastreo(transfer_result['data']['rastreo'])
-                                    if existing:
-                                        transfer_duplicadas += 1
-                                        logger.warning(f"⚠️ Transferencia SPEI duplicada: {transfer_result['data']['rastreo']}")
-                                    else:
-                                        transfer_errores += 1
-                                        logger.error(f"❌ Error al insertar transferencia SPEI: {transfer_result['data'].get('rastreo')}")
-                        else:
-                            transfer_errores += 1
-                            logger.error(f"❌ Error al procesar transferencia SPEI: {transfer_result.get('message', 'Error desconocido')}")
+                                transfer_errores += 1
+                                logger.error(f"❌ Error al insertar transferencia SPEI: {transfer_result['data'].get('rastreo')}")
+                else:
+                    transfer_errores += 1
+                    logger.error(f"❌ Error al procesar transferencia SPEI: {transfer_result.get('message', 'Error desconocido')}")
                     
             except Exception as e:
                 logger.error(f"Error al procesar correo {email_id}: {e}")
                 continue
         
+        # Mover de una sola vez los correos programados
+        email_client.flush_pending_moves()
+
+        # Guardar el punto de control de este script
+        email_client.commit_checkpoint(checkpoint, pending_uids=fallidas)
+
         logger.info(f"\n=== RESUMEN ===")
         logger.info(f"Transferencias SPEI encontradas: {transfer_procesadas}")
         logger.info(f"Transferencias SPEI insertadas: {transfer_insertadas}")
@@ -123,5 +146,5 @@ def procesar_transferencias_leidas():
         email_client.disconnect()
 
 if __name__ == "__main__":
-    procesar_transferencias_leidas()
+    procesar_transferencias_leidas(completo='--completo' in sys.argv)
 
@@ -0,0 +1,133 @@
+"""
+Módulo de procesamiento de facturas con asyncio
+
+AsyncFacturaProcessor mantiene la misma semántica por correo que
+FacturaProcessor (extracción, guardado en Supabase y confirmación IMAP),
+pero solapa muchas inserciones en Supabase con la descarga de correos
+desde un bucle de eventos.
+
+imaplib y el cliente de supabase (1.x) son síncronos, por lo que las
+llamadas bloqueantes se ejecutan fuera del bucle: las de IMAP en un único
+hilo dedicado (la conexión nunca se usa desde dos hilos a la vez) y las de
+Supabase en el ejecutor por defecto, limitadas por un semáforo.
+"""
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, Set, Tuple
+from email.message import Message
+from .config import Config
+from .logger import logger
+from .processor import FacturaProcessor
+
+
+class AsyncFacturaProcessor(FacturaProcessor):
+    """Procesador de facturas que usa asyncio para solapar IMAP y Supabase"""
+
+    def __init__(self):
+        """Inicializa el procesador y el hilo dedicado a la conexión IMAP"""
+        super().__init__()
+        self.imap_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='imap')
+        logger.info(f"Modo asyncio: hasta {Config.ASYNC_SUPABASE_CONCURRENCY} solicitudes simultáneas a Supabase")
+
+    async def _imap_call(self, func, *args):
+        """
+        Ejecuta una operación IMAP en el hilo dedicado a la conexión
+
+        Args:
+            func: Función a ejecutar
+            *args: Argumentos de la función
+
+        Returns:
+            Resultado de la función
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.imap_executor, functools.partial(func, *args))
+
+    def _consume_emails(self, unread_emails: Iterator[Tuple[bytes, Message]], stats: dict):
+        """
+        Procesa los correos descargados con el bucle de eventos
+
+        Args:
+            unread_emails: Iterador de tuplas (email_id, msg)
+            stats: Estadísticas del ciclo
+        """
+        asyncio.run(self._consume_emails_async(unread_emails, stats))
+
+    async def _consume_emails_async(self, unread_emails: Iterator[Tuple[bytes, Message]], stats: dict):
+        """
+        Descarga los correos y lanza una tarea por correo
+
+        Como máximo ASYNC_MAX_IN_FLIGHT correos están en proceso a la vez; al
+        llegar al límite se espera a que termine alguno antes de descargar más.
+
+        Args:
+            unread_emails: Iterador de tuplas (email_id, msg)
+            stats: Estadísticas del ciclo
+        """
+        semaphore = asyncio.Semaphore(Config.ASYNC_SUPABASE_CONCURRENCY)
+        tasks: Set[asyncio.Task] = set()
+
+        while True:
+            # La descarga (UID FETCH) avanza en el hilo IMAP mientras las tareas esperan a Supabase
+            item = await self._imap_call(next, unread_emails, None)
+            if item is None:
+                break
+
+            email_id, msg = item
+            stats['emails_processed'] += 1
+            task = asyncio.create_task(self._process_email_async(self._new_work(email_id, msg), semaphore, stats))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+            del item, msg
+
+            if len(tasks) >= Config.ASYNC_MAX_IN_FLIGHT:
+                await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+
+        if tasks:
+            await asyncio.gather(*tasks)
+
+    async def _process_email_async(self, work: dict, semaphore: asyncio.Semaphore, stats: dict):
+        """
+        Procesa un correo: extracción, guardado (limitado por el semáforo) y confirmación
+
+        Args:
+            work: Elemento de trabajo (ver FacturaProcessor._new_work)
+            semaphore: Límite de solicitudes simultáneas a Supabase
+            stats: Estadísticas del ciclo
+        """
+        try:
+            await asyncio.to_thread(self._extract_stage, work)
+            async with semaphore:
+                await asyncio.to_thread(self._run_stage, self._persist_email, work)
+        except Exception as e:
+            logger.error(f"Error al procesar correo {work['email_id']}: {str(e)}")
+            self._on_stage_error(work, e)
+
+        # Las confirmaciones y estadísticas se aplican en el hilo IMAP, una a la vez
+        await self._imap_call(self._finish_work, work, stats)
+
+    def _finish_work(self, work: dict, stats: dict):
+        """
+        Confirma un correo en el hilo IMAP sin interrumpir a los demás
+
+        Como en el ciclo síncrono, un error se registra por correo: si escapara
+        de asyncio.gather se perderían los movimientos y el punto de control
+        de los demás correos del lote.
+
+        Args:
+            work: Elemento de trabajo (ver FacturaProcessor._new_work)
+            stats: Estadísticas del ciclo
+        """
+        try:
+            self._complete_work(work, stats)
+        except Exception as e:
+            logger.error(f"Error al procesar correo {work['email_id']}: {str(e)}")
+            stats['errors'] += 1
+            self._record_outcome(work['email_id'], work['subject'], work['extract_errors'] or [], stats)
+
+    def _cleanup(self):
+        """Realiza limpieza de recursos"""
+        super()._cleanup()
+        self.imap_executor.shutdown(wait=False)
@@ -0,0 +1,64 @@
+"""
+Módulo de registros de facturas CFDI parseadas
+
+CFDIRecord es el contrato entre XMLParser y FacturaMapper: el parser lo
+arma directamente a partir de los atributos de cada sección del XML, sin
+diccionarios intermedios, y el mapper lo convierte una sola vez en la
+fila de catFacturas que se inserta en Supabase. Los importes se guardan
+como Decimal (exactos, tal como vienen en el XML) y se convierten a float
+solo en la fila, porque las columnas son double precision. Los registros son
+inmutables (pueden compartirse desde la caché de parseo) y usan
+__slots__ para ocupar menos memoria por factura.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+from typing import Optional, Tuple
+
+
+@dataclass(frozen=True, slots=True)
+class ConceptoRecord:
+    """Concepto (cfdi:Concepto) de una factura; los importes se conservan como texto del XML"""
+
+    descripcion: str = ''
+    cantidad: str = '1'
+    valor_unitario: str = '0'
+    importe: str = '0'
+
+
+@dataclass(frozen=True, slots=True)
+class CFDIRecord:
+    """Datos de una factura CFDI extraídos del XML"""
+
+    # Comprobante
+    folio: str
+    fecha: Optional[datetime]
+    total: Decimal
+    subtotal: Decimal
+    moneda: str
+    mes: int                  # Mes de la fecha de emisión (mes actual si no tiene fecha)
+    anio: int                 # Año de la fecha de emisión (año actual si no tiene fecha)
+    no_certificado: str
+
+    # Emisor
+    rfc_emisor: str = ''
+    nombre_emisor: str = ''
+    regimen_fiscal: int = 0
+
+    # Receptor (para referencia, no se guarda en catFacturas)
+    rfc_receptor: str = ''
+    nombre_receptor: str = ''
+
+    # Conceptos: concepto principal (la primera descripción no vacía) y detalle
+    concepto: str = ''
+    conceptos: Tuple[ConceptoRecord, ...] = ()
+
+    # Timbre Fiscal Digital
+    uuid: str = ''
+    sello_sat: str = ''
+    fecha_timbrado: Optional[datetime] = None
+
+    # Impuestos
+    total_traslados: Decimal = Decimal('0')
+    total_retenciones: Decimal = Decimal('0')
@@ -0,0 +1,147 @@
+"""
+Módulo de validación de CFDI contra su esquema XSD
+
+Los adjuntos XML que no son facturas (catálogos de proveedores, acuses)
+se rechazan antes de extraer los datos, mapearlos y consultar Supabase.
+Los esquemas se compilan una sola vez por proceso (incluidos los procesos
+del pool de parseo) con lxml.etree.XMLSchema, uno por versión de CFDI.
+
+Por defecto se usan los esquemas reducidos de src/schemas; con
+XML_SCHEMA_DIR se pueden usar los oficiales del SAT. Sus importaciones
+(catCFDI.xsd, tdCFDI.xsd) apuntan a www.sat.gob.mx y se resuelven con el
+archivo del mismo nombre en ese directorio, sin acceso a la red.
+"""
+
+import os
+import threading
+import time
+from typing import Dict, Optional
+from lxml import etree
+from .config import Config
+from .logger import logger
+from .xml_parser import CFDIRejectedError
+
+# Esquemas incluidos con el sistema
+SCHEMA_DIR = os.path.join(os.path.dirname(__file__), 'schemas')
+
+# Archivo de esquema por namespace del elemento Comprobante
+SCHEMA_FILES = {
+    'http://www.sat.gob.mx/cfd/4': 'cfdv40.xsd',
+    'http://www.sat.gob.mx/cfd/3': 'cfdv33.xsd',
+}
+
+
+class CFDISchemaError(CFDIRejectedError):
+    """El XML no es un CFDI válido según el esquema de su versión"""
+
+    reason = 'por el esquema CFDI'
+
+
+class _LocalSchemaResolver(etree.Resolver):
+    """Resuelve las importaciones de esquemas con archivos del directorio local"""
+
+    def __init__(self, schema_dir: str):
+        super().__init__()
+        self.schema_dir = schema_dir
+
+    def resolve(self, url, pubid, context):
+        path = os.path.join(self.schema_dir, os.path.basename(url or ''))
+        if os.path.isfile(path):
+            return self.resolve_filename(path, context)
+        return None
+
+
+def schema_file_parser(schema_dir: str) -> etree.XMLParser:
+    """Parser para esquemas y XSLT del SAT que resuelve sus importaciones en schema_dir"""
+    parser = etree.XMLParser(no_network=True)
+    parser.resolvers.add(_LocalSchemaResolver(schema_dir))
+    return parser
+
+
+class CFDISchemaValidator:
+    """Validador de CFDI con los esquemas XSD compilados una sola vez"""
+
+    def __init__(self, schema_dir: Optional[str] = None):
+        """
+        Args:
+            schema_dir: Directorio con los esquemas (default Config.XML_SCHEMA_DIR o src/schemas)
+        """
+        self.schema_dir = schema_dir or Config.XML_SCHEMA_DIR or SCHEMA_DIR
+
+        parser = schema_file_parser(self.schema_dir)
+        self.schemas: Dict[str, etree.XMLSchema] = {}
+        for namespace, filename in SCHEMA_FILES.items():
+            self.schemas[namespace] = etree.XMLSchema(etree.parse(os.path.join(self.schema_dir, filename), parser))
+
+        # Parser para los documentos que llegan sin árbol de lxml (backends etree y stream)
+        self.parser = etree.XMLParser(resolve_entities='internal', no_network=True)
+
+        # Un XMLSchema guarda el registro de errores de la última validación:
+        # las validaciones de varios hilos se hacen de una en una
+        self.lock = threading.Lock()
+        self.validated = 0
+        self.rejected = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def validate(self, xml_content: bytes, root: Optional[etree._Element] = None):
+        """
+        Valida un CFDI contra el esquema de su versión
+
+        Args:
+            xml_content: Contenido del archivo XML en bytes
+            root: Elemento raíz ya parseado con lxml (si no, se parsea xml_content)
+
+        Raises:
+            CFDISchemaError: Si el XML no es un CFDI o no cumple el esquema
+        """
+        start = time.perf_counter()
+        error = None
+        with self.lock:
+            try:
+                if not isinstance(root, etree._Element):
+                    root = etree.fromstring(xml_content, self.parser)
+                namespace = etree.QName(root).namespace
+                schema = self.schemas.get(namespace)
+                if schema is None:
+                    error = f"el elemento raíz {etree.QName(root).localname} ({namespace or 'sin namespace'}) no es un CFDI"
+                elif not schema.validate(root):
+                    error = str(schema.error_log.last_error)
+            except etree.XMLSyntaxError as e:
+                error = str(e)
+            finally:
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                self.validated += 1
+                self.rejected += error is not None
+                self.total_ms += elapsed_ms
+                self.max_ms = max(self.max_ms, elapsed_ms)
+
+        logger.debug(f"Validación XSD en {elapsed_ms:.2f} ms - {'rechazado' if error else 'válido'}")
+        if error:
+            raise CFDISchemaError(error)
+
+    def stats(self) -> Dict[str, float]:
+        """Contadores y tiempos de validación de este proceso"""
+        with self.lock:
+            return {
+                'validated': self.validated,
+                'rejected': self.rejected,
+                'avg_ms': round(self.total_ms / self.validated, 3) if self.validated else 0.0,
+                'max_ms': round(self.max_ms, 3)
+            }
+
+
+_lock = threading.Lock()
+_validator: Optional[CFDISchemaValidator] = None
+
+
+def get_schema_validator() -> CFDISchemaValidator:
+    """Validador compartido del proceso (compila los esquemas la primera vez)"""
+    global _validator
+    with _lock:
+        if _validator is None:
+            start = time.perf_counter()
+            _validator = CFDISchemaValidator()
+            logger.info(f"Esquemas XSD de CFDI compilados desde {_validator.schema_dir} "
+                        f"en {(time.perf_counter() - start) * 1000:.1f} ms")
+        return _validator
@@ -0,0 +1,303 @@
+"""
+Módulo de verificación de los sellos digitales de CFDI
+
+Antes de aceptar una factura se verifican localmente el sello del emisor
+(Sello del Comprobante, firmado sobre la cadena original del CFDI) y el
+sello del SAT (SelloSAT del Timbre Fiscal Digital, firmado sobre la
+cadena original del timbre). Ambos son RSA con SHA-256.
+
+Las cadenas originales se generan con los XSLT de src/schemas (o los
+oficiales en XML_SCHEMA_DIR), compilados una sola vez por proceso. Los
+certificados ya leídos se guardan en una caché LRU por número de
+certificado: el del emisor viene en el atributo Certificado y los del SAT
+se leen de SEAL_CERT_DIR (<NoCertificadoSAT>.cer, DER o PEM), que hace las
+veces del repositorio de certificados del SAT.
+
+Se verifica que cada sello corresponda a su certificado; no se valida la
+cadena de confianza ni la vigencia de los certificados. El paquete
+cryptography se importa solo con SEAL_VERIFICATION activada; si no está
+instalado, get_seal_verifier() falla al crear el parser.
+"""
+
+import base64
+import binascii
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+from lxml import etree
+from .cfdi_schema import SCHEMA_DIR, schema_file_parser
+from .config import Config
+from .logger import logger
+from .xml_parser import CFDIRejectedError
+
+# XSLT de la cadena original por namespace del elemento Comprobante
+XSLT_FILES = {
+    'http://www.sat.gob.mx/cfd/4': 'cadenaoriginal_4_0.xslt',
+    'http://www.sat.gob.mx/cfd/3': 'cadenaoriginal_3_3.xslt',
+}
+TFD_XSLT_FILE = 'cadenaoriginal_TFD_1_1.xslt'
+TFD_TAG = '{http://www.sat.gob.mx/TimbreFiscalDigital}TimbreFiscalDigital'
+
+# Número de certificado del SAT (también es el nombre del archivo en SEAL_CERT_DIR)
+_NO_CERTIFICADO = re.compile(r'[0-9]{20}')
+
+# Los XSLT solo leen archivos locales (sus inclusiones)
+_XSLT_ACCESS = etree.XSLTAccessControl(read_network=False, write_file=False,
+                                       create_dir=False, write_network=False)
+
+
+class SealVerificationError(CFDIRejectedError):
+    """El sello del emisor o del SAT no corresponde al CFDI"""
+
+    reason = 'por sello no válido'
+
+
+class CertificateCache:
+    """Caché LRU de certificados leídos, por número de certificado"""
+
+    def __init__(self, max_entries: Optional[int] = None):
+        """
+        Args:
+            max_entries: Certificados a conservar (default Config.SEAL_CERT_CACHE_SIZE, 0 desactiva)
+        """
+        self.max_entries = max_entries if max_entries is not None else Config.SEAL_CERT_CACHE_SIZE
+        self.entries: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, no_certificado: str, load: Callable[[], Any]) -> Any:
+        """
+        Devuelve el certificado con ese número, leyéndolo con load() si no está en caché
+
+        Args:
+            no_certificado: Número de certificado (NoCertificado / NoCertificadoSAT)
+            load: Función que lee el certificado (si falla, no se guarda nada)
+
+        Returns:
+            Certificado leído
+        """
+        with self.lock:
+            certificate = self.entries.get(no_certificado)
+            if certificate is not None:
+                self.entries.move_to_end(no_certificado)
+                self.hits += 1
+                return certificate
+            self.misses += 1
+
+        certificate = load()
+        if self.max_entries > 0:
+            with self.lock:
+                self.entries[no_certificado] = certificate
+                if len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+        return certificate
+
+    def stats(self) -> Dict[str, int]:
+        """Contadores de la caché"""
+        with self.lock:
+            return {'entries': len(self.entries), 'hits': self.hits, 'misses': self.misses}
+
+
+def load_certificate(data: bytes):
+    """Lee un certificado X.509 en DER o PEM"""
+    from cryptography import x509
+
+    if data.lstrip().startswith(b'-----BEGIN'):
+        return x509.load_pem_x509_certificate(data)
+    return x509.load_der_x509_certificate(data)
+
+
+def certificate_number(certificate) -> str:
+    """Número de certificado del SAT: el número de serie del certificado leído como texto"""
+    serial = certificate.serial_number
+    return serial.to_bytes((serial.bit_length() + 7) // 8, 'big').decode('ascii', 'replace')
+
+
+class SealVerifier:
+    """Verificador de los sellos del emisor y del SAT con XSLT compilados una sola vez"""
+
+    def __init__(self, schema_dir: Optional[str] = None, cert_dir: Optional[str] = None,
+                 cache_size: Optional[int] = None):
+        """
+        Args:
+            schema_dir: Directorio con los XSLT (default Config.XML_SCHEMA_DIR o src/schemas)
+            cert_dir: Directorio con los certificados del SAT (default Config.SEAL_CERT_DIR)
+            cache_size: Certificados a conservar en caché (default Config.SEAL_CERT_CACHE_SIZE)
+        """
+        self.schema_dir = schema_dir or Config.XML_SCHEMA_DIR or SCHEMA_DIR
+        self.cert_dir = cert_dir if cert_dir is not None else Config.SEAL_CERT_DIR
+
+        parser = schema_file_parser(self.schema_dir)
+        self.transforms: Dict[str, etree.XSLT] = {}
+        for namespace, filename in XSLT_FILES.items():
+            self.transforms[namespace] = etree.XSLT(etree.parse(os.path.join(self.schema_dir, filename), parser),
+                                                    access_control=_XSLT_ACCESS)
+        self.tfd_transform = etree.XSLT(etree.parse(os.path.join(self.schema_dir, TFD_XSLT_FILE), parser),
+                                        access_control=_XSLT_ACCESS)
+
+        self.certificates = CertificateCache(cache_size)
+
+        # Parser para los documentos que llegan sin árbol de lxml (backends etree y stream)
+        self.parser = etree.XMLParser(resolve_entities='internal', no_network=True)
+
+        # Las cadenas originales de varios hilos se generan de una en una
+        self.lock = threading.Lock()
+        self.verified = 0
+        self.rejected = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def cadenas_originales(self, root: etree._Element):
+        """
+        Genera la cadena original del comprobante y la del timbre
+
+        Args:
+            root: Elemento raíz (Comprobante) parseado con lxml
+
+        Returns:
+            Tupla (cadena del comprobante, cadena del timbre o None si no está timbrado)
+
+        Raises:
+            SealVerificationError: Si el elemento raíz no es un CFDI
+        """
+        transform = self.transforms.get(etree.QName(root).namespace)
+        if transform is None:
+            raise SealVerificationError(f"el elemento raíz {etree.QName(root).localname} no es un CFDI")
+
+        timbre = root.find(f'.//{TFD_TAG}')
+        with self.lock:
+            cadena = str(transform(root))
+            cadena_timbre = str(self.tfd_transform(timbre)) if timbre is not None else None
+        return cadena, cadena_timbre
+
+    def verify(self, xml_content: bytes, root: Optional[etree._Element] = None):
+        """
+        Verifica el sello del emisor y el sello del SAT de un CFDI
+
+        Args:
+            xml_content: Contenido del archivo XML en bytes
+            root: Elemento raíz ya parseado con lxml (si no, se parsea xml_content)
+
+        Raises:
+            SealVerificationError: Si falta un sello o certificado o un sello no corresponde
+        """
+        start = time.perf_counter()
+        error = None
+        try:
+            if not isinstance(root, etree._Element):
+                with self.lock:
+                    root = etree.fromstring(xml_content, self.parser)
+            cadena, cadena_timbre = self.cadenas_originales(root)
+
+            self._verify_seal('emisor', root.get('Sello'), cadena, root.get('NoCertificado'),
+                              lambda: self._embedded_certificate(root.get('Certificado')))
+
+            timbre = root.find(f'.//{TFD_TAG}')
+            if timbre is None:
+                raise SealVerificationError("el CFDI no tiene Timbre Fiscal Digital")
+            if timbre.get('SelloCFD') != root.get('Sello'):
+                raise SealVerificationError("el SelloCFD del timbre no es el sello del comprobante")
+            no_certificado_sat = timbre.get('NoCertificadoSAT')
+            self._verify_seal('SAT', timbre.get('SelloSAT'), cadena_timbre, no_certificado_sat,
+                              lambda: self._sat_certificate(no_certificado_sat))
+        except (SealVerificationError, etree.XMLSyntaxError) as e:
+            error = str(e)
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            with self.lock:
+                self.verified += 1
+                self.rejected += error is not None
+                self.total_ms += elapsed_ms
+                self.max_ms = max(self.max_ms, elapsed_ms)
+
+        logger.debug(f"Verificación de sellos en {elapsed_ms:.2f} ms - {'rechazado' if error else 'válido'}")
+        if error:
+            raise SealVerificationError(error)
+
+    def _verify_seal(self, origen: str, sello: Optional[str], cadena: str,
+                     no_certificado: Optional[str], load: Callable[[], Any]):
+        """Verifica un sello (RSA PKCS#1 v1.5 con SHA-256) con el certificado indicado"""
+        from cryptography.exceptions import InvalidSignature
+        from cryptography.hazmat.primitives import hashes
+        from cryptography.hazmat.primitives.asymmetric import padding
+
+        if not sello or not no_certificado:
+            raise SealVerificationError(f"falta el sello o el número de certificado del {origen}")
+        try:
+            signature = base64.b64decode(sello, validate=True)
+        except binascii.Error:
+            raise SealVerificationError(f"el sello del {origen} no está en base64")
+
+        def load_checked():
+            # Se comprueba antes de guardarlo en caché con ese número
+            certificate = load()
+            if certificate_number(certificate) != no_certificado:
+                raise SealVerificationError(f"el certificado del {origen} no es el número {no_certificado}")
+            return certificate
+
+        certificate = self.certificates.get(no_certificado, load_checked)
+        try:
+            certificate.public_key().verify(signature, cadena.encode('utf-8'), padding.PKCS1v15(), hashes.SHA256())
+        except InvalidSignature:
+            raise SealVerificationError(f"el sello del {origen} no corresponde a la cadena original")
+
+    def _embedded_certificate(self, certificado: Optional[str]):
+        """Certificado del emisor incluido en el atributo Certificado (base64 de DER)"""
+        if not certificado:
+            raise SealVerificationError("el CFDI no incluye el certificado del emisor")
+        try:
+            return load_certificate(base64.b64decode(certificado, validate=True))
+        except (binascii.Error, ValueError) as e:
+            raise SealVerificationError(f"certificado del emisor no válido: {str(e)}")
+
+    def _sat_certificate(self, no_certificado: str):
+        """Certificado del SAT leído de SEAL_CERT_DIR"""
+        if not _NO_CERTIFICADO.fullmatch(no_certificado):
+            raise SealVerificationError(f"número de certificado del SAT no válido: {no_certificado}")
+        path = os.path.join(self.cert_dir, f'{no_certificado}.cer')
+        if not self.cert_dir or not os.path.isfile(path):
+            raise SealVerificationError(f"certificado del SAT {no_certificado} no encontrado en SEAL_CERT_DIR")
+        try:
+            with open(path, 'rb') as f:
+                return load_certificate(f.read())
+        except ValueError as e:
+            raise SealVerificationError(f"certificado del SAT {no_certificado} no válido: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores y tiempos de verificación de este proceso"""
+        with self.lock:
+            stats = {
+                'verified': self.verified,
+                'rejected': self.rejected,
+                'avg_ms': round(self.total_ms / self.verified, 3) if self.verified else 0.0,
+                'max_ms': round(self.max_ms, 3)
+            }
+        stats['certificates'] = self.certificates.stats()
+        return stats
+
+
+_lock = threading.Lock()
+_verifier: Optional[SealVerifier] = None
+
+
+def get_seal_verifier() -> SealVerifier:
+    """Verificador compartido del proceso (compila los XSLT la primera vez)"""
+    global _verifier
+    with _lock:
+        if _verifier is None:
+            # Sin cryptography ningún sello se podría verificar: se falla al iniciar
+            # en lugar de rechazar cada factura
+            try:
+                import cryptography  # noqa: F401
+            except ImportError as e:
+                raise RuntimeError("SEAL_VERIFICATION requiere el paquete cryptography "
+                                   "(pip install -r requirements.txt)") from e
+            start = time.perf_counter()
+            _verifier = SealVerifier()
+            logger.info(f"XSLT de cadenas originales compilados desde {_verifier.schema_dir} "
+                        f"en {(time.perf_counter() - start) * 1000:.1f} ms")
+        return _verifier
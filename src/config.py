@@ -17,6 +17,13 @@ class Config:
     IMAP_PORT = int(os.getenv('IMAP_PORT', '993'))
     IMAP_USER = os.getenv('IMAP_USER')
     IMAP_PASSWORD = os.getenv('IMAP_PASSWORD')
+    IMAP_FETCH_CHUNK_SIZE = int(os.getenv('IMAP_FETCH_CHUNK_SIZE', '50'))  # Correos por cada UID FETCH
+    # 'full' descarga el correo completo; 'structure' descarga primero ENVELOPE/BODYSTRUCTURE
+    # y después solo las partes MIME necesarias (XML o cuerpo HTML)
+    IMAP_FETCH_MODE = os.getenv('IMAP_FETCH_MODE', 'full').lower()
+    # Conexiones adicionales de solo lectura (EXAMINE) que reparten los UID FETCH de descargas grandes
+    IMAP_FETCH_POOL_SIZE = int(os.getenv('IMAP_FETCH_POOL_SIZE', '0'))  # 0 (default) desactiva el pool
+    IMAP_FETCH_POOL_MIN_UIDS = int(os.getenv('IMAP_FETCH_POOL_MIN_UIDS', '200'))  # Correos mínimos para usarlo
 
     # Configuración Supabase
     SUPABASE_URL = os.getenv('SUPABASE_URL')
@@ -25,6 +32,56 @@ class Config:
     # Configuración del procesador
     POLLING_INTERVAL = int(os.getenv('POLLING_INTERVAL', '60'))
     POLLING_INTERVAL_IDLE = int(os.getenv('POLLING_INTERVAL_IDLE', '300'))  # Intervalo cuando no hay actividad (5 min)
+    # IMAP IDLE (RFC 2177): esperar notificaciones del servidor en lugar de sondear
+    IMAP_IDLE_ENABLED = os.getenv('IMAP_IDLE_ENABLED', 'false').lower() == 'true'
+    IMAP_IDLE_TIMEOUT = int(os.getenv('IMAP_IDLE_TIMEOUT', '1500'))  # Reenviar IDLE antes del corte de 29 min
+    # Sesión IMAP persistente: NOOP tras inactividad y reconexión con espera exponencial
+    IMAP_KEEPALIVE_INTERVAL = int(os.getenv('IMAP_KEEPALIVE_INTERVAL', '240'))  # Segundos sin comandos antes de NOOP
+    IMAP_RECONNECT_MAX_ATTEMPTS = int(os.getenv('IMAP_RECONNECT_MAX_ATTEMPTS', '5'))
+    IMAP_RECONNECT_BACKOFF_BASE = float(os.getenv('IMAP_RECONNECT_BACKOFF_BASE', '2'))  # Primera espera en segundos
+    IMAP_RECONNECT_BACKOFF_MAX = float(os.getenv('IMAP_RECONNECT_BACKOFF_MAX', '300'))  # Espera máxima en segundos
+    # Punto de control en disco: cada ciclo busca solo correos nuevos (UID n+1:*) o modificados (CONDSTORE)
+    IMAP_CHECKPOINT_ENABLED = os.getenv('IMAP_CHECKPOINT_ENABLED', 'false').lower() == 'true'
+    SESSIONS_DIR = os.getenv('SESSIONS_DIR', '.sessions')
+    # Spool local de correos descargados: los que fallan se reprocesan desde disco
+    IMAP_SPOOL_ENABLED = os.getenv('IMAP_SPOOL_ENABLED', 'false').lower() == 'true'
+    IMAP_SPOOL_DIR = os.getenv('IMAP_SPOOL_DIR', os.path.join(SESSIONS_DIR, 'spool'))
+    IMAP_SPOOL_MAX_MB = int(os.getenv('IMAP_SPOOL_MAX_MB', '200'))  # Tamaño total máximo
+    IMAP_SPOOL_MAX_AGE_DAYS = int(os.getenv('IMAP_SPOOL_MAX_AGE_DAYS', '7'))  # Antigüedad máxima
+    # Clasificar los correos en el servidor (UID SEARCH por remitente/asunto) antes de descargarlos
+    IMAP_SEARCH_PLAN_ENABLED = os.getenv('IMAP_SEARCH_PLAN_ENABLED', 'false').lower() == 'true'
+    # Cola de correos fallidos: tras IMAP_MAX_ATTEMPTS fallos de extracción el correo se mueve a cuarentena
+    IMAP_MAX_ATTEMPTS = int(os.getenv('IMAP_MAX_ATTEMPTS', '5'))
+    IMAP_QUARANTINE_FOLDER = os.getenv('IMAP_QUARANTINE_FOLDER', 'cuarentena')
+    FAILURE_LEDGER_RETENTION_DAYS = int(os.getenv('FAILURE_LEDGER_RETENTION_DAYS', '30'))  # Días sin fallos antes de olvidar un registro
+    # Pipeline por etapas: extracción (CPU) y guardado en Supabase (red) en hilos propios
+    PIPELINE_ENABLED = os.getenv('PIPELINE_ENABLED', 'false').lower() == 'true'
+    PIPELINE_EXTRACT_WORKERS = int(os.getenv('PIPELINE_EXTRACT_WORKERS', '1'))
+    PIPELINE_PERSIST_WORKERS = int(os.getenv('PIPELINE_PERSIST_WORKERS', '4'))
+    PIPELINE_QUEUE_SIZE = int(os.getenv('PIPELINE_QUEUE_SIZE', '8'))  # Correos en espera por etapa
+    # Modo asyncio (main.py --mode async): solicitudes simultáneas a Supabase y correos en proceso
+    ASYNC_SUPABASE_CONCURRENCY = int(os.getenv('ASYNC_SUPABASE_CONCURRENCY', '8'))
+    ASYNC_MAX_IN_FLIGHT = int(os.getenv('ASYNC_MAX_IN_FLIGHT', '32'))
+    # Parser de CFDI: 'lxml' (XPath precompilado), 'stream' (iterparse en una sola pasada,
+    # memoria constante con muchos conceptos o addendas grandes) o 'etree' (biblioteca estándar)
+    XML_PARSER_BACKEND = os.getenv('XML_PARSER_BACKEND', 'lxml').lower()
+    # Parseo de muchos XML de un mismo correo en procesos separados: procesos (vacío = núcleos - 1,
+    # máximo 4, que con un solo núcleo es 0; 0 desactiva), mínimo de XML para usar el pool y XML por tarea
+    XML_PARSE_POOL_WORKERS = int(os.getenv('XML_PARSE_POOL_WORKERS') or min(4, (os.cpu_count() or 1) - 1))
+    XML_PARSE_POOL_MIN_BATCH = int(os.getenv('XML_PARSE_POOL_MIN_BATCH', '16'))
+    XML_PARSE_POOL_CHUNK_SIZE = int(os.getenv('XML_PARSE_POOL_CHUNK_SIZE', '4'))
+    # Validación de cada XML contra el esquema XSD de su versión de CFDI antes de extraer los datos;
+    # directorio con cfdv40.xsd / cfdv33.xsd (vacío = esquemas incluidos en src/schemas)
+    XML_SCHEMA_VALIDATION = os.getenv('XML_SCHEMA_VALIDATION', 'false').lower() == 'true'
+    XML_SCHEMA_DIR = os.getenv('XML_SCHEMA_DIR', '')
+    # Verificación local del sello del emisor y del sello del SAT (requiere el paquete cryptography);
+    # directorio con los certificados del SAT (<NoCertificadoSAT>.cer) y certificados leídos en caché
+    SEAL_VERIFICATION = os.getenv('SEAL_VERIFICATION', 'false').lower() == 'true'
+    SEAL_CERT_DIR = os.getenv('SEAL_CERT_DIR', '')
+    SEAL_CERT_CACHE_SIZE = int(os.getenv('SEAL_CERT_CACHE_SIZE', '128'))
+    # Caché de XML ya parseados (por SHA-256 del adjunto) y de UUID que ya existen en Supabase; 0 desactiva
+    PARSE_CACHE_SIZE = int(os.getenv('PARSE_CACHE_SIZE', '256'))
+    PARSE_CACHE_UUIDS = int(os.getenv('PARSE_CACHE_UUIDS', '10000'))
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
 
     # Configuración de horarios
@@ -14,6 +14,9 @@ from .logger import logger
 class DepositProcessor:
     """Clase para procesar correos con instrucciones de depósito bancario"""
 
+    # Asunto de los correos de instrucción de depósito
+    DEPOSIT_SUBJECT = "Instrucción de depósito a tu cuenta"
+
     def __init__(self):
         """Inicializa el procesador de depósitos"""
         logger.info("Procesador de depósitos inicializado")
@@ -93,7 +96,18 @@ class DepositProcessor:
         logger.info(f"Subject original: {subject}")
         logger.info(f"Subject decodificado: {decoded_subject}")
 
-        return "Instrucción de depósito a tu cuenta" in decoded_subject
+        return self.DEPOSIT_SUBJECT in decoded_subject
+
+    def search_criteria(self) -> list:
+        """
+        Criterios de búsqueda IMAP equivalentes a is_deposit_email
+
+        El asunto lleva acentos, por lo que se busca con CHARSET UTF-8.
+
+        Returns:
+            Alternativas de (clave, valor) para SearchClass
+        """
+        return [[('SUBJECT', self.DEPOSIT_SUBJECT)]]
 
     def extract_deposit_info(self, msg: Message) -> Dict[str, Any]:
         """
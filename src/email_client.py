@@ -4,15 +4,118 @@ Módulo de conexión IMAP con Hostinger
 
 import imaplib
 import email.message
+import random
+import select
+import time
 from email.header import decode_header
-from typing import List, Tuple, Optional
+from typing import Callable, Dict, Iterator, List, Set, Tuple, Optional
 import ssl
 import re
 from .config import Config
 from .logger import logger
+from .message_structure import MessagePart, MessageStructure, parse_fetch_items
+from .fetch_pool import FetchPool
+from .folder_registry import FolderRegistry
+from .mailbox_checkpoint import MailboxCheckpoint
+from .message_spool import MessageSpool
+from .search_plan import SearchClass, SearchPlan
+
+# Cabecera de cada mensaje en una respuesta FETCH (ej: b'12 (UID 345 BODY[] {2048}')
+FETCH_UID_PATTERN = re.compile(rb'UID (\d+)')
+FETCH_LITERAL_PATTERN = re.compile(rb'(BODY\[[^\]]*\](?:<\d+>)?|RFC822(?:\.[A-Z]+)?) \{\d+\}$')
+FETCH_START_PATTERN = re.compile(rb'^\d+ \(')
+# Notificaciones de correo nuevo durante IDLE (RFC 2177)
+IDLE_NEW_MAIL_PATTERN = re.compile(rb'^\* \d+ (EXISTS|RECENT)', re.IGNORECASE)
+# Elementos de una respuesta STATUS (ej: b'INBOX (UIDNEXT 120 HIGHESTMODSEQ 900)')
+STATUS_ITEM_PATTERN = re.compile(rb'([A-Z]+) (\d+)')
+# Errores que indican que la sesión IMAP se perdió (BYE, TLS caído, socket cerrado)
+CONNECTION_ERRORS = (imaplib.IMAP4.abort, ssl.SSLError, OSError, EOFError)
+
+
+def build_uid_set(uids: List[bytes]) -> str:
+    """
+    Construye un conjunto de UIDs IMAP compacto (ej: '1:3,7,9:10')
+
+    Args:
+        uids: Lista de UIDs en bytes o str
+
+    Returns:
+        str: Conjunto de UIDs con rangos consecutivos colapsados
+    """
+    numbers = sorted({int(uid) for uid in uids})
+    ranges = []
+    start = prev = None
+    for number in numbers:
+        if start is None:
+            start = prev = number
+        elif number == prev + 1:
+            prev = number
+        else:
+            ranges.append(f"{start}:{prev}" if start != prev else str(start))
+            start = prev = number
+    if start is not None:
+        ranges.append(f"{start}:{prev}" if start != prev else str(start))
+    return ','.join(ranges)
+
+
+def parse_fetch_response(msg_data: list) -> List[Tuple[bytes, Dict[bytes, bytes]]]:
+    """
+    Agrupa la respuesta de un FETCH multi-mensaje por mensaje
+
+    imaplib devuelve una tupla (cabecera, literal) por cada literal y bytes
+    sueltos para el texto restante; el UID puede llegar antes o después del
+    literal.
+
+    Args:
+        msg_data: Datos devueltos por imaplib para UID FETCH
+
+    Returns:
+        List de tuplas (uid, {b'BODY[]': contenido, ...}) en el orden recibido
+    """
+    messages = []
+    current = None
+
+    for item in msg_data:
+        if isinstance(item, tuple):
+            head, literal = item[0], item[1]
+        elif isinstance(item, bytes):
+            head, literal = item, None
+        else:
+            continue
+
+        if FETCH_START_PATTERN.match(head):
+            current = {'uid': None, 'literals': {}}
+            messages.append(current)
+        if current is None:
+            continue
+
+        if current['uid'] is None:
+            uid_match = FETCH_UID_PATTERN.search(head)
+            if uid_match:
+                current['uid'] = uid_match.group(1)
+
+        if literal is not None:
+            key_match = FETCH_LITERAL_PATTERN.search(head)
+            key = key_match.group(1) if key_match else b'BODY[]'
+            current['literals'][key] = literal
+
+    return [(message['uid'], message['literals']) for message in messages if message['uid']]
+
 
 class EmailClient:
-    """Cliente para interactuar con servidor IMAP de Hostinger"""
+    """
+    Cliente para interactuar con servidor IMAP de Hostinger
+
+    Todas las operaciones sobre mensajes usan UIDs (UID SEARCH/FETCH/STORE/COPY)
+    en lugar de números de secuencia, ya que los UIDs permanecen válidos aunque
+    se expurgue el buzón. Los movimientos de carpeta se acumulan y se ejecutan
+    una sola vez al final del ciclo con flush_pending_moves().
+
+    La sesión se mantiene abierta entre ciclos: ensure_connected() verifica la
+    conexión con NOOP tras un periodo de inactividad y reconecta con espera
+    exponencial con jitter; el buzón solo se vuelve a seleccionar si cambia
+    el buzón o su UIDVALIDITY.
+    """
     
     def __init__(self):
         """Inicializa el cliente de correo"""
@@ -20,6 +123,21 @@ class EmailClient:
         self.connected = False
         # Dominios de correo considerados como banco
         self.bank_domains = ['@bb.com.mx', '@bb.com']
+        # Movimientos programados en el ciclo: UID -> carpeta destino en el servidor
+        self.pending_moves: Dict[bytes, str] = {}
+        # Carpetas del servidor, cargadas una vez por conexión
+        self.folder_registry = FolderRegistry()
+        # Estado de la sesión: buzón seleccionado, su UIDVALIDITY y último comando enviado
+        self.selected_mailbox: Optional[str] = None
+        self.uidvalidity: Optional[bytes] = None
+        self.last_activity = 0.0
+        self.reconnect_failures = 0
+        # Punto de control de INBOX: solo se buscan correos nuevos o modificados
+        self.checkpoint = MailboxCheckpoint('inbox') if Config.IMAP_CHECKPOINT_ENABLED else None
+        # UIDs confirmados en la revisión en curso (marcados como leídos o movidos)
+        self.acknowledged_uids = set()
+        # Copia local de los correos descargados de INBOX (se reintentan sin volver a descargarlos)
+        self.spool = MessageSpool() if Config.IMAP_SPOOL_ENABLED else None
     
     def connect(self) -> bool:
         """
@@ -28,6 +146,9 @@ class EmailClient:
         Returns:
             bool: True si la conexión es exitosa, False en caso contrario
         """
+        # Descartar la sesión anterior (si quedó abierta tras un error)
+        self._drop_connection()
+
         try:
             # Crear contexto SSL
             context = ssl.create_default_context()
@@ -42,6 +163,8 @@ class EmailClient:
             # Iniciar sesión
             self.imap_server.login(Config.IMAP_USER, Config.IMAP_PASSWORD)
             self.connected = True
+            self.folder_registry = FolderRegistry()
+            self.last_activity = time.monotonic()
             
             logger.info(f"Conexión exitosa al servidor IMAP {Config.IMAP_SERVER}")
             return True
@@ -55,87 +178,706 @@ class EmailClient:
         """Cierra la conexión con el servidor IMAP"""
         try:
             if self.imap_server and self.connected:
-                self.imap_server.close()
+                # Ejecutar los movimientos que aún estén pendientes
+                self.flush_pending_moves()
+                if self.selected_mailbox:
+                    self.imap_server.close()
                 self.imap_server.logout()
-                self.connected = False
                 logger.info("Conexión IMAP cerrada correctamente")
         except Exception as e:
             logger.error(f"Error al cerrar conexión IMAP: {str(e)}")
-    
-    def select_inbox(self) -> bool:
+        finally:
+            self.connected = False
+            self.selected_mailbox = None
+
+    def _drop_connection(self):
+        """Cierra el socket de una sesión perdida sin enviar comandos"""
+        if self.imap_server is not None:
+            try:
+                self.imap_server.shutdown()
+            except Exception:
+                pass
+        self.connected = False
+        self.selected_mailbox = None
+
+    def _handle_connection_error(self, error: Exception) -> bool:
         """
-        Selecciona la bandeja de entrada
-        
+        Marca la sesión como perdida si el error es de conexión
+
+        Args:
+            error: Excepción capturada al ejecutar un comando IMAP
+
         Returns:
-            bool: True si se seleccionó correctamente, False en caso contrario
+            bool: True si la conexión se perdió (no tiene caso seguir enviando comandos)
+        """
+        if isinstance(error, CONNECTION_ERRORS):
+            if self.connected:
+                logger.warning(f"Conexión IMAP perdida: {str(error)}")
+            self._drop_connection()
+            return True
+        return False
+
+    def _reconnect_delay(self) -> float:
+        """Espera antes del siguiente intento de conexión (exponencial con jitter)"""
+        if self.reconnect_failures == 0:
+            return 0.0
+        delay = min(Config.IMAP_RECONNECT_BACKOFF_MAX,
+                    Config.IMAP_RECONNECT_BACKOFF_BASE * 2 ** (self.reconnect_failures - 1))
+        # Jitter: entre la mitad y el total para no reconectar en sincronía con otros clientes
+        return random.uniform(delay / 2, delay)
+
+    def ensure_connected(self) -> bool:
+        """
+        Garantiza una sesión IMAP autenticada reutilizando la existente
+
+        Si la sesión lleva más de IMAP_KEEPALIVE_INTERVAL segundos sin comandos
+        se verifica con NOOP. Si se perdió, se reconecta hasta
+        IMAP_RECONNECT_MAX_ATTEMPTS veces con espera exponencial con jitter;
+        la espera sigue creciendo entre llamadas mientras el servidor no responda.
+
+        Returns:
+            bool: True si hay una sesión utilizable
+        """
+        if self.connected and self.keepalive():
+            return True
+
+        for attempt in range(1, Config.IMAP_RECONNECT_MAX_ATTEMPTS + 1):
+            delay = self._reconnect_delay()
+            if delay:
+                logger.info(f"Reintentando conexión IMAP en {delay:.1f}s "
+                            f"(intento {attempt}/{Config.IMAP_RECONNECT_MAX_ATTEMPTS})")
+                time.sleep(delay)
+
+            if self.connect():
+                self.reconnect_failures = 0
+                return True
+            self.reconnect_failures += 1
+
+        logger.error(f"No se pudo restablecer la conexión IMAP tras {Config.IMAP_RECONNECT_MAX_ATTEMPTS} intentos")
+        return False
+
+    def keepalive(self, force: bool = False) -> bool:
+        """
+        Envía NOOP si la sesión lleva inactiva IMAP_KEEPALIVE_INTERVAL segundos
+
+        Evita que el servidor o un firewall intermedio cierren la conexión entre
+        ciclos y detecta sesiones caídas antes de usarlas.
+
+        Args:
+            force: Enviar NOOP aunque no haya pasado el intervalo
+
+        Returns:
+            bool: True si la sesión sigue activa
         """
+        if not self.connected:
+            return False
+        if not force and time.monotonic() - self.last_activity < Config.IMAP_KEEPALIVE_INTERVAL:
+            return True
+
         try:
-            if not self.connected:
-                if not self.connect():
-                    return False
-            
-            status, messages = self.imap_server.select('INBOX')
-            if status == 'OK':
-                logger.info("Bandeja de entrada seleccionada correctamente")
+            status, _ = self.imap_server.noop()
+            self.last_activity = time.monotonic()
+            if status != 'OK':
+                logger.warning(f"NOOP respondió {status}, reconectando")
+                self._drop_connection()
+                return False
+            logger.debug("Keepalive IMAP (NOOP) enviado")
+            return True
+        except Exception as e:
+            self._handle_connection_error(e)
+            self._drop_connection()
+            return False
+
+    def select_mailbox(self, mailbox: str = 'INBOX') -> bool:
+        """
+        Selecciona un buzón solo si no es el que ya está seleccionado
+
+        Un buzón seleccionado refleja los correos nuevos en cada SEARCH, por lo
+        que no hace falta volver a seleccionarlo en cada ciclo. Si el servidor
+        reporta otro UIDVALIDITY, los UIDs anteriores dejan de ser válidos y se
+        descartan los movimientos pendientes.
+
+        Args:
+            mailbox: Nombre del buzón en el servidor
+
+        Returns:
+            bool: True si el buzón queda seleccionado
+        """
+        if not self.ensure_connected():
+            return False
+
+        # UIDVALIDITY no solicitado (ej: tras NOOP) indica que el buzón se recreó
+        if self.selected_mailbox == mailbox:
+            self._discard_untagged_responses()
+            _, data = self.imap_server.response('UIDVALIDITY')
+            if not data or data[-1] is None or data[-1] == self.uidvalidity:
                 return True
-            else:
-                logger.error(f"Error al seleccionar bandeja de entrada: {status}")
+            logger.warning(f"UIDVALIDITY de {mailbox} cambió, seleccionando de nuevo")
+
+        try:
+            status, messages = self.imap_server.select(mailbox)
+            self.last_activity = time.monotonic()
+            if status != 'OK':
+                logger.error(f"Error al seleccionar {mailbox}: {status}")
+                self.selected_mailbox = None
                 return False
-                
+
+            _, data = self.imap_server.response('UIDVALIDITY')
+            uidvalidity = data[-1] if data and data[-1] is not None else None
+            if self.uidvalidity is not None and uidvalidity != self.uidvalidity:
+                logger.warning(f"UIDVALIDITY cambió ({self.uidvalidity} -> {uidvalidity}); "
+                               f"se descartan {len(self.pending_moves)} movimientos pendientes")
+                self.pending_moves = {}
+
+            self.selected_mailbox = mailbox
+            self.uidvalidity = uidvalidity
+            logger.info(f"Buzón {mailbox} seleccionado (UIDVALIDITY {uidvalidity})")
+            return True
+
         except Exception as e:
-            logger.error(f"Error al seleccionar bandeja de entrada: {str(e)}")
+            self._handle_connection_error(e)
+            logger.error(f"Error al seleccionar {mailbox}: {str(e)}")
             return False
+
+    def _discard_untagged_responses(self):
+        """
+        Descarta notificaciones no solicitadas acumuladas por imaplib
+
+        En una sesión persistente imaplib guarda cada '* n EXISTS', '* n EXPUNGE'
+        o '* n FETCH (FLAGS ...)' recibido; sin limpiarlas crecen en cada ciclo.
+        """
+        for name in ('EXISTS', 'RECENT', 'EXPUNGE', 'FETCH'):
+            self.imap_server.response(name)
+
+    def select_inbox(self) -> bool:
+        """
+        Selecciona la bandeja de entrada (sin re-SELECT si ya está seleccionada)
+        
+        Returns:
+            bool: True si se seleccionó correctamente, False en caso contrario
+        """
+        return self.select_mailbox('INBOX')
     
-    def get_unread_emails(self) -> List[Tuple[bytes, email.message.Message]]:
+    def get_unread_emails(self, part_selector: Optional[Callable[[MessageStructure], List[MessagePart]]] = None,
+                          search_plan: Optional[SearchPlan] = None
+                          ) -> List[Tuple[bytes, email.message.Message]]:
         """
         Obtiene correos no leídos de la bandeja de entrada
         
+        Mantiene todos los correos en memoria; para procesar muchos correos
+        usar iter_unread_emails().
+
+        Args:
+            part_selector: Función que elige las partes MIME a descargar a partir
+                de la estructura del correo; solo se usa con IMAP_FETCH_MODE='structure'
+            search_plan: Plan de búsqueda para clasificar los correos en el servidor
+
         Returns:
             List de tuplas (uid, message) con los correos no leídos
         """
+        email_list = list(self.iter_unread_emails(part_selector, search_plan))
+        logger.info(f"Se encontraron {len(email_list)} correos no leídos")
+        return email_list
+
+    def iter_unread_emails(self, part_selector: Optional[Callable[[MessageStructure], List[MessagePart]]] = None,
+                           search_plan: Optional[SearchPlan] = None
+                           ) -> Iterator[Tuple[bytes, email.message.Message]]:
+        """
+        Entrega los correos no leídos uno por uno conforme se descargan
+
+        Solo se mantiene en memoria el lote actual (IMAP_FETCH_CHUNK_SIZE correos),
+        de modo que el primer correo se procesa sin esperar a que se descargue el
+        último. Entre lotes se pueden emitir otros comandos (STORE) porque
+        los UIDs no cambian hasta flush_pending_moves().
+
+        Con search_plan, el servidor agrupa primero los UIDs por tipo de correo
+        (UID SEARCH por remitente/asunto) y de los tipos que solo requieren la
+        cabecera no se descarga el cuerpo.
+
+        Args:
+            part_selector: Función que elige las partes MIME a descargar a partir
+                de la estructura del correo; solo se usa con IMAP_FETCH_MODE='structure'
+            search_plan: Plan de búsqueda para clasificar los correos en el servidor
+
+        Yields:
+            Tuplas (uid, message), agrupadas por tipo y los más recientes primero
+        """
         try:
-            if not self.connected:
-                if not self.connect():
-                    return []
-            
             if not self.select_inbox():
-                return []
-            
-            # Buscar correos no leídos
-            status, email_ids = self.imap_server.search(None, 'UNSEEN')
-            
-            if status != 'OK':
-                logger.error("Error al buscar correos no leídos")
-                return []
+                return
+
+            if self.spool:
+                self.spool.evict()
             
-            email_list = []
-            email_id_list = email_ids[0].split()
+            # Buscar correos no leídos (por UID, estable ante expurgaciones); con punto
+            # de control solo los posteriores al último UID revisado o los pendientes
+            if self.checkpoint:
+                uid_list = self.search_new_uids(self.checkpoint, 'UNSEEN')
+            else:
+                uid_list = self.search_uids('UNSEEN')
+            logger.info(f"Se encontraron {len(uid_list)} correos no leídos")
 
             # Invertir el orden para procesar correos más recientes primero
-            email_id_list.reverse()
+            uid_list.reverse()
 
-            for email_id in email_id_list:
-                try:
-                    # Obtener el correo sin marcar como leído (usando PEEK)
-                    status, msg_data = self.imap_server.fetch(email_id, '(BODY.PEEK[])')
-                    
-                    if status == 'OK':
-                        # Parsear el correo
-                        raw_email = msg_data[0][1]
-                        msg = email.message_from_bytes(raw_email)
-                        email_list.append((email_id, msg))
-                        
-                except Exception as e:
-                    logger.error(f"Error al procesar correo {email_id}: {str(e)}")
-                    continue
-            
-            logger.info(f"Se encontraron {len(email_list)} correos no leídos")
-            return email_list
-            
         except Exception as e:
+            self._handle_connection_error(e)
             logger.error(f"Error al obtener correos no leídos: {str(e)}")
-            return []
+            return
+
+        if search_plan and uid_list:
+            for search_class, class_uids in search_plan.bucket(self, uid_list):
+                if search_class and search_class.header_only:
+                    yield from self._fetch_headers_confirmed(class_uids, search_class, part_selector)
+                else:
+                    yield from self._fetch_bodies(class_uids, part_selector)
+        else:
+            yield from self._fetch_bodies(uid_list, part_selector)
+
+    def _fetch_bodies(self, uids: List[bytes],
+                      part_selector: Optional[Callable[[MessageStructure], List[MessagePart]]]
+                      ) -> Iterator[Tuple[bytes, email.message.Message]]:
+        """Descarga los correos completos o sus partes necesarias según IMAP_FETCH_MODE"""
+        # Descargar en lotes en lugar de un FETCH por correo
+        if Config.IMAP_FETCH_MODE == 'structure' and part_selector:
+            yield from self.fetch_messages_by_structure(uids, part_selector)
+        else:
+            yield from self.fetch_messages(uids)
+
+    def _fetch_headers_confirmed(self, uids: List[bytes], search_class: SearchClass,
+                                 part_selector: Optional[Callable[[MessageStructure], List[MessagePart]]]
+                                 ) -> Iterator[Tuple[bytes, email.message.Message]]:
+        """
+        Descarga solo la cabecera de los correos de un tipo que no requiere el cuerpo
+
+        Los correos cuya cabecera no confirma el tipo (la búsqueda del servidor
+        puede diferir de las reglas del cliente) se descargan completos.
+        """
+        refetch = []
+        for uid, msg in self.fetch_messages(uids, items='BODY.PEEK[HEADER]'):
+            if search_class.confirm and not search_class.confirm(msg):
+                refetch.append(uid)
+                continue
+            yield uid, msg
+
+        if refetch:
+            logger.debug(f"{len(refetch)} correos de '{search_class.name}' no confirmados, descargando completos")
+            yield from self._fetch_bodies(refetch, part_selector)
     
+    def search_uids(self, *criteria: str) -> List[bytes]:
+        """
+        Busca correos en el buzón seleccionado y devuelve sus UIDs
+
+        Args:
+            criteria: Criterios de búsqueda IMAP (ej: 'UNSEEN', 'ALL')
+
+        Returns:
+            List de UIDs (bytes) en orden ascendente
+        """
+        return self._search(*criteria) or []
+
+    def _search(self, *criteria: str, charset: Optional[str] = None) -> Optional[List[bytes]]:
+        """UID SEARCH que distingue un error (None) de una búsqueda sin resultados"""
+        charset_args = ('CHARSET', charset) if charset else (None,)
+        status, data = self.imap_server.uid('SEARCH', *charset_args, *criteria)
+        self.last_activity = time.monotonic()
+        if status != 'OK':
+            logger.error(f"Error al buscar correos ({' '.join(criteria)}): {data}")
+            return None
+        return data[0].split() if data and data[0] else []
+
+    def mailbox_status(self, mailbox: str, items: List[str]) -> Dict[str, int]:
+        """
+        Consulta contadores del buzón con STATUS (ej: UIDNEXT, HIGHESTMODSEQ)
+
+        Args:
+            mailbox: Nombre del buzón en el servidor
+            items: Elementos a consultar
+
+        Returns:
+            Dict {elemento: valor}; vacío si el servidor no respondió
+        """
+        try:
+            status, data = self.imap_server.status(mailbox, f"({' '.join(items)})")
+            self.last_activity = time.monotonic()
+            if status != 'OK' or not data or not data[-1]:
+                logger.warning(f"STATUS de {mailbox} falló: {data}")
+                return {}
+            return {name.decode(): int(value) for name, value in STATUS_ITEM_PATTERN.findall(data[-1])}
+        except Exception as e:
+            if self._handle_connection_error(e):
+                raise
+            logger.warning(f"Error al consultar STATUS de {mailbox}: {str(e)}")
+            return {}
+
+    def search_new_uids(self, checkpoint: MailboxCheckpoint, *criteria: str) -> List[bytes]:
+        """
+        Busca solo entre correos nuevos, pendientes o modificados desde el punto de control
+
+        Se limita la búsqueda a 'UID pendientes,n+1:*' y, si el servidor soporta
+        CONDSTORE (RFC 7162), también a los correos cuyas banderas cambiaron
+        desde el HIGHESTMODSEQ guardado (ej: un correo marcado de nuevo como no
+        leído). Si cambió el UIDVALIDITY o no hay punto de control, se revisa
+        todo el buzón. El resultado se confirma con commit_checkpoint().
+
+        Args:
+            checkpoint: Punto de control del buzón seleccionado
+            criteria: Criterios de búsqueda IMAP (ej: 'UNSEEN', 'ALL')
+
+        Returns:
+            List de UIDs (bytes) en orden ascendente
+        """
+        uidvalidity = self.uidvalidity.decode() if self.uidvalidity else None
+        if not checkpoint.matches(uidvalidity):
+            if checkpoint.uidvalidity is not None:
+                logger.warning(f"UIDVALIDITY cambió ({checkpoint.uidvalidity} -> {uidvalidity}); "
+                               f"se revisará todo el buzón")
+            checkpoint.reset(uidvalidity)
+
+        condstore = 'CONDSTORE' in self.imap_server.capabilities
+        # Tomar UIDNEXT/HIGHESTMODSEQ antes de buscar: lo que llegue después se verá en el siguiente ciclo
+        status = self.mailbox_status(self.selected_mailbox or 'INBOX',
+                                     ['UIDNEXT', 'HIGHESTMODSEQ'] if condstore else ['UIDNEXT'])
+        self.acknowledged_uids = set()
+
+        if checkpoint.last_uid:
+            uid_set = ','.join(filter(None, [build_uid_set(checkpoint.pending_uids) if checkpoint.pending_uids else '',
+                                             f'{checkpoint.last_uid + 1}:*']))
+            if condstore and checkpoint.highestmodseq:
+                scope = ['OR', 'UID', uid_set, 'MODSEQ', str(checkpoint.highestmodseq + 1)]
+            else:
+                scope = ['UID', uid_set]
+            uids = self._search(*criteria, *scope)
+            if uids is None:
+                return []
+
+            # 'n+1:*' siempre incluye el último correo aunque su UID sea menor a n+1
+            pending = set(checkpoint.pending_uids)
+            if not (condstore and checkpoint.highestmodseq):
+                uids = [uid for uid in uids if int(uid) > checkpoint.last_uid or uid in pending]
+            logger.debug(f"Búsqueda incremental desde UID {checkpoint.last_uid + 1} "
+                         f"({len(pending)} pendientes): {len(uids)} correos")
+        else:
+            uids = self._search(*criteria)
+            if uids is None:
+                return []
+
+        checkpoint.begin_scan(uids, status.get('UIDNEXT'), status.get('HIGHESTMODSEQ'))
+        return uids
+
+    def search_class_uids(self, search_class: SearchClass, uids: List[bytes]) -> Optional[Set[bytes]]:
+        """
+        Busca en el servidor cuáles de los UIDs pertenecen a un tipo de correo
+
+        Args:
+            search_class: Tipo de correo con sus criterios de búsqueda
+            uids: UIDs candidatos (limitan la búsqueda)
+
+        Returns:
+            Set de UIDs que cumplen el tipo, o None si alguna búsqueda falló
+        """
+        scope = ['UID', build_uid_set(uids)]
+        matched: Set[bytes] = set()
+
+        try:
+            for keys, literal in search_class.build_searches():
+                if literal is not None:
+                    # Valores con acentos: CHARSET UTF-8 y el valor como literal {n}
+                    self.imap_server.literal = literal
+                    result = self._search(*scope, *keys, charset='UTF-8')
+                else:
+                    result = self._search(*scope, *keys)
+                if result is None:
+                    return None
+                matched.update(result)
+        except Exception as e:
+            if self._handle_connection_error(e):
+                raise
+            logger.error(f"Error al buscar correos de '{search_class.name}': {str(e)}")
+            return None
+        finally:
+            self.imap_server.literal = None
+
+        return matched
+
+    def commit_checkpoint(self, checkpoint: Optional[MailboxCheckpoint] = None,
+                          pending_uids: Optional[List[bytes]] = None):
+        """
+        Confirma la revisión en curso en el punto de control
+
+        Args:
+            checkpoint: Punto de control a confirmar (default el de INBOX)
+            pending_uids: UIDs que deben volver a buscarse; por default los
+                encontrados que no se marcaron como leídos ni se movieron
+        """
+        checkpoint = checkpoint or self.checkpoint
+        if not checkpoint:
+            return
+        if pending_uids is None:
+            pending_uids = [uid for uid in checkpoint.scan_uids if uid not in self.acknowledged_uids]
+        checkpoint.commit(pending_uids)
+
+    def fetch_messages(self, uids: List[bytes], chunk_size: Optional[int] = None,
+                       items: str = 'BODY.PEEK[]') -> Iterator[Tuple[bytes, email.message.Message]]:
+        """
+        Descarga correos por lotes de UIDs y los entrega conforme llegan
+
+        Cada lote se pide con un solo UID FETCH sobre un conjunto de UIDs
+        (ej: '101:150,155'), evitando un viaje de ida y vuelta por correo.
+        Los correos completos de INBOX se leen del spool local si ya se
+        descargaron en un ciclo anterior, y se guardan en él al descargarlos.
+        Con al menos IMAP_FETCH_POOL_MIN_UIDS correos, los lotes se reparten
+        entre varias conexiones de solo lectura (FetchPool).
+
+        Args:
+            uids: UIDs a descargar, en el orden en que se desean recibir
+            chunk_size: Cantidad de UIDs por FETCH (default Config.IMAP_FETCH_CHUNK_SIZE)
+            items: Elemento a descargar sin marcar como leído (ej: 'BODY.PEEK[HEADER]')
+
+        Yields:
+            Tuplas (uid, message) en el orden de uids
+        """
+        chunk_size = chunk_size or Config.IMAP_FETCH_CHUNK_SIZE
+        spool = self._active_spool() if items == 'BODY.PEEK[]' else None
+        chunks = [uids[start:start + chunk_size] for start in range(0, len(uids), chunk_size)]
+
+        with self._open_fetch_pool(len(uids)) as pool:
+            if pool.readers:
+                results = pool.map(lambda reader, chunk: self._fetch_chunk(chunk, items, spool, reader), chunks)
+            else:
+                results = (None for _ in chunks)
+
+            for chunk, fetched in zip(chunks, results):
+                if fetched is None:
+                    # Sin pool o falló la conexión de lectura: descargar con la conexión principal
+                    fetched = self._fetch_chunk(chunk, items, spool)
+                    if fetched is None:
+                        return
+
+                # El servidor responde en orden ascendente; respetar el orden pedido
+                for uid in chunk:
+                    raw_email = fetched.pop(uid, None)
+                    if raw_email is None:
+                        continue
+                    try:
+                        yield uid, email.message_from_bytes(raw_email)
+                    except Exception as e:
+                        logger.error(f"Error al procesar correo UID {uid}: {str(e)}")
+
+    def _open_fetch_pool(self, uid_count: int) -> FetchPool:
+        """
+        Abre conexiones de solo lectura si la descarga es grande
+
+        Args:
+            uid_count: Cantidad de correos a descargar
+
+        Returns:
+            FetchPool (sin conexiones si la descarga es pequeña o no se pudieron abrir)
+        """
+        pool = FetchPool()
+        if (pool.size > 0 and uid_count >= Config.IMAP_FETCH_POOL_MIN_UIDS and
+                self.selected_mailbox and self.uidvalidity):
+            pool.open(self.selected_mailbox, self.uidvalidity)
+        return pool
+
+    def _fetch_chunk(self, chunk: List[bytes], items: str, spool: Optional[MessageSpool],
+                     reader: Optional[imaplib.IMAP4] = None) -> Optional[Dict[bytes, bytes]]:
+        """
+        Descarga un lote de correos (leyendo primero del spool)
+
+        Args:
+            chunk: UIDs del lote
+            items: Elemento a descargar (ej: 'BODY.PEEK[]')
+            spool: Spool a usar (None para no usarlo)
+            reader: Conexión de solo lectura del pool; sin ella se usa la conexión
+                principal. Los errores de una conexión de lectura se propagan
+
+        Returns:
+            Dict uid -> bytes del lote, o None si se perdió la conexión principal
+        """
+        fetched = {}
+        if spool:
+            for uid in chunk:
+                raw_email = spool.get(self.uidvalidity, uid)
+                if raw_email is not None:
+                    fetched[uid] = raw_email
+
+        missing = [uid for uid in chunk if uid not in fetched]
+        if not missing:
+            return fetched
+
+        try:
+            connection = reader or self.imap_server
+            status, msg_data = connection.uid('FETCH', build_uid_set(missing), f'(UID {items})')
+            if reader is None:
+                self.last_activity = time.monotonic()
+            if status != 'OK':
+                # Los correos leídos del spool se entregan de todos modos
+                logger.error(f"Error al descargar lote de {len(missing)} correos: {msg_data}")
+                return fetched
+
+            for uid, literals in parse_fetch_response(msg_data):
+                raw_email = next(iter(literals.values()), None)
+                if raw_email is not None:
+                    fetched[uid] = raw_email
+                    if spool:
+                        spool.put(self.uidvalidity, uid, raw_email)
+
+            logger.debug(f"Lote de {len(fetched)}/{len(chunk)} correos descargado "
+                         f"({len(chunk) - len(missing)} del spool)")
+            return fetched
+
+        except Exception as e:
+            if reader is not None:
+                raise
+            logger.error(f"Error al descargar lote de correos: {str(e)}")
+            if self._handle_connection_error(e):
+                return None
+            return fetched
+
+    def _active_spool(self) -> Optional[MessageSpool]:
+        """Spool utilizable para el buzón seleccionado (solo INBOX con UIDVALIDITY conocido)"""
+        if self.spool and self.uidvalidity and self.selected_mailbox == 'INBOX':
+            return self.spool
+        return None
+
+    def fetch_message_structures(self, uids: List[bytes], chunk_size: Optional[int] = None
+                                 ) -> Iterator[MessageStructure]:
+        """
+        Descarga por lotes solo ENVELOPE y BODYSTRUCTURE de los correos
+
+        Args:
+            uids: UIDs a consultar, en el orden deseado
+            chunk_size: Cantidad de UIDs por FETCH (default Config.IMAP_FETCH_CHUNK_SIZE)
+
+        Yields:
+            MessageStructure de cada correo en el orden de uids
+        """
+        chunk_size = chunk_size or Config.IMAP_FETCH_CHUNK_SIZE
+
+        for start in range(0, len(uids), chunk_size):
+            chunk = uids[start:start + chunk_size]
+            try:
+                status, msg_data = self.imap_server.uid('FETCH', build_uid_set(chunk),
+                                                        '(UID ENVELOPE BODYSTRUCTURE)')
+                self.last_activity = time.monotonic()
+                if status != 'OK':
+                    logger.error(f"Error al descargar estructura de {len(chunk)} correos: {msg_data}")
+                    continue
+
+                structures = {}
+                for items in parse_fetch_items(msg_data):
+                    uid = items[b'UID']
+                    structures[uid] = MessageStructure(uid, items.get(b'ENVELOPE'), items.get(b'BODYSTRUCTURE'))
+
+            except Exception as e:
+                logger.error(f"Error al descargar estructura de correos: {str(e)}")
+                if self._handle_connection_error(e):
+                    return
+                continue
+
+            for uid in chunk:
+                if uid in structures:
+                    yield structures.pop(uid)
+
+    def fetch_messages_by_structure(self, uids: List[bytes],
+                                    part_selector: Callable[[MessageStructure], List[MessagePart]],
+                                    chunk_size: Optional[int] = None
+                                    ) -> Iterator[Tuple[bytes, email.message.Message]]:
+        """
+        Descarga en dos fases: primero la estructura y luego solo las partes necesarias
+
+        La primera fase obtiene ENVELOPE + BODYSTRUCTURE; part_selector decide qué
+        secciones MIME se necesitan (ej: solo el XML o solo el cuerpo HTML). El
+        mensaje entregado contiene la cabecera original y únicamente esas partes.
+
+        Args:
+            uids: UIDs a descargar, en el orden deseado
+            part_selector: Función que recibe la estructura y devuelve las partes a descargar
+            chunk_size: Cantidad de UIDs por FETCH (default Config.IMAP_FETCH_CHUNK_SIZE)
+
+        Yields:
+            Tuplas (uid, message) en el orden de uids
+        """
+        chunk_size = chunk_size or Config.IMAP_FETCH_CHUNK_SIZE
+
+        for start in range(0, len(uids), chunk_size):
+            chunk = uids[start:start + chunk_size]
+
+            # Fase 1: clasificar con la estructura y agrupar por secciones requeridas
+            groups: Dict[Tuple[str, ...], List[bytes]] = {}
+            for structure in self.fetch_message_structures(chunk, chunk_size):
+                try:
+                    parts = part_selector(structure)
+                except Exception as e:
+                    logger.error(f"Error al clasificar correo UID {structure.uid}: {str(e)}")
+                    continue
+
+                if parts and not structure.is_multipart:
+                    # Mensaje de una sola parte: el cuerpo es todo el mensaje
+                    sections: Tuple[str, ...] = ('',)
+                else:
+                    sections = tuple(part.section for part in parts)
+                groups.setdefault(sections, []).append(structure.uid)
+
+                logger.debug(f"Correo UID {structure.uid}: secciones {sections or ('HEADER',)} "
+                             f"de {structure.size} bytes totales")
+
+            # Fase 2: descargar solo cabecera + secciones, un FETCH por grupo
+            fetched: Dict[bytes, email.message.Message] = {}
+            for sections, group_uids in groups.items():
+                if sections == ('',):
+                    items = 'BODY.PEEK[]'
+                else:
+                    items = ' '.join(['BODY.PEEK[HEADER]'] + [
+                        f'BODY.PEEK[{section}.MIME] BODY.PEEK[{section}]' for section in sections
+                    ])
+                try:
+                    status, msg_data = self.imap_server.uid('FETCH', build_uid_set(group_uids), f'(UID {items})')
+                    self.last_activity = time.monotonic()
+                    if status != 'OK':
+                        logger.error(f"Error al descargar partes de {len(group_uids)} correos: {msg_data}")
+                        continue
+
+                    for fetch_items in parse_fetch_items(msg_data):
+                        fetched[fetch_items[b'UID']] = self._build_partial_message(fetch_items, sections)
+
+                except Exception as e:
+                    logger.error(f"Error al descargar partes de correos: {str(e)}")
+                    if self._handle_connection_error(e):
+                        return
+                    continue
+
+            for uid in chunk:
+                msg = fetched.pop(uid, None)
+                if msg is not None:
+                    yield uid, msg
+
+    def _build_partial_message(self, fetch_items: Dict[bytes, object],
+                               sections: Tuple[str, ...]) -> email.message.Message:
+        """
+        Arma un mensaje con la cabecera original y solo las partes descargadas
+
+        Args:
+            fetch_items: Elementos FETCH de un correo (BODY[HEADER], BODY[n.MIME], BODY[n])
+            sections: Secciones MIME solicitadas
+
+        Returns:
+            email.message.Message equivalente para los procesadores existentes
+        """
+        if sections == ('',):
+            return email.message_from_bytes(fetch_items.get(b'BODY[]') or b'')
+
+        msg = email.message_from_bytes(fetch_items.get(b'BODY[HEADER]') or b'')
+        if sections:
+            parts = []
+            for section in sections:
+                mime_header = fetch_items.get(f'BODY[{section}.MIME]'.encode()) or b''
+                body = fetch_items.get(f'BODY[{section}]'.encode()) or b''
+                parts.append(email.message_from_bytes(mime_header + body))
+            msg.set_payload(parts)
+        return msg
+
     def get_xml_attachments(self, msg: 'email.message.Message') -> List[bytes]:
         """
         Extrae archivos XML adjuntos de un correo
@@ -179,7 +921,7 @@ class EmailClient:
         Marca un correo como leído
         
         Args:
-            email_id: ID del correo a marcar como leído
+            email_id: UID del correo a marcar como leído
             
         Returns:
             bool: True si se marcó correctamente, False en caso contrario
@@ -189,11 +931,19 @@ class EmailClient:
                 return False
             
             # Marcar como leído
-            self.imap_server.store(email_id, '+FLAGS', '\\Seen')
-            logger.debug(f"Correo {email_id} marcado como leído")
+            status, result = self.imap_server.uid('STORE', email_id, '+FLAGS', '\\Seen')
+            self.last_activity = time.monotonic()
+            if status != 'OK':
+                logger.error(f"Error al marcar correo UID {email_id} como leído: {result}")
+                return False
+            self.acknowledged_uids.add(email_id)
+            if self._active_spool():
+                self.spool.discard(self.uidvalidity, [email_id])
+            logger.debug(f"Correo UID {email_id} marcado como leído")
             return True
             
         except Exception as e:
+            self._handle_connection_error(e)
             logger.error(f"Error al marcar correo como leído: {str(e)}")
             return False
     
@@ -213,27 +963,39 @@ class EmailClient:
             if not from_header:
                 return False
 
-            # Extraer dirección de correo del remitente
-            # El formato puede ser "Nombre <correo@dominio.com>" o "correo@dominio.com"
-            email_match = re.search(r'<([^>]+)>', from_header)
-            if email_match:
-                email_addr = email_match.group(1).lower()
-            else:
-                # Si no hay formato <>, tomar todo el texto como dirección
-                email_addr = from_header.lower().strip()
-
-            # Verificar si el dominio coincide con los dominios del banco
-            for domain in self.bank_domains:
-                if domain in email_addr:
-                    logger.info(f"Correo identificado como bancario: {email_addr}")
-                    return True
-
-            return False
+            return self.is_bank_address(from_header)
 
         except Exception as e:
             logger.error(f"Error al identificar correo bancario: {str(e)}")
             return False
 
+    def is_bank_address(self, from_header: str) -> bool:
+        """
+        Identifica si una dirección de remitente pertenece a un dominio del banco
+
+        Args:
+            from_header: Remitente en formato "Nombre <correo@dominio.com>" o "correo@dominio.com"
+
+        Returns:
+            bool: True si el remitente es del banco, False en caso contrario
+        """
+        # Extraer dirección de correo del remitente
+        # El formato puede ser "Nombre <correo@dominio.com>" o "correo@dominio.com"
+        email_match = re.search(r'<([^>]+)>', from_header)
+        if email_match:
+            email_addr = email_match.group(1).lower()
+        else:
+            # Si no hay formato <>, tomar todo el texto como dirección
+            email_addr = from_header.lower().strip()
+
+        # Verificar si el dominio coincide con los dominios del banco
+        for domain in self.bank_domains:
+            if domain in email_addr:
+                logger.info(f"Correo identificado como bancario: {email_addr}")
+                return True
+
+        return False
+
     def get_email_info(self, msg: 'email.message.Message') -> dict:
         """
         Extrae información básica del correo
@@ -279,36 +1041,29 @@ class EmailClient:
             bool: True si se creó o ya existe, False en caso contrario
         """
         try:
-            if not self.connected:
-                if not self.connect():
-                    return False
-
-            # Listar carpetas existentes
-            status, folders = self.imap_server.list()
-            if status != 'OK':
-                logger.error("Error al listar carpetas")
+            if not self.ensure_connected():
                 return False
 
-            # Verificar si la carpeta ya existe
-            for folder in folders:
-                folder_bytes = folder.decode() if isinstance(folder, bytes) else folder
-
-                # Verificar si es la carpeta que buscamos (con o sin prefijo INBOX.)
-                if folder_name.lower() in folder_bytes.lower() and ('INBOX.' in folder_bytes or folder_name.lower() in folder_bytes.split()[-1].lower()):
-                    logger.info(f"La carpeta '{folder_name}' ya existe como: '{folder_bytes}'")
-                    return True
+            # Verificar si la carpeta ya existe (un solo LIST por conexión)
+            existing_folder = self.folder_registry.resolve(self.imap_server, folder_name)
+            if existing_folder:
+                logger.info(f"La carpeta '{folder_name}' ya existe como: '{existing_folder}'")
+                return True
 
-            # Crear la carpeta
-            logger.info(f"Creando carpeta '{folder_name}'...")
-            status, result = self.imap_server.create(folder_name)
+            # Crear la carpeta con el delimitador y prefijo del servidor
+            server_name = self.folder_registry.to_server_name(folder_name)
+            logger.info(f"Creando carpeta '{server_name}'...")
+            status, result = self.imap_server.create(server_name)
+            self.folder_registry.invalidate()
             if status == 'OK':
-                logger.info(f"Carpeta '{folder_name}' creada exitosamente")
+                logger.info(f"Carpeta '{server_name}' creada exitosamente")
                 return True
             else:
-                logger.error(f"Error al crear carpeta {folder_name}: {result}")
+                logger.error(f"Error al crear carpeta {server_name}: {result}")
                 return False
 
         except Exception as e:
+            self._handle_connection_error(e)
             logger.error(f"Error al crear carpeta {folder_name}: {str(e)}")
             import traceback
             logger.error(f"Traceback: {traceback.format_exc()}")
@@ -316,100 +1071,277 @@ class EmailClient:
 
     def move_email_to_folder(self, email_id: bytes, folder_name: str) -> bool:
         """
-        Mueve un correo a una carpeta específica
+        Programa el movimiento de un correo a una carpeta específica
+
+        El correo queda en la cola del ciclo y se mueve junto con los demás
+        correos de la misma carpeta en flush_pending_moves(), con un solo
+        UID MOVE (o COPY + STORE + UID EXPUNGE) por carpeta destino.
 
         Args:
-            email_id: ID del correo a mover
+            email_id: UID del correo a mover
             folder_name: Nombre de la carpeta destino
 
         Returns:
-            bool: True si se movió correctamente, False en caso contrario
+            bool: True si la carpeta existe y el movimiento quedó programado
         """
         try:
-            import re
             if not self.connected:
                 logger.error("No hay conexión IMAP activa para mover correo")
                 return False
 
-            # Seleccionar INBOX para asegurar que estamos en la carpeta correcta
-            self.imap_server.select('INBOX')
+            # Resolver el nombre real de la carpeta (ej: BanBajio/otros -> INBOX.BanBajio.otros)
+            folder_to_use = self.folder_registry.resolve(self.imap_server, folder_name)
+            if not folder_to_use:
+                logger.error(f"La carpeta '{folder_name}' no existe en las carpetas disponibles")
+                return False
 
-            # Listar carpetas disponibles para debug
-            status, folders = self.imap_server.list()
-            if status == 'OK':
-                available_folders = [f.decode() if isinstance(f, bytes) else f for f in folders]
-                logger.info(f"Carpetas disponibles en el servidor: {available_folders}")
-
-                # Verificar si la carpeta existe con diferentes formatos
-                folder_found = False
-                folder_to_use = folder_name
-
-                # Convertir el nombre buscado al formato INBOX.nombre
-                if '/' in folder_name:
-                    # Es una subcarpeta (ej: BanBajio/otros -> INBOX.BanBajio.otros)
-                    search_pattern = 'INBOX.' + folder_name.replace('/', '.')
-                elif not folder_name.startswith('INBOX.'):
-                    # Es una carpeta simple (ej: procesados -> INBOX.procesados)
-                    search_pattern = 'INBOX.' + folder_name
+            self.pending_moves[email_id] = folder_to_use
+            logger.info(f"Correo UID {email_id} programado para moverse a {folder_to_use}")
+            return True
+
+        except Exception as e:
+            logger.error(f"Error al mover correo a {folder_name}: {str(e)}")
+            import traceback
+            logger.error(f"Traceback: {traceback.format_exc()}")
+            return False
+
+    def flush_pending_moves(self) -> bool:
+        """
+        Ejecuta los movimientos programados en el ciclo, agrupados por carpeta
+
+        Con la capacidad MOVE (RFC 6851) se usa un UID MOVE por carpeta. Sin ella
+        se hace un COPY y un STORE \\Deleted por carpeta y al final un único
+        UID EXPUNGE (UIDPLUS) limitado a nuestros UIDs, para no eliminar correos
+        marcados como \\Deleted por otros clientes. Solo sin UIDPLUS se recurre
+        a un EXPUNGE completo.
+
+        Returns:
+            bool: True si todos los correos se movieron correctamente
+        """
+        if not self.pending_moves:
+            return True
+
+        # Los UIDs pertenecen a INBOX (si cambió su UIDVALIDITY se descartan)
+        if not self.select_inbox():
+            logger.error("No hay conexión IMAP activa para mover correos")
+            return False
+        if not self.pending_moves:
+            return True
+
+        capabilities = self.imap_server.capabilities
+        use_move = 'MOVE' in capabilities
+        by_folder: Dict[str, List[bytes]] = {}
+        for uid, folder in self.pending_moves.items():
+            by_folder.setdefault(folder, []).append(uid)
+
+        all_ok = True
+        copied_uids: List[bytes] = []
+        done_folders = set()
+
+        for folder, uids in by_folder.items():
+            uid_set = build_uid_set(uids)
+            done_folders.add(folder)
+            try:
+                if use_move:
+                    status, result = self.imap_server.uid('MOVE', uid_set, folder)
                 else:
-                    # Ya tiene formato INBOX.nombre
-                    search_pattern = folder_name
-
-                for folder in available_folders:
-                    # Buscar coincidencia exacta con el patrón INBOX.nombre
-                    if search_pattern.lower() == folder.lower():
-                        folder_found = True
-                        folder_to_use = folder
-                        logger.info(f"Carpeta encontrada con nombre exacto: '{folder_to_use}'")
-                        break
-
-                    # También buscar si el patrón está contenido en el string de la carpeta
-                    if search_pattern.lower() in folder.lower():
-                        folder_found = True
-                        # Extraer el nombre INBOX.nombre completo
-                        match = re.search(r'INBOX\.[a-zA-Z0-9_/.-]+', folder)
-                        if match:
-                            folder_to_use = match.group()
-                        else:
-                            folder_to_use = folder
-                        logger.info(f"Carpeta encontrada con patrón: '{folder_to_use}'")
-                        break
-
-                if not folder_found:
-                    logger.error(f"La carpeta '{folder_name}' no existe en las carpetas disponibles")
+                    status, result = self.imap_server.uid('COPY', uid_set, folder)
+
+                if status != 'OK':
+                    logger.error(f"Error al mover {len(uids)} correos a {folder}: {result}")
+                    if b'TRYCREATE' in b' '.join(r for r in result if isinstance(r, bytes)).upper():
+                        # La carpeta ya no existe en el servidor: recargar el listado
+                        self.folder_registry.invalidate()
+                    all_ok = False
+                    continue
+
+                if not use_move:
+                    # Marcar los originales para eliminación (\\Deleted flag)
+                    status, result = self.imap_server.uid('STORE', uid_set, '+FLAGS.SILENT', '(\\Deleted)')
+                    if status != 'OK':
+                        logger.error(f"Error al marcar correos para eliminación: {result}")
+                        all_ok = False
+                        continue
+                    copied_uids.extend(uids)
+
+                self.acknowledged_uids.update(uids)
+                if self._active_spool():
+                    self.spool.discard(self.uidvalidity, uids)
+                logger.info(f"✅ {len(uids)} correos movidos a {folder}")
+
+            except Exception as e:
+                logger.error(f"Error al mover correos a {folder}: {str(e)}")
+                if self._handle_connection_error(e):
+                    # Conservar los movimientos no intentados para reintentarlos tras reconectar
+                    done_folders.discard(folder)
+                    self.pending_moves = {
+                        uid: dest for uid, dest in self.pending_moves.items() if dest not in done_folders
+                    }
                     return False
+                all_ok = False
 
-            # Copiar el correo a la carpeta destino
-            logger.info(f"Intentando copiar correo {email_id} a carpeta '{folder_to_use}'")
-            status, result = self.imap_server.copy(email_id, folder_to_use)
-            if status != 'OK':
-                logger.error(f"Error al copiar correo a {folder_to_use}: {result}")
-                return False
-            logger.info(f"Correo copiado exitosamente a {folder_to_use}")
+        if copied_uids:
+            try:
+                if 'UIDPLUS' in capabilities:
+                    status, result = self.imap_server.uid('EXPUNGE', build_uid_set(copied_uids))
+                else:
+                    logger.warning("El servidor no soporta UIDPLUS; se expurgará todo el buzón")
+                    status, result = self.imap_server.expunge()
 
-            # Marcar el correo original para eliminación (\Deleted flag)
-            status, result = self.imap_server.store(email_id, '+FLAGS', '\\Deleted')
-            if status != 'OK':
-                logger.error(f"Error al marcar correo para eliminación: {result}")
-                return False
-            logger.info(f"Correo marcado para eliminación")
+                if status != 'OK':
+                    # No es crítico, los correos ya se copiaron a su carpeta destino
+                    logger.warning(f"Advertencia: No se pudieron expurgar los correos movidos: {result}")
+                    all_ok = False
+                else:
+                    logger.info(f"Expurgación ejecutada correctamente ({len(copied_uids)} correos movidos)")
 
-            # Ejecutar la expurgación para eliminar permanentemente el correo original
-            status, result = self.imap_server.expunge()
-            if status != 'OK':
-                logger.warning(f"Advertencia: No se pudo expurgar el correo: {result}")
-                # No es crítico, el correo se copió correctamente
-            else:
-                logger.info(f"Expurgación ejecutada correctamente")
+            except Exception as e:
+                self._handle_connection_error(e)
+                logger.error(f"Error al expurgar correos movidos: {str(e)}")
+                all_ok = False
 
-            logger.info(f"Correo movido exitosamente a {folder_to_use}")
-            return True
+        self.last_activity = time.monotonic()
+        self.pending_moves = {}
+        return all_ok
+
+    def supports_idle(self) -> bool:
+        """
+        Indica si el servidor anunció la capacidad IDLE (RFC 2177)
+
+        Returns:
+            bool: True si se puede usar wait_for_new_mail()
+        """
+        if not self.connected or not self.imap_server:
+            return False
+        return 'IDLE' in self.imap_server.capabilities
+
+    def wait_for_new_mail(self, timeout: int) -> Optional[bool]:
+        """
+        Espera en IDLE hasta que el servidor notifique correo nuevo o expire el tiempo
+
+        Se envía IDLE sobre el buzón seleccionado y se bloquea hasta recibir
+        '* n EXISTS' o '* n RECENT'. El tiempo máximo debe ser menor al corte de
+        29 minutos del servidor para reenviar IDLE antes de que cierre la sesión.
+
+        Args:
+            timeout: Segundos máximos de espera antes de terminar el IDLE
+
+        Returns:
+            True si llegó correo nuevo, False si expiró el tiempo,
+            None si IDLE no está disponible o falló (usar sondeo)
+        """
+        if not self.supports_idle():
+            return None
+
+        imap = self.imap_server
+        tag = self._new_idle_tag(imap)
+        if tag is None:
+            return None
+        new_mail = False
+
+        try:
+            imap.send(tag + b' IDLE\r\n')
+            line = imap.readline()
+            if not line.startswith(b'+'):
+                logger.warning(f"El servidor rechazó IDLE: {line.strip()}")
+                return None
+
+            logger.debug(f"IDLE iniciado (máximo {timeout}s)")
+            deadline = time.monotonic() + timeout
+
+            while not new_mail:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+
+                if not self._has_buffered_data(imap):
+                    readable, _, _ = select.select([imap.sock], [], [], remaining)
+                    if not readable:
+                        continue
+
+                line = imap.readline()
+                if not line:
+                    raise imaplib.IMAP4.abort("conexión cerrada por el servidor durante IDLE")
+                if line.startswith(b'* BYE'):
+                    raise imaplib.IMAP4.abort(f"el servidor cerró la sesión: {line.strip()}")
+                if IDLE_NEW_MAIL_PATTERN.match(line):
+                    new_mail = True
+
+            # Terminar IDLE y leer hasta la respuesta etiquetada
+            imap.send(b'DONE\r\n')
+            while True:
+                line = imap.readline()
+                if not line:
+                    raise imaplib.IMAP4.abort("conexión cerrada por el servidor al terminar IDLE")
+                if line.startswith(tag):
+                    if not line[len(tag):].strip().upper().startswith(b'OK'):
+                        logger.warning(f"IDLE terminó con error: {line.strip()}")
+                    break
+                if IDLE_NEW_MAIL_PATTERN.match(line):
+                    new_mail = True
+
+            if new_mail:
+                logger.info("📬 IDLE: el servidor notificó correo nuevo")
+            return new_mail
 
         except Exception as e:
-            logger.error(f"Error al mover correo a {folder_name}: {str(e)}")
-            import traceback
-            logger.error(f"Traceback: {traceback.format_exc()}")
+            logger.error(f"Error durante IDLE: {str(e)}")
+            self._drop_connection()
+            return None
+        finally:
+            self._release_idle_tag(imap, tag)
+            self.last_activity = time.monotonic()
+
+    @staticmethod
+    def _new_idle_tag(imap: imaplib.IMAP4) -> Optional[bytes]:
+        """
+        Genera la etiqueta del comando IDLE con los internos de imaplib
+
+        imaplib no tiene un comando IDLE público, así que se usan _new_tag() y
+        tagged_commands. Ambos accesos quedan en este método y en
+        _release_idle_tag() para que un cambio de imaplib solo desactive IDLE.
+
+        Returns:
+            La etiqueta, o None si los internos no existen (usar sondeo)
+        """
+        try:
+            tag = imap._new_tag()
+            imap.tagged_commands
+        except AttributeError as e:
+            logger.warning(f"imaplib no permite enviar IDLE ({str(e)}), usando sondeo")
+            return None
+        return tag
+
+    @staticmethod
+    def _release_idle_tag(imap: imaplib.IMAP4, tag: bytes):
+        """Quita la etiqueta de IDLE de los comandos pendientes de imaplib"""
+        tagged_commands = getattr(imap, 'tagged_commands', None)
+        if tagged_commands is not None:
+            tagged_commands.pop(tag, None)
+
+    @staticmethod
+    def _has_buffered_data(imap: imaplib.IMAP4) -> bool:
+        """
+        Indica si ya hay datos del servidor leídos y sin procesar
+
+        select() solo ve el socket: las líneas que llegaron junto con la
+        respuesta '+ idling' quedan en el buffer de imap.file, y los datos ya
+        descifrados en el buffer SSL. Se revisan ambos antes de bloquearse.
+        """
+        pending = getattr(imap.sock, 'pending', None)
+        if pending and pending():
+            return True
+
+        # peek() solo lee del socket si el buffer está vacío; sin bloqueo
+        # devuelve b'' (o SSLWantReadError) cuando no hay nada que leer
+        timeout = imap.sock.gettimeout()
+        imap.sock.settimeout(0)
+        try:
+            return bool(imap.file.peek(1))
+        except (BlockingIOError, ssl.SSLWantReadError):
             return False
+        finally:
+            imap.sock.settimeout(timeout)
 
     def test_connection(self) -> bool:
         """
@@ -419,7 +1351,9 @@ class EmailClient:
             bool: True si la conexión es exitosa, False en caso contrario
         """
         try:
-            if self.connect():
+            # Verificar la sesión existente con NOOP (reconecta si se perdió)
+            self.keepalive(force=True)
+            if self.ensure_connected():
                 if self.select_inbox():
                     logger.info("Prueba de conexión IMAP exitosa")
                     return True
@@ -2,8 +2,9 @@
 Módulo para mapear datos del XML a la estructura de la tabla catFacturas
 """
 
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from datetime import datetime
+from .cfdi_record import CFDIRecord
 from .logger import logger
 
 class FacturaMapper:
@@ -13,63 +14,60 @@ class FacturaMapper:
         """Inicializa el mapper"""
         pass
     
-    def map_to_catfacturas(self, xml_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    def map_to_catfacturas(self, record: CFDIRecord) -> Optional[Dict[str, Any]]:
         """
-        Mapea los datos extraídos del XML a la estructura de la tabla catFacturas
+        Convierte el registro de la factura en la fila de la tabla catFacturas
         
         Args:
-            xml_data: Diccionario con los datos extraídos del XML
+            record: Datos extraídos del XML (XMLParser.parse_xml)
             
         Returns:
-            Dict con los datos mapeados para la tabla catFacturas o None si hay error
+            Dict con la fila para catFacturas o None si hay error
         """
         try:
-            # Validar datos mínimos requeridos
-            if not self._validate_required_fields(xml_data):
-                logger.error("Faltan campos requeridos en los datos del XML")
+            # Validar datos mínimos requeridos (el UUID también se usa como idFactura)
+            if not record.uuid:
+                logger.error("Campo requerido faltante: uuidCFDI")
                 return None
             
-            # Mapear campos según la estructura de catFacturas
+            now = datetime.now()
             factura_mapped = {
                 # Campos obligatorios
-                "idFactura": xml_data.get("idFactura", ""),
-                "uuidCFDI": xml_data.get("uuidCFDI", ""),
+                "idFactura": record.uuid,
+                "uuidCFDI": record.uuid,
                 "status": True,  # Siempre activo al insertar
-                "fc": datetime.now(),  # Fecha de creación actual
+                "fc": now,  # Fecha de creación actual
                 "aplicada": False,  # No aplicada por defecto
                 "manual": False,  # No es manual, es automática
                 
                 # Campos del XML
-                "folioCFDI": xml_data.get("folioCFDI", ""),
-                "fecCFDI": xml_data.get("fecCFDI"),
-                "totalCFDI": xml_data.get("totalCFDI", 0.0),
-                "subtotalCFDI": xml_data.get("subtotalCFDI", 0.0),
-                "moneda": xml_data.get("moneda", "MXN"),
-                "rfcEmisor": xml_data.get("rfcEmisor", ""),
-                "nombreEmisor": xml_data.get("nombreEmisor", ""),
-                "regimenFiscal": xml_data.get("regimenFiscal"),
-                "selloSAT": xml_data.get("selloSAT", ""),
-                "noCertificadoSAT": xml_data.get("noCertificadoSAT", ""),
+                "folioCFDI": record.folio.strip(),
+                "fecCFDI": record.fecha or now,
+                "totalCFDI": float(record.total),
+                "subtotalCFDI": float(record.subtotal),
+                "moneda": record.moneda,
+                "rfcEmisor": record.rfc_emisor.strip(),
+                "nombreEmisor": record.nombre_emisor.strip(),
+                "regimenFiscal": record.regimen_fiscal,
+                "selloSAT": record.sello_sat.strip(),
+                "noCertificadoSAT": record.no_certificado.strip(),
                 
                 # Campos derivados
-                "mesFactura": xml_data.get("mesFactura", datetime.now().month),
-                "anioCFDI": xml_data.get("anioCFDI", datetime.now().year),
-                "concepto": self._clean_concepto(xml_data.get("concepto", "")),
-                "descripcion": self._generate_descripcion(xml_data),
+                "mesFactura": record.mes,
+                "anioCFDI": record.anio,
+                "concepto": self._clean_concepto(record.concepto) or "Sin descripción",
+                "descripcion": "",
                 
                 # Campos con valores por defecto
-                "descripcion": xml_data.get("descripcion", ""),
                 "idInversionista": None,
                 "nomDescriptivo": None,
                 "idRGdet": None,
                 "uidr": None,
-                "fum": xml_data.get("fum"),
-                "anio": datetime.now().year,
+                "fum": record.fecha_timbrado,
+                "anio": now.year,
                 "idRAdet": None,
             }
-            
-            # Limpiar y validar datos
-            factura_mapped = self._clean_and_validate_data(factura_mapped)
+            factura_mapped["descripcion"] = self._generate_basic_descripcion(factura_mapped)
             
             logger.info(f"Factura mapeada correctamente - UUID: {factura_mapped.get('uuidCFDI')}")
             return factura_mapped
@@ -78,87 +76,21 @@ class FacturaMapper:
             logger.error(f"Error al mapear factura: {str(e)}")
             return None
     
-    def _validate_required_fields(self, xml_data: Dict[str, Any]) -> bool:
-        """
-        Valida que los campos requeridos estén presentes
-        
-        Args:
-            xml_data: Datos del XML
-            
-        Returns:
-            bool: True si los campos requeridos están presentes
-        """
-        required_fields = ["idFactura", "uuidCFDI"]
-        
-        for field in required_fields:
-            if not xml_data.get(field):
-                logger.error(f"Campo requerido faltante: {field}")
-                return False
-        
-        return True
-    
-    def _clean_and_validate_data(self, factura_data: Dict[str, Any]) -> Dict[str, Any]:
+    def map_many(self, records: List[Optional[CFDIRecord]]) -> List[Optional[Dict[str, Any]]]:
         """
-        Limpia y valida los datos antes de insertarlos
-        
+        Convierte varios resultados de XMLParser.parse_many en filas de catFacturas
+
+        El mapeo es barato y se hace en el proceso actual; los XML inválidos
+        (None) quedan como None para conservar la posición de cada adjunto.
+
         Args:
-            factura_data: Datos de la factura
-            
+            records: Registros de cada XML (o None)
+
         Returns:
-            Dict con los datos limpios y validados
+            Lista con las filas (o None) en el mismo orden
         """
-        try:
-            # Limpiar campos de texto
-            text_fields = [
-                "folioCFDI", "rfcEmisor", "nombreEmisor", 
-                "concepto", "selloSAT", "noCertificadoSAT"
-            ]
-            
-            for field in text_fields:
-                if factura_data.get(field):
-                    factura_data[field] = str(factura_data[field]).strip()
-            
-            # Validar campos numéricos
-            numeric_fields = ["totalCFDI", "subtotalCFDI", "regimenFiscal"]
-            
-            for field in numeric_fields:
-                if factura_data.get(field) is None:
-                    if field in ["totalCFDI", "subtotalCFDI"]:
-                        factura_data[field] = 0.0
-                    elif field == "regimenFiscal":
-                        factura_data[field] = 0
-            
-            # Validar campos de fecha
-            date_fields = ["fecCFDI", "fum"]
-            
-            for field in date_fields:
-                if factura_data.get(field) is None:
-                    if field == "fecCFDI":
-                        factura_data[field] = datetime.now()
-                    elif field == "fum":
-                        factura_data[field] = None
-            
-            # Validar mes y año
-            if factura_data.get("mesFactura") is None:
-                factura_data["mesFactura"] = datetime.now().month
-            
-            if factura_data.get("anioCFDI") is None:
-                factura_data["anioCFDI"] = datetime.now().year
-            
-            # Asegurar que el concepto no esté vacío
-            if not factura_data.get("concepto"):
-                factura_data["concepto"] = "Sin descripción"
-            
-            # Generar descripción si está vacía
-            if not factura_data.get("descripcion"):
-                factura_data["descripcion"] = self._generate_basic_descripcion(factura_data)
-            
-            return factura_data
-            
-        except Exception as e:
-            logger.error(f"Error al limpiar y validar datos: {str(e)}")
-            return factura_data
-    
+        return [self.map_to_catfacturas(record) if record else None for record in records]
+
     def _clean_concepto(self, concepto: str) -> str:
         """
         Limpia el campo concepto para que cumpla con los requisitos
@@ -187,81 +119,6 @@ class FacturaMapper:
         
         return concepto.strip()
     
-    def _generate_descripcion(self, xml_data: Dict[str, Any]) -> str:
-        """
-        Genera una descripción detallada de la factura
-        
-        Args:
-            xml_data: Datos del XML
-            
-        Returns:
-            str: Descripción formateada
-        """
-        try:
-            descripcion = "# Datos del CFDI\n"
-            descripcion += "## EMISOR\n"
-            descripcion += f"- **Nombre:** {xml_data.get('nombreEmisor', 'N/A')}\n"
-            descripcion += f"- **RFC:** {xml_data.get('rfcEmisor', 'N/A')}\n"
-            descripcion += f"- **Régimen Fiscal:** {xml_data.get('regimenFiscal', 'N/A')}\n\n"
-            
-            # Agregar datos del receptor si están disponibles
-            if xml_data.get('receptorNombre'):
-                descripcion += "## RECEPTOR\n"
-                descripcion += f"- **Nombre:** {xml_data.get('receptorNombre', 'N/A')}\n"
-                descripcion += f"- **RFC:** {xml_data.get('receptorRFC', 'N/A')}\n\n"
-            
-            descripcion += "## DATOS GENERALES DEL CFDI\n"
-            descripcion += f"- **Folio:** {xml_data.get('folioCFDI', 'N/A')}\n"
-            
-            # Formatear fecha
-            fec_cfdi = xml_data.get('fecCFDI')
-            if fec_cfdi:
-                if isinstance(fec_cfdi, datetime):
-                    descripcion += f"- **Fecha de Emisión:** {fec_cfdi.strftime('%Y-%m-%d %H:%M:%S')}\n"
-                else:
-                    descripcion += f"- **Fecha de Emisión:** {fec_cfdi}\n"
-            else:
-                descripcion += "- **Fecha de Emisión:** N/A\n"
-            
-            descripcion += f"- **UUID:** {xml_data.get('uuidCFDI', 'N/A')}\n"
-            descripcion += f"- **Moneda:** {xml_data.get('moneda', 'N/A')}\n\n"
-            
-            # Agregar conceptos si están disponibles
-            conceptos_detalle = xml_data.get('conceptos_detalle', [])
-            if conceptos_detalle:
-                descripcion += "## CONCEPTOS\n"
-                descripcion += "| **Cantidad** | **Descripción** | **Valor Unitario** | **Importe** |\n"
-                descripcion += "|--------------|-----------------|-------------------|-------------|\n"
-                
-                for concepto in conceptos_detalle[:5]:  # Limitar a 5 conceptos
-                    descripcion += f"| {concepto.get('cantidad', 'N/A')} | {concepto.get('descripcion', 'N/A')} | {concepto.get('valor_unitario', 'N/A')} | {concepto.get('importe', 'N/A')} |\n"
-                
-                if len(conceptos_detalle) > 5:
-                    descripcion += f"| ... | ... | ... | ... | (+{len(conceptos_detalle) - 5} más) |\n"
-                
-                descripcion += "\n"
-            
-            descripcion += "## TOTALES\n"
-            descripcion += f"- **Subtotal:** {xml_data.get('subtotalCFDI', 0):.2f}\n"
-            
-            # Agregar impuestos si están disponibles
-            total_traslados = xml_data.get('totalTraslados', 0)
-            total_retenciones = xml_data.get('totalRetenciones', 0)
-            
-            if total_traslados > 0:
-                descripcion += f"- **IVA Traslados:** {total_traslados:.2f}\n"
-            
-            if total_retenciones > 0:
-                descripcion += f"- **Retenciones:** {total_retenciones:.2f}\n"
-            
-            descripcion += f"- **Total:** {xml_data.get('totalCFDI', 0):.2f}\n"
-            
-            return descripcion
-            
-        except Exception as e:
-            logger.error(f"Error al generar descripción: {str(e)}")
-            return self._generate_basic_descripcion(xml_data)
-    
     def _generate_basic_descripcion(self, factura_data: Dict[str, Any]) -> str:
         """
         Genera una descripción básica cuando hay errores
@@ -0,0 +1,123 @@
+"""
+Módulo de registro de fallos por correo (cola de mensajes fallidos)
+
+Cuenta los intentos fallidos de cada correo (por UIDVALIDITY + UID) en
+.sessions/failure_ledger.json. Un correo cuya extracción falla
+IMAP_MAX_ATTEMPTS veces se mueve a la carpeta de cuarentena y queda
+registrado con su último error, para que no se vuelva a descargar y
+procesar en cada ciclo. Los errores de Supabase e IMAP no se registran.
+"""
+
+import json
+import os
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Optional
+from .config import Config
+from .logger import logger
+
+
+class FailureLedger:
+    """Registro persistente de intentos fallidos por correo"""
+
+    def __init__(self, path: Optional[str] = None, max_attempts: Optional[int] = None):
+        """
+        Args:
+            path: Archivo JSON del registro (default SESSIONS_DIR/failure_ledger.json)
+            max_attempts: Intentos antes de poner en cuarentena (default Config.IMAP_MAX_ATTEMPTS)
+        """
+        self.path = Path(path or os.path.join(Config.SESSIONS_DIR, 'failure_ledger.json'))
+        self.max_attempts = max_attempts or Config.IMAP_MAX_ATTEMPTS
+        self.entries: Dict[str, dict] = {}
+        self.changed = False
+        self.load()
+
+    @staticmethod
+    def key(uidvalidity: Optional[bytes], uid: bytes) -> str:
+        """Clave de un correo (los UIDs solo son únicos junto con UIDVALIDITY)"""
+        return f"{(uidvalidity or b'0').decode()}_{uid.decode()}"
+
+    def load(self):
+        """Carga el registro guardado (si existe)"""
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+        except Exception as e:
+            logger.warning(f"Registro de fallos inválido, se inicia vacío: {str(e)}")
+            self.entries = {}
+
+    def save(self):
+        """Guarda el registro en disco si cambió (escritura atómica)"""
+        if not self.changed:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = self.path.with_suffix('.tmp')
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f, ensure_ascii=False, indent=2)
+            os.replace(temp_path, self.path)
+            self.changed = False
+        except Exception as e:
+            logger.error(f"Error al guardar registro de fallos: {str(e)}")
+
+    def record_failure(self, key: str, subject: str, error: str) -> int:
+        """
+        Registra un intento fallido
+
+        Args:
+            key: Clave del correo (ver FailureLedger.key)
+            subject: Asunto del correo
+            error: Descripción del error
+
+        Returns:
+            int: Cantidad de intentos fallidos acumulados
+        """
+        now = datetime.now().isoformat(timespec='seconds')
+        entry = self.entries.setdefault(key, {'attempts': 0, 'first_failure': now})
+        entry['attempts'] += 1
+        entry['subject'] = subject
+        entry['last_error'] = error
+        entry['last_failure'] = now
+        self.changed = True
+        return entry['attempts']
+
+    def should_quarantine(self, key: str) -> bool:
+        """Indica si el correo alcanzó el máximo de intentos"""
+        entry = self.entries.get(key)
+        return bool(entry) and not entry.get('quarantined') and entry['attempts'] >= self.max_attempts
+
+    def mark_quarantined(self, key: str, folder: str):
+        """
+        Registra que el correo se movió a cuarentena
+
+        Args:
+            key: Clave del correo
+            folder: Carpeta de cuarentena
+        """
+        entry = self.entries.get(key)
+        if entry is not None:
+            entry['quarantined'] = datetime.now().isoformat(timespec='seconds')
+            entry['folder'] = folder
+            self.changed = True
+
+    def clear(self, key: str):
+        """Elimina el registro de un correo que se procesó correctamente"""
+        if self.entries.pop(key, None) is not None:
+            self.changed = True
+
+    def prune(self, retention_days: Optional[int] = None):
+        """
+        Elimina registros sin fallos recientes (correos movidos o borrados manualmente)
+
+        Args:
+            retention_days: Días a conservar cada registro (default Config.FAILURE_LEDGER_RETENTION_DAYS)
+        """
+        retention_days = retention_days or Config.FAILURE_LEDGER_RETENTION_DAYS
+        limit = (datetime.now() - timedelta(days=retention_days)).isoformat(timespec='seconds')
+        expired = [key for key, entry in self.entries.items() if entry.get('last_failure', '') < limit]
+        for key in expired:
+            del self.entries[key]
+        if expired:
+            self.changed = True
@@ -0,0 +1,165 @@
+"""
+Módulo de conexiones IMAP de solo lectura para descargas masivas
+
+Abre varias sesiones adicionales sobre el mismo buzón con EXAMINE (solo
+lectura) y reparte entre ellas los lotes de UID FETCH BODY.PEEK[...]. Las
+operaciones que modifican el buzón (STORE, MOVE, EXPUNGE) siguen en la
+conexión principal de EmailClient.
+"""
+
+import imaplib
+import queue
+import ssl
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterable, Iterator, List, Optional
+from .config import Config
+from .logger import logger
+
+
+class FetchPool:
+    """Conjunto de conexiones IMAP de solo lectura que descargan lotes en paralelo"""
+
+    def __init__(self, size: Optional[int] = None):
+        """
+        Args:
+            size: Cantidad de conexiones de lectura (default Config.IMAP_FETCH_POOL_SIZE)
+        """
+        self.size = size if size is not None else Config.IMAP_FETCH_POOL_SIZE
+        self.readers: List[imaplib.IMAP4] = []
+        self.idle: queue.Queue = queue.Queue()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _open_reader(self, mailbox: str, uidvalidity: bytes) -> Optional[imaplib.IMAP4]:
+        """
+        Abre una conexión y examina el buzón en modo solo lectura
+
+        Args:
+            mailbox: Buzón a examinar (ej: 'INBOX')
+            uidvalidity: UIDVALIDITY de la conexión principal; si difiere, los
+                UIDs no son comparables y la conexión se descarta
+
+        Returns:
+            Conexión lista para UID FETCH o None si falló
+        """
+        reader = None
+        try:
+            reader = imaplib.IMAP4_SSL(Config.IMAP_SERVER, Config.IMAP_PORT,
+                                       ssl_context=ssl.create_default_context())
+            reader.login(Config.IMAP_USER, Config.IMAP_PASSWORD)
+            status, _ = reader.select(mailbox, readonly=True)  # EXAMINE
+            if status != 'OK':
+                raise imaplib.IMAP4.error(f"EXAMINE {mailbox} falló")
+
+            _, data = reader.response('UIDVALIDITY')
+            if not data or data[0] != uidvalidity:
+                raise imaplib.IMAP4.error(f"UIDVALIDITY distinto ({data[0] if data else None} != {uidvalidity})")
+            return reader
+
+        except Exception as e:
+            logger.warning(f"No se pudo abrir conexión de lectura IMAP: {str(e)}")
+            if reader is not None:
+                self._close_reader(reader)
+            return None
+
+    def open(self, mailbox: str, uidvalidity: bytes) -> int:
+        """
+        Abre las conexiones de lectura en paralelo
+
+        Args:
+            mailbox: Buzón a examinar
+            uidvalidity: UIDVALIDITY de la conexión principal
+
+        Returns:
+            int: Cantidad de conexiones abiertas
+        """
+        if self.size <= 0:
+            return 0
+        with ThreadPoolExecutor(max_workers=self.size) as executor:
+            opened = list(executor.map(lambda _: self._open_reader(mailbox, uidvalidity), range(self.size)))
+
+        for reader in opened:
+            if reader is not None:
+                self.readers.append(reader)
+                self.idle.put(reader)
+
+        logger.info(f"Conexiones de lectura IMAP abiertas: {len(self.readers)}/{self.size}")
+        return len(self.readers)
+
+    def map(self, func: Callable[[imaplib.IMAP4, Any], Any], items: Iterable[Any]) -> Iterator[Optional[Any]]:
+        """
+        Ejecuta func(conexión, elemento) repartiendo los elementos entre las conexiones
+
+        Se adelantan como máximo dos elementos por conexión, de modo que la
+        memoria en vuelo queda acotada aunque el consumidor sea lento.
+
+        Args:
+            func: Función que descarga un elemento (ej: un lote de UIDs) con una conexión
+            items: Elementos a procesar
+
+        Yields:
+            Resultado de cada elemento en el orden de items, o None si su
+            conexión falló (el llamador puede reintentarlo con otra conexión)
+        """
+        if not self.readers:
+            for _ in items:
+                yield None
+            return
+
+        with ThreadPoolExecutor(max_workers=len(self.readers), thread_name_prefix='imap-lectura') as executor:
+            pending = deque()
+            try:
+                for item in items:
+                    pending.append(executor.submit(self._run, func, item))
+                    if len(pending) >= 2 * len(self.readers):
+                        yield pending.popleft().result()
+                while pending:
+                    yield pending.popleft().result()
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    def _run(self, func: Callable[[imaplib.IMAP4, Any], Any], item: Any) -> Optional[Any]:
+        """Ejecuta un elemento con la primera conexión libre"""
+        while self.readers:
+            try:
+                reader = self.idle.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            try:
+                result = func(reader, item)
+            except Exception as e:
+                # Conexión caída o en estado inválido: se descarta y el elemento se reintenta fuera del pool
+                logger.warning(f"Conexión de lectura IMAP descartada: {str(e)}")
+                if reader in self.readers:
+                    self.readers.remove(reader)
+                self._close_reader(reader)
+                return None
+
+            self.idle.put(reader)
+            return result
+        return None
+
+    @staticmethod
+    def _close_reader(reader: imaplib.IMAP4):
+        """Cierra una conexión de lectura sin propagar errores"""
+        try:
+            reader.logout()
+        except Exception:
+            try:
+                reader.shutdown()
+            except Exception:
+                pass
+
+    def close(self):
+        """Cierra todas las conexiones de lectura"""
+        for reader in self.readers:
+            self._close_reader(reader)
+        self.readers = []
+        self.idle = queue.Queue()
@@ -0,0 +1,131 @@
+"""
+Módulo de registro de carpetas IMAP
+
+Resuelve nombres lógicos de carpeta (ej: 'BanBajio/otros') al nombre real
+en el servidor (ej: 'INBOX.BanBajio.otros') con un solo LIST por conexión.
+"""
+
+import re
+from typing import Dict, List, Optional
+from .logger import logger
+
+# Línea de respuesta LIST: (\Flags) "delimitador" nombre
+LIST_RESPONSE_PATTERN = re.compile(r'\((?P<flags>[^)]*)\)\s+(?P<delimiter>"[^"]*"|NIL)\s+(?P<name>.+)$')
+
+
+class FolderRegistry:
+    """Registro de carpetas de una conexión IMAP con caché de resoluciones"""
+
+    def __init__(self):
+        """Inicializa el registro vacío (se carga en el primer uso)"""
+        self.loaded = False
+        self.delimiter = '.'
+        self.prefix = ''
+        self.folders: Dict[str, str] = {}
+        self.resolved: Dict[str, str] = {}
+
+    def load(self, imap_server) -> bool:
+        """
+        Lista las carpetas del servidor y detecta delimitador y prefijo
+
+        Args:
+            imap_server: Conexión imaplib autenticada
+
+        Returns:
+            bool: True si se pudieron listar las carpetas
+        """
+        status, folders = imap_server.list()
+        if status != 'OK':
+            logger.error(f"Error al listar carpetas: {folders}")
+            return False
+
+        self.folders = {}
+        self.resolved = {}
+        delimiter = None
+
+        for folder in self._list_lines(folders):
+            match = LIST_RESPONSE_PATTERN.match(folder)
+            if not match:
+                continue
+
+            name = match.group('name').strip()
+            if name.startswith('"') and name.endswith('"'):
+                name = name[1:-1].replace('\\"', '"').replace('\\\\', '\\')
+            self.folders[name.lower()] = name
+
+            if delimiter is None and match.group('delimiter') != 'NIL':
+                delimiter = match.group('delimiter')[1:-1]
+
+        self.delimiter = delimiter or '.'
+
+        # Servidores como Hostinger/Courier anidan todo bajo INBOX (INBOX.carpeta)
+        inbox_prefix = 'inbox' + self.delimiter.lower()
+        if any(name.startswith(inbox_prefix) for name in self.folders):
+            self.prefix = 'INBOX' + self.delimiter
+        else:
+            self.prefix = ''
+
+        self.loaded = True
+        logger.info(f"Carpetas del servidor cargadas: {len(self.folders)} "
+                    f"(delimitador '{self.delimiter}', prefijo '{self.prefix}')")
+        logger.debug(f"Carpetas disponibles en el servidor: {list(self.folders.values())}")
+        return True
+
+    def _list_lines(self, folders: list) -> List[str]:
+        """Normaliza la respuesta LIST a una línea por carpeta (incluye literales)"""
+        lines = []
+        for folder in folders:
+            if folder is None:
+                continue
+            if isinstance(folder, tuple):
+                # Nombre enviado como literal: (b'(\\HasNoChildren) "." {12}', b'INBOX.nombre')
+                head = re.sub(r'\{\d+\}$', '', folder[0].decode(errors='replace')).rstrip()
+                lines.append(f"{head} \"{folder[1].decode(errors='replace')}\"")
+            else:
+                lines.append(folder.decode(errors='replace') if isinstance(folder, bytes) else folder)
+        return lines
+
+    def invalidate(self):
+        """Descarta el listado para recargarlo en el siguiente uso"""
+        self.loaded = False
+        self.resolved = {}
+
+    def to_server_name(self, folder_name: str) -> str:
+        """
+        Convierte un nombre lógico al formato del servidor
+
+        Args:
+            folder_name: Nombre lógico con '/' como separador (ej: 'BanBajio/otros')
+
+        Returns:
+            str: Nombre con delimitador y prefijo del servidor (ej: 'INBOX.BanBajio.otros')
+        """
+        if folder_name.upper() == 'INBOX' or (self.prefix and folder_name.lower().startswith(self.prefix.lower())):
+            return folder_name
+        return self.prefix + folder_name.replace('/', self.delimiter)
+
+    def resolve(self, imap_server, folder_name: str) -> Optional[str]:
+        """
+        Obtiene el nombre real de una carpeta existente
+
+        Args:
+            imap_server: Conexión imaplib autenticada (para cargar el listado si hace falta)
+            folder_name: Nombre lógico de la carpeta
+
+        Returns:
+            Nombre de la carpeta en el servidor o None si no existe
+        """
+        if not self.loaded and not self.load(imap_server):
+            return None
+
+        if folder_name in self.resolved:
+            return self.resolved[folder_name]
+
+        for candidate in (self.to_server_name(folder_name), folder_name):
+            server_name = self.folders.get(candidate.lower())
+            if server_name:
+                self.resolved[folder_name] = server_name
+                logger.debug(f"Carpeta '{folder_name}' resuelta como '{server_name}'")
+                return server_name
+
+        return None
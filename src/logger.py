@@ -4,9 +4,24 @@ Módulo de logging del sistema
 
 import logging
 import sys
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
 
+
+class _ErrorCollector(logging.Handler):
+    """Handler que reúne los mensajes de error del hilo que los solicita"""
+
+    def __init__(self):
+        super().__init__(logging.ERROR)
+        self.local = threading.local()
+
+    def emit(self, record):
+        messages = getattr(self.local, 'messages', None)
+        if messages is not None:
+            messages.append(record.getMessage())
+
 class Logger:
     """Clase para manejo de logs del sistema"""
     
@@ -17,6 +32,10 @@ class Logger:
         # Evitar duplicación de handlers
         if not self.logger.handlers:
             self._setup_handlers()
+
+        # Un solo handler para capture_errors(); cada hilo reúne sus propios errores
+        self._error_collector = _ErrorCollector()
+        self.logger.addHandler(self._error_collector)
     
     def _setup_handlers(self):
         """Configura los handlers de logging"""
@@ -69,5 +88,24 @@ class Logger:
         """Registra excepción con traceback"""
         self.logger.exception(message)
 
+    @contextmanager
+    def capture_errors(self):
+        """
+        Reúne los errores registrados por el hilo actual dentro del bloque
+
+        Yields:
+            List con los mensajes de error registrados
+        """
+        local = self._error_collector.local
+        previous = getattr(local, 'messages', None)
+        messages = []
+        local.messages = messages
+        try:
+            yield messages
+        finally:
+            local.messages = previous
+            if previous is not None:
+                previous.extend(messages)
+
 # Instancia global del logger
 logger = Logger()
\ No newline at end of file
@@ -0,0 +1,128 @@
+"""
+Módulo de punto de control de buzón IMAP
+
+Guarda en disco (ej: .sessions/checkpoint_inbox.json) el UIDVALIDITY, el
+último UID revisado y el HIGHESTMODSEQ (CONDSTORE) de un buzón, para que
+cada ciclo busque solo correos nuevos (UID n+1:*) o modificados
+(MODSEQ) en lugar de recorrer todo el buzón.
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Iterable, List, Optional
+from .config import Config
+from .logger import logger
+
+
+class MailboxCheckpoint:
+    """Punto de control persistente de un buzón"""
+
+    def __init__(self, name: str, directory: Optional[str] = None):
+        """
+        Inicializa el punto de control y carga el estado guardado
+
+        Args:
+            name: Identificador del punto de control (ej: 'inbox')
+            directory: Directorio donde se guarda (default Config.SESSIONS_DIR)
+        """
+        self.name = name
+        self.path = Path(directory or Config.SESSIONS_DIR) / f"checkpoint_{name}.json"
+        self.uidvalidity: Optional[str] = None
+        self.last_uid = 0
+        self.highestmodseq: Optional[int] = None
+        # UIDs revisados pero no confirmados (se vuelven a buscar en el siguiente ciclo)
+        self.pending_uids: List[bytes] = []
+
+        # Revisión en curso, se confirma con commit()
+        self.scan_uids: List[bytes] = []
+        self.scan_last_uid: Optional[int] = None
+        self.scan_highestmodseq: Optional[int] = None
+
+        self.load()
+
+    def load(self):
+        """Carga el estado guardado (si existe)"""
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.uidvalidity = data.get('uidvalidity')
+            self.last_uid = int(data.get('last_uid', 0))
+            self.highestmodseq = data.get('highestmodseq')
+            self.pending_uids = [uid.encode() for uid in data.get('pending_uids', [])]
+            logger.debug(f"Punto de control '{self.name}' cargado: último UID {self.last_uid}, "
+                         f"{len(self.pending_uids)} pendientes")
+        except Exception as e:
+            logger.warning(f"Punto de control '{self.name}' inválido, se revisará todo el buzón: {str(e)}")
+            self.reset(None)
+
+    def save(self):
+        """Guarda el estado en disco de forma atómica"""
+        data = {
+            'uidvalidity': self.uidvalidity,
+            'last_uid': self.last_uid,
+            'highestmodseq': self.highestmodseq,
+            'pending_uids': [uid.decode() for uid in self.pending_uids],
+        }
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = self.path.with_suffix('.tmp')
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(temp_path, self.path)
+        except Exception as e:
+            logger.error(f"Error al guardar punto de control '{self.name}': {str(e)}")
+
+    def reset(self, uidvalidity: Optional[str]):
+        """
+        Descarta el estado (ej: cambió UIDVALIDITY y los UIDs ya no son válidos)
+
+        Args:
+            uidvalidity: Nuevo UIDVALIDITY del buzón
+        """
+        self.uidvalidity = uidvalidity
+        self.last_uid = 0
+        self.highestmodseq = None
+        self.pending_uids = []
+
+    def matches(self, uidvalidity: Optional[str]) -> bool:
+        """Indica si el estado guardado corresponde al UIDVALIDITY actual del buzón"""
+        return uidvalidity is not None and self.uidvalidity == uidvalidity
+
+    def begin_scan(self, uids: List[bytes], uidnext: Optional[int], highestmodseq: Optional[int]):
+        """
+        Registra el resultado de una búsqueda pendiente de confirmar
+
+        Args:
+            uids: UIDs encontrados en la búsqueda
+            uidnext: UIDNEXT del buzón tomado antes de buscar (None si no se conoce)
+            highestmodseq: HIGHESTMODSEQ del buzón tomado antes de buscar
+        """
+        self.scan_uids = list(uids)
+        candidates = [self.last_uid] + [int(uid) for uid in uids]
+        if uidnext:
+            candidates.append(uidnext - 1)
+        self.scan_last_uid = max(candidates)
+        self.scan_highestmodseq = highestmodseq
+
+    def commit(self, pending_uids: Iterable[bytes]):
+        """
+        Confirma la revisión en curso y guarda el estado
+
+        Args:
+            pending_uids: UIDs de la revisión que deben volver a buscarse
+        """
+        if self.scan_last_uid is None:
+            # No hubo búsqueda completa (ej: falló SEARCH); conservar el estado anterior
+            return
+        self.last_uid = self.scan_last_uid
+        if self.scan_highestmodseq is not None:
+            self.highestmodseq = self.scan_highestmodseq
+        self.pending_uids = sorted(set(pending_uids), key=int)
+        self.scan_uids = []
+        self.scan_last_uid = None
+        self.save()
+        logger.debug(f"Punto de control '{self.name}' guardado: último UID {self.last_uid}, "
+                     f"HIGHESTMODSEQ {self.highestmodseq}, {len(self.pending_uids)} pendientes")
@@ -0,0 +1,155 @@
+"""
+Módulo de almacenamiento local de correos descargados (spool)
+
+Guarda los bytes RFC822 de cada correo de INBOX en un archivo por mensaje
+(estilo maildir) con nombre <uidvalidity>_<uid>.eml. Un correo que no se pudo
+procesar se lee de disco en los ciclos siguientes en lugar de descargarlo de
+nuevo del servidor. Los archivos se eliminan al confirmar el correo (marcado
+como leído o movido) o por antigüedad y tamaño total del spool.
+"""
+
+import email
+import email.message
+import os
+import time
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+from .config import Config
+from .logger import logger
+
+
+class MessageSpool:
+    """Spool en disco de correos crudos indexado por UIDVALIDITY + UID"""
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: Optional[int] = None,
+                 max_age: Optional[int] = None):
+        """
+        Args:
+            directory: Directorio del spool (default Config.IMAP_SPOOL_DIR)
+            max_bytes: Tamaño total máximo en bytes (default Config.IMAP_SPOOL_MAX_MB)
+            max_age: Antigüedad máxima en segundos (default Config.IMAP_SPOOL_MAX_AGE_DAYS)
+        """
+        self.directory = Path(directory or Config.IMAP_SPOOL_DIR)
+        self.max_bytes = max_bytes if max_bytes is not None else Config.IMAP_SPOOL_MAX_MB * 1024 * 1024
+        self.max_age = max_age if max_age is not None else Config.IMAP_SPOOL_MAX_AGE_DAYS * 86400
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, uidvalidity: bytes, uid: bytes) -> Path:
+        """Ruta del archivo de un correo"""
+        return self.directory / f"{uidvalidity.decode()}_{uid.decode()}.eml"
+
+    def get(self, uidvalidity: bytes, uid: bytes) -> Optional[bytes]:
+        """
+        Lee un correo del spool
+
+        Args:
+            uidvalidity: UIDVALIDITY del buzón
+            uid: UID del correo
+
+        Returns:
+            Bytes RFC822 del correo o None si no está guardado
+        """
+        try:
+            raw_email = self._path(uidvalidity, uid).read_bytes()
+            self.hits += 1
+            return raw_email
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception as e:
+            logger.warning(f"Error al leer correo UID {uid} del spool: {str(e)}")
+            self.misses += 1
+            return None
+
+    def put(self, uidvalidity: bytes, uid: bytes, raw_email: bytes):
+        """
+        Guarda un correo en el spool (escritura atómica)
+
+        Args:
+            uidvalidity: UIDVALIDITY del buzón
+            uid: UID del correo
+            raw_email: Bytes RFC822 del correo
+        """
+        path = self._path(uidvalidity, uid)
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            temp_path = path.with_suffix('.tmp')
+            temp_path.write_bytes(raw_email)
+            os.replace(temp_path, path)
+        except Exception as e:
+            logger.warning(f"Error al guardar correo UID {uid} en el spool: {str(e)}")
+
+    def discard(self, uidvalidity: bytes, uids: List[bytes]):
+        """
+        Elimina correos confirmados del spool
+
+        Args:
+            uidvalidity: UIDVALIDITY del buzón
+            uids: UIDs a eliminar
+        """
+        for uid in uids:
+            try:
+                self._path(uidvalidity, uid).unlink()
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logger.warning(f"Error al eliminar correo UID {uid} del spool: {str(e)}")
+
+    def evict(self) -> int:
+        """
+        Elimina correos más antiguos que max_age y, después, los más antiguos
+        hasta que el spool ocupe menos de max_bytes
+
+        Returns:
+            int: Cantidad de archivos eliminados
+        """
+        if not self.directory.exists():
+            return 0
+
+        entries = []
+        for path in self.directory.glob('*.eml'):
+            try:
+                stat = path.stat()
+                entries.append((stat.st_mtime, stat.st_size, path))
+            except FileNotFoundError:
+                continue
+
+        entries.sort()
+        now = time.time()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+
+        for mtime, size, path in entries:
+            if now - mtime <= self.max_age and total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+                removed += 1
+                total -= size
+            except FileNotFoundError:
+                total -= size
+            except Exception as e:
+                logger.warning(f"Error al depurar spool ({path.name}): {str(e)}")
+
+        if removed:
+            logger.info(f"Spool depurado: {removed} correos eliminados ({total} bytes restantes)")
+        return removed
+
+    def iter_messages(self) -> Iterator[Tuple[bytes, email.message.Message]]:
+        """
+        Recorre los correos guardados sin conexión al servidor (más recientes primero)
+
+        Yields:
+            Tuplas (uid, message)
+        """
+        if not self.directory.exists():
+            return
+
+        paths = sorted(self.directory.glob('*.eml'), key=lambda path: path.stat().st_mtime, reverse=True)
+        for path in paths:
+            uid = path.stem.split('_', 1)[-1].encode()
+            try:
+                yield uid, email.message_from_bytes(path.read_bytes())
+            except Exception as e:
+                logger.warning(f"Error al leer {path.name} del spool: {str(e)}")
@@ -0,0 +1,249 @@
+"""
+Módulo para interpretar respuestas FETCH con ENVELOPE y BODYSTRUCTURE
+
+Permite clasificar un correo y elegir qué partes MIME descargar sin bajar
+el mensaje completo (ej: omitir PDFs grandes junto al XML de la factura).
+"""
+
+import re
+from email.header import decode_header
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from .logger import logger
+
+# Marcador de literal al final de una cabecera de imaplib (ej: b'... BODY[1] {2048}')
+LITERAL_MARKER_PATTERN = re.compile(rb'\{\d+\}$')
+
+_NIL = object()
+
+
+def _tokenize_text(text: bytes) -> Iterator[Tuple[str, Any]]:
+    """Divide el texto de una respuesta IMAP en tokens"""
+    pos = 0
+    length = len(text)
+    while pos < length:
+        char = text[pos:pos + 1]
+        if char in (b' ', b'\r', b'\n', b'\t'):
+            pos += 1
+        elif char == b'(':
+            yield ('(', None)
+            pos += 1
+        elif char == b')':
+            yield (')', None)
+            pos += 1
+        elif char == b'"':
+            pos += 1
+            value = bytearray()
+            while pos < length and text[pos:pos + 1] != b'"':
+                if text[pos:pos + 1] == b'\\':
+                    pos += 1
+                value += text[pos:pos + 1]
+                pos += 1
+            pos += 1
+            yield ('STRING', bytes(value))
+        else:
+            start = pos
+            while pos < length and text[pos:pos + 1] not in (b' ', b'(', b')', b'\r', b'\n'):
+                if text[pos:pos + 1] == b'[':
+                    # Los corchetes pueden contener espacios y paréntesis (ej: BODY[HEADER.FIELDS (FROM)])
+                    closing = text.find(b']', pos)
+                    pos = length if closing == -1 else closing
+                pos += 1
+            atom = text[start:pos]
+            yield ('NIL', None) if atom.upper() == b'NIL' else ('ATOM', atom)
+
+
+def _tokenize(msg_data: list) -> Iterator[Tuple[str, Any]]:
+    """Tokeniza la lista devuelta por imaplib, intercalando los literales"""
+    for item in msg_data:
+        if isinstance(item, tuple):
+            text, literal = item[0], item[1]
+            text = LITERAL_MARKER_PATTERN.sub(b'', text.rstrip())
+        elif isinstance(item, bytes):
+            text, literal = item, None
+        else:
+            continue
+
+        yield from _tokenize_text(text)
+        if literal is not None:
+            yield ('STRING', literal)
+
+
+def _build_values(tokens: Iterator[Tuple[str, Any]]) -> List[Any]:
+    """Construye listas anidadas a partir de los tokens"""
+    stack: List[List[Any]] = [[]]
+    for kind, value in tokens:
+        if kind == '(':
+            stack.append([])
+        elif kind == ')':
+            if len(stack) > 1:
+                closed = stack.pop()
+                stack[-1].append(closed)
+        elif kind == 'NIL':
+            stack[-1].append(None)
+        else:
+            stack[-1].append(value)
+    # Cerrar listas incompletas de respuestas truncadas
+    while len(stack) > 1:
+        closed = stack.pop()
+        stack[-1].append(closed)
+    return stack[0]
+
+
+def parse_fetch_items(msg_data: list) -> List[Dict[bytes, Any]]:
+    """
+    Parsea una respuesta FETCH multi-mensaje con listas anidadas y literales
+
+    Args:
+        msg_data: Datos devueltos por imaplib para UID FETCH
+
+    Returns:
+        List de dicts {b'UID': b'12', b'ENVELOPE': [...], b'BODY[1]': b'...'}
+    """
+    values = _build_values(_tokenize(msg_data))
+    messages = []
+
+    for value in values:
+        if not isinstance(value, list):
+            continue
+        items: Dict[bytes, Any] = {}
+        for index in range(0, len(value) - 1, 2):
+            key = value[index]
+            if isinstance(key, bytes):
+                items[key.upper()] = value[index + 1]
+        if b'UID' in items:
+            messages.append(items)
+
+    return messages
+
+
+def _as_text(value: Any) -> str:
+    """Convierte un string IMAP (bytes o NIL) a str"""
+    if value is None:
+        return ''
+    if isinstance(value, bytes):
+        return value.decode('utf-8', errors='replace')
+    return str(value)
+
+
+def _params_to_dict(params: Any) -> Dict[str, str]:
+    """Convierte una lista de parámetros IMAP ("name" "valor" ...) en dict"""
+    result = {}
+    if isinstance(params, list):
+        for index in range(0, len(params) - 1, 2):
+            result[_as_text(params[index]).lower()] = _as_text(params[index + 1])
+    return result
+
+
+class MessagePart:
+    """Parte hoja de un BODYSTRUCTURE con su número de sección"""
+
+    def __init__(self, section: str, content_type: str, params: Dict[str, str],
+                 encoding: str, size: int, disposition: Optional[str],
+                 disposition_params: Dict[str, str]):
+        self.section = section
+        self.content_type = content_type
+        self.params = params
+        self.encoding = encoding
+        self.size = size
+        self.disposition = disposition
+        self.disposition_params = disposition_params
+
+    @property
+    def filename(self) -> str:
+        """Nombre de archivo decodificado (disposición o parámetro name)"""
+        filename = self.disposition_params.get('filename') or self.params.get('name', '')
+        if not filename:
+            return ''
+        try:
+            decoded_filename = decode_header(filename)[0][0]
+            if isinstance(decoded_filename, bytes):
+                decoded_filename = decoded_filename.decode(errors='ignore')
+            return decoded_filename
+        except Exception:
+            return filename
+
+    def __repr__(self) -> str:
+        return f"MessagePart({self.section}, {self.content_type}, {self.size} bytes)"
+
+
+class MessageStructure:
+    """Resumen de ENVELOPE + BODYSTRUCTURE de un correo"""
+
+    def __init__(self, uid: bytes, envelope: Any, bodystructure: Any):
+        self.uid = uid
+        self.subject = ''
+        self.from_addr = ''
+        self.parts: List[MessagePart] = []
+        self.is_multipart = isinstance(bodystructure, list) and bool(bodystructure) \
+            and isinstance(bodystructure[0], list)
+
+        if isinstance(envelope, list) and len(envelope) > 2:
+            self.subject = _as_text(envelope[1])
+            senders = envelope[2]
+            if isinstance(senders, list) and senders and isinstance(senders[0], list) \
+                    and len(senders[0]) >= 4:
+                mailbox, host = _as_text(senders[0][2]), _as_text(senders[0][3])
+                self.from_addr = f"{mailbox}@{host}" if host else mailbox
+
+        if isinstance(bodystructure, list):
+            self._collect_parts(bodystructure, '')
+
+    def _collect_parts(self, body: List[Any], prefix: str):
+        """Recorre el BODYSTRUCTURE asignando números de sección a las hojas"""
+        if body and isinstance(body[0], list):
+            # multipart: (parte1)(parte2)... "subtipo" extensiones
+            index = 0
+            for child in body:
+                if not isinstance(child, list):
+                    break
+                index += 1
+                section = f"{prefix}.{index}" if prefix else str(index)
+                self._collect_parts(child, section)
+            return
+
+        try:
+            content_type = f"{_as_text(body[0])}/{_as_text(body[1])}".lower()
+            params = _params_to_dict(body[2])
+            encoding = _as_text(body[5]).lower()
+            size = int(body[6]) if body[6] is not None else 0
+
+            # Posición de la disposición según el tipo de parte
+            if content_type.startswith('text/'):
+                disposition_index = 9
+            elif content_type == 'message/rfc822':
+                disposition_index = 11
+            else:
+                disposition_index = 8
+
+            disposition = None
+            disposition_params: Dict[str, str] = {}
+            if len(body) > disposition_index and isinstance(body[disposition_index], list):
+                disposition = _as_text(body[disposition_index][0]).lower() or None
+                if len(body[disposition_index]) > 1:
+                    disposition_params = _params_to_dict(body[disposition_index][1])
+
+            self.parts.append(MessagePart(
+                prefix or '1', content_type, params, encoding, size,
+                disposition, disposition_params
+            ))
+        except (IndexError, TypeError, ValueError) as e:
+            logger.warning(f"BODYSTRUCTURE no reconocido en sección {prefix or '1'}: {str(e)}")
+
+    def text_parts(self) -> List[MessagePart]:
+        """Partes text/html y text/plain del cuerpo (no adjuntos)"""
+        return [
+            part for part in self.parts
+            if part.content_type in ('text/html', 'text/plain') and part.disposition != 'attachment'
+        ]
+
+    def xml_attachments(self) -> List[MessagePart]:
+        """Partes adjuntas con extensión .xml (mismo criterio que get_xml_attachments)"""
+        return [
+            part for part in self.parts
+            if part.disposition == 'attachment' and part.filename.lower().endswith('.xml')
+        ]
+
+    @property
+    def size(self) -> int:
+        """Tamaño total aproximado de las partes"""
+        return sum(part.size for part in self.parts)
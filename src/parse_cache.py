@@ -0,0 +1,147 @@
+"""
+Módulo de caché de facturas ya parseadas
+
+El mismo XML llega varias veces (reenvíos del proveedor, un correo con el
+XML suelto y comprimido, copias reenviadas). La caché guarda el resultado
+de parse_xml por SHA-256 del contenido del adjunto y recuerda los UUID que
+ya existen en Supabase, para contarlos como duplicados sin consultar la
+base de datos. Ambas listas son LRU acotadas y viven solo en memoria.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+from .cfdi_record import CFDIRecord
+from .config import Config
+
+
+class ParseCache:
+    """Caché LRU de resultados de parseo por contenido y de UUID conocidos"""
+
+    def __init__(self, max_entries: Optional[int] = None, max_uuids: Optional[int] = None):
+        """
+        Args:
+            max_entries: Resultados de parseo a conservar (default Config.PARSE_CACHE_SIZE, 0 desactiva)
+            max_uuids: UUID existentes a recordar (default Config.PARSE_CACHE_UUIDS, 0 desactiva)
+        """
+        self.max_entries = max_entries if max_entries is not None else Config.PARSE_CACHE_SIZE
+        self.max_uuids = max_uuids if max_uuids is not None else Config.PARSE_CACHE_UUIDS
+        self.entries: OrderedDict = OrderedDict()
+        self.uuids: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.uuid_hits = 0
+        # Las etapas de extracción y guardado pueden correr en varios hilos
+        self.lock = threading.Lock()
+
+    def parse(self, xml_content: bytes, parse: Callable[[bytes], Optional[CFDIRecord]]) -> Optional[CFDIRecord]:
+        """
+        Devuelve el resultado de parse(xml_content), usando la caché si el contenido ya se parseó
+
+        Solo se guardan los resultados válidos; un XML inválido se vuelve a
+        parsear (y a registrar su error) en cada intento.
+
+        Args:
+            xml_content: Contenido del adjunto XML en bytes
+            parse: Función de parseo (ej: XMLParser.parse_xml)
+
+        Returns:
+            CFDIRecord con los datos de la factura o None si el XML es inválido
+            (el mismo registro se comparte entre adjuntos idénticos; es inmutable)
+        """
+        if self.max_entries <= 0:
+            return parse(xml_content)
+
+        digest = hashlib.sha256(xml_content).digest()
+        data = self._lookup(digest)
+        if data is None:
+            data = parse(xml_content)
+            self._store(digest, data)
+        return data
+
+    def parse_many(self, xml_contents: List[bytes],
+                   parse_many: Callable[[List[bytes]], List[Optional[CFDIRecord]]]) -> List[Optional[CFDIRecord]]:
+        """
+        Igual que parse() para varios adjuntos: solo los que no están en caché
+        se envían (una vez cada contenido distinto) a parse_many
+
+        Args:
+            xml_contents: Contenido de los adjuntos XML en bytes
+            parse_many: Función de parseo por lotes (ej: XMLParser.parse_many)
+
+        Returns:
+            Resultados en el mismo orden que xml_contents
+        """
+        if self.max_entries <= 0:
+            return parse_many(xml_contents)
+
+        digests = [hashlib.sha256(xml_content).digest() for xml_content in xml_contents]
+        results: Dict[bytes, Optional[CFDIRecord]] = {}
+        pending: Dict[bytes, bytes] = {}
+        for digest, xml_content in zip(digests, xml_contents):
+            if digest in results or digest in pending:
+                continue
+            data = self._lookup(digest)
+            if data is None:
+                pending[digest] = xml_content
+            else:
+                results[digest] = data
+
+        if pending:
+            for digest, data in zip(pending, parse_many(list(pending.values()))):
+                self._store(digest, data)
+                results[digest] = data
+        return [results[digest] for digest in digests]
+
+    def _lookup(self, digest: bytes) -> Optional[CFDIRecord]:
+        """Resultado guardado para un contenido (cuenta acierto o fallo)"""
+        with self.lock:
+            data = self.entries.get(digest)
+            if data is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(digest)
+            self.hits += 1
+            return data
+
+    def _store(self, digest: bytes, data: Optional[CFDIRecord]):
+        """Guarda un resultado válido y descarta el menos usado si se excede el límite"""
+        if data is None:
+            return
+        with self.lock:
+            self.entries[digest] = data
+            if len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def is_known_uuid(self, uuid: Optional[str]) -> bool:
+        """Indica si el UUID ya se insertó o se encontró en Supabase en este proceso"""
+        if not uuid or self.max_uuids <= 0:
+            return False
+        with self.lock:
+            if uuid not in self.uuids:
+                return False
+            self.uuids.move_to_end(uuid)
+            self.uuid_hits += 1
+            return True
+
+    def add_known_uuid(self, uuid: Optional[str]):
+        """Recuerda un UUID que ya existe en Supabase"""
+        if not uuid or self.max_uuids <= 0:
+            return
+        with self.lock:
+            self.uuids[uuid] = True
+            self.uuids.move_to_end(uuid)
+            if len(self.uuids) > self.max_uuids:
+                self.uuids.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        """Contadores de la caché"""
+        with self.lock:
+            return {
+                'entries': len(self.entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'uuids': len(self.uuids),
+                'uuid_hits': self.uuid_hits
+            }
@@ -0,0 +1,86 @@
+"""
+Módulo de parseo de lotes de XML en procesos separados
+
+Un correo con decenas de CFDI (lotes mensuales de un proveedor) se parsea
+repartiendo los adjuntos entre los procesos de un ProcessPoolExecutor, de
+modo que el parseo no retiene el GIL del proceso principal. El pool se
+crea la primera vez que se necesita y se reutiliza entre correos; los
+procesos se inician con 'spawn' porque el proceso principal tiene hilos
+(etapas de extracción y guardado del pipeline, lectores de FetchPool) y
+'fork' podría copiar locks tomados.
+
+Los lotes pequeños se parsean en el mismo proceso: enviar los bytes y
+recibir el resultado cuesta más que parsear unos pocos XML. Con
+SEAL_VERIFICATION todos los XML se envían al pool.
+"""
+
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+from .cfdi_record import CFDIRecord
+from .config import Config
+from .logger import logger
+
+_lock = threading.Lock()
+_executor: Optional[ProcessPoolExecutor] = None
+
+# Parser de cada proceso del pool, por clase (se crea una vez por proceso)
+_worker_parsers: Dict[type, Any] = {}
+
+
+def _parse_in_worker(parser_class: type, xml_content: bytes) -> Optional[CFDIRecord]:
+    """Parsea un XML dentro de un proceso del pool"""
+    parser = _worker_parsers.get(parser_class)
+    if parser is None:
+        parser = _worker_parsers[parser_class] = parser_class()
+    return parser.parse_xml(xml_content)
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    """Pool de procesos compartido (se crea la primera vez)"""
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=Config.XML_PARSE_POOL_WORKERS,
+                                            mp_context=multiprocessing.get_context('spawn'))
+            logger.info(f"Pool de parseo XML iniciado con {Config.XML_PARSE_POOL_WORKERS} procesos")
+        return _executor
+
+
+def parse_many(parser, xml_contents: List[bytes]) -> List[Optional[CFDIRecord]]:
+    """
+    Parsea varios XML con parser.parse_xml, en procesos separados si el lote es grande
+
+    Args:
+        parser: Instancia de XMLParser (o subclase); cada proceso crea la suya
+        xml_contents: Contenido de los adjuntos XML en bytes
+
+    Returns:
+        Resultados de parse_xml en el mismo orden que xml_contents
+    """
+    # Con verificación de sellos cada XML cuesta varias veces más (XSLT y RSA):
+    # todo lote va al pool para no frenar al hilo principal (conexión IMAP)
+    min_batch = 1 if parser.seal_verifier is not None else Config.XML_PARSE_POOL_MIN_BATCH
+    if Config.XML_PARSE_POOL_WORKERS <= 0 or len(xml_contents) < min_batch:
+        return [parser.parse_xml(xml_content) for xml_content in xml_contents]
+
+    parser_class = type(parser)
+    try:
+        executor = _get_executor()
+        return list(executor.map(_parse_in_worker, [parser_class] * len(xml_contents), xml_contents,
+                                 chunksize=max(1, Config.XML_PARSE_POOL_CHUNK_SIZE)))
+    except Exception as e:
+        # Proceso caído o pool inutilizable: se descarta y el lote se parsea aquí
+        logger.warning(f"Pool de parseo XML no disponible, se parsea en el proceso principal: {str(e)}")
+        shutdown()
+        return [parser.parse_xml(xml_content) for xml_content in xml_contents]
+
+
+def shutdown():
+    """Detiene el pool de procesos (se vuelve a crear si se necesita otra vez)"""
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True, cancel_futures=True)
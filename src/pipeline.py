@@ -0,0 +1,144 @@
+"""
+Módulo de pipeline por etapas con colas acotadas
+
+Cada etapa tiene sus propios hilos de trabajo y lee de una cola con tamaño
+máximo, de modo que una etapa lenta (ej: inserciones en Supabase) no frena
+a las demás y la memoria en vuelo queda limitada. El hilo que alimenta el
+pipeline recibe los elementos terminados con drain() y finish(); así las
+operaciones que requieren un único dueño (ej: la conexión IMAP) se hacen
+siempre en ese hilo.
+"""
+
+import queue
+import threading
+from typing import Any, Callable, Iterator, List, Optional, Tuple
+from .logger import logger
+
+# Etapa: (nombre, función que procesa un elemento y lo devuelve, cantidad de hilos)
+Stage = Tuple[str, Callable[[Any], Any], int]
+
+
+class StagedPipeline:
+    """Pipeline de etapas concurrentes conectadas por colas acotadas"""
+
+    def __init__(self, stages: List[Stage], queue_size: int,
+                 on_error: Optional[Callable[[Any, Exception], None]] = None):
+        """
+        Args:
+            stages: Etapas en orden; cada función recibe el elemento y devuelve
+                el elemento para la siguiente etapa
+            queue_size: Elementos máximos en espera por etapa
+            on_error: Función llamada si una etapa lanza una excepción; el
+                elemento se entrega como terminado sin pasar por las demás etapas
+        """
+        self.stages = stages
+        self.on_error = on_error
+        self.queues = [queue.Queue(maxsize=max(1, queue_size)) for _ in stages]
+        self.results: queue.Queue = queue.Queue()
+        self.threads: List[threading.Thread] = []
+        self.stopping = threading.Event()
+        self.in_flight = 0
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def start(self):
+        """Inicia los hilos de todas las etapas"""
+        for index, (name, func, workers) in enumerate(self.stages):
+            output = self.queues[index + 1] if index + 1 < len(self.stages) else self.results
+            for number in range(max(1, workers)):
+                thread = threading.Thread(
+                    target=self._worker, args=(name, func, self.queues[index], output),
+                    name=f"pipeline-{name}-{number}", daemon=True
+                )
+                thread.start()
+                self.threads.append(thread)
+
+    def _worker(self, name: str, func: Callable[[Any], Any], input_queue: queue.Queue,
+                output_queue: queue.Queue):
+        """Procesa elementos de una etapa hasta que se detenga el pipeline"""
+        while not self.stopping.is_set():
+            try:
+                item = input_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            try:
+                self._put(output_queue, func(item))
+            except Exception as e:
+                logger.error(f"Error en la etapa '{name}' del pipeline: {str(e)}")
+                if self.on_error:
+                    self.on_error(item, e)
+                self._put(self.results, item)
+
+    def _put(self, target: queue.Queue, item: Any):
+        """Encola un elemento esperando lugar mientras el pipeline siga activo"""
+        while not self.stopping.is_set():
+            try:
+                target.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def submit(self, item: Any) -> Iterator[Any]:
+        """
+        Envía un elemento a la primera etapa
+
+        Si la cola está llena, entrega los elementos que vayan terminando
+        mientras espera lugar (para que el hilo dueño no se bloquee).
+
+        Args:
+            item: Elemento a procesar
+
+        Yields:
+            Elementos terminados mientras se esperaba lugar en la cola
+        """
+        while True:
+            try:
+                self.queues[0].put(item, timeout=0.1)
+                self.in_flight += 1
+                return
+            except queue.Full:
+                yield from self.drain()
+
+    def drain(self, timeout: Optional[float] = None) -> Iterator[Any]:
+        """
+        Entrega los elementos terminados
+
+        Args:
+            timeout: Segundos a esperar el primer elemento (None: no esperar)
+
+        Yields:
+            Elementos que completaron todas las etapas
+        """
+        while self.in_flight:
+            try:
+                if timeout is None:
+                    item = self.results.get_nowait()
+                else:
+                    item = self.results.get(timeout=timeout)
+                    timeout = None
+            except queue.Empty:
+                return
+            self.in_flight -= 1
+            yield item
+
+    def finish(self) -> Iterator[Any]:
+        """
+        Espera y entrega todos los elementos pendientes
+
+        Yields:
+            Elementos que completaron todas las etapas
+        """
+        while self.in_flight:
+            yield from self.drain(timeout=0.5)
+
+    def stop(self):
+        """Detiene los hilos (los elementos aún en las colas se descartan)"""
+        self.stopping.set()
+        for thread in self.threads:
+            thread.join(timeout=5)
+        self.threads = []
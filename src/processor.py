@@ -20,54 +20,82 @@ Flujo de Organización de Correos:
    - Se mueven a carpeta 'BanBajio/otros' sin marcar como leídos
    - Evitan saturar la bandeja de entrada principal
 
+Etapas de procesamiento (pipeline):
+===================================
+
+Cada correo pasa por extracción (_extract_email, CPU), guardado en Supabase
+(_persist_email, red) y confirmación en el servidor (_ack_email, IMAP). Con
+PIPELINE_ENABLED las dos primeras etapas corren en hilos propios conectados
+por colas acotadas y la confirmación se hace en el hilo dueño de la conexión
+IMAP; sin él, _process_single_email ejecuta las tres etapas en secuencia.
+
 Para AGREGAR NUEVOS TIPOS DE CORREOS:
 ====================================
 
 1. Crear un nuevo processor (ej: src/nuevo_tipo_processor.py)
 2. Importarlo en este archivo y añadirlo a __init__
-3. Añadirlo a la lista processed_email_types en _process_single_email():
+3. Añadirlo a la lista processed_email_types en _extract_email():
    processed_email_types = [
        self.deposit_processor.is_deposit_email(subject),  # Depósitos
        self.nuevo_processor.is_nuevo_email(subject),     # Nuevo tipo
        # Más tipos...
    ]
-4. Antes del bloque "Si no tiene XML...", añadir el procesamiento:
+4. Antes del bloque "Si no tiene XML...", extraer los datos sin usar IMAP ni Supabase:
    if self.nuevo_processor.is_nuevo_email(subject):
-       # Procesar correo del nuevo tipo
+       work['kind'] = 'nuevo'
        nuevo_result = self.nuevo_processor.process_nuevo_email(msg)
-       # ...lógica de procesamiento...
-       # Si se procesa correctamente, marcar como leído y mover a 'BanBajio'
-       return stats
+       # ...guardar en work['data'] los datos a insertar...
+       return
+5. Insertar los datos en _persist_email() y, si se guardaron, marcar como
+   leído y mover a 'BanBajio' en _ack_email()
 
 Este diseño permite agregar tipos de correos procesables sin modificar la lógica existente.
 """
 
 import time
 from datetime import datetime
-from typing import List, Tuple
+from typing import Dict, List, Tuple
 from email.message import Message
 from .config import Config
 from .logger import logger
 from .email_client import EmailClient
-from .xml_parser import XMLParser
+from .failure_ledger import FailureLedger
+from . import parse_pool
+from .parse_cache import ParseCache
+from .message_structure import MessagePart, MessageStructure
+from .pipeline import StagedPipeline
+from .search_plan import SearchClass, SearchPlan
+from .xml_parser import create_xml_parser
 from .factura_mapper import FacturaMapper
 from .supabase_client import SupabaseClient
 from .bank_processor import BankProcessor
 from .deposit_processor import DepositProcessor
 from .transfer_processor import TransferProcessor
 
+# Movimientos bancarios: tipo -> textos de los logs
+MOVEMENT_LABELS = {
+    'transfer': {'name': 'Transferencia SPEI', 'inserted': 'insertada', 'duplicate': 'duplicada',
+                 'label': 'TRANSFERENCIA SPEI'},
+    'deposit': {'name': 'Depósito', 'inserted': 'insertado', 'duplicate': 'duplicado',
+                'label': 'DEPÓSITO'},
+}
+
 class FacturaProcessor:
     """Clase principal para procesamiento de facturas, depósitos y correos bancarios desde correo"""
 
     def __init__(self):
         """Inicializa el procesador de facturas"""
         self.email_client = EmailClient()
-        self.xml_parser = XMLParser()
+        self.xml_parser = create_xml_parser()
         self.factura_mapper = FacturaMapper()
         self.supabase_client = SupabaseClient()
         self.bank_processor = BankProcessor()
         self.deposit_processor = DepositProcessor()
         self.transfer_processor = TransferProcessor()
+        self.search_plan = self._build_search_plan()
+        self.failure_ledger = FailureLedger()
+        self.pending_quarantine: Dict[bytes, str] = {}  # UID -> clave del registro de fallos
+        self.parse_cache = ParseCache()
         self.running = False
 
         logger.info("Procesador de facturas, depósitos, transferencias SPEI y correos bancarios inicializado")
@@ -98,6 +126,9 @@ class FacturaProcessor:
                 logger.warning("No se pudo crear la carpeta 'BanBajio/otros', los correos 'otros' permanecerán en INBOX")
             else:
                 logger.info("Carpeta 'BanBajio/otros' disponible para correos no procesados")
+            if not self.email_client.create_folder_if_not_exists(Config.IMAP_QUARANTINE_FOLDER):
+                logger.warning(f"No se pudo crear la carpeta '{Config.IMAP_QUARANTINE_FOLDER}', "
+                               f"los correos fallidos permanecerán en INBOX")
 
             # Probar conexiones
             if not self._test_connections():
@@ -118,7 +149,11 @@ class FacturaProcessor:
                         # Esperar hasta el siguiente ciclo (usar intervalo idle)
                         sleep_time = Config.POLLING_INTERVAL_IDLE
                         logger.debug(f"Esperando {sleep_time} segundos para verificar horario nuevamente")
-                        time.sleep(sleep_time)
+                        self._sleep_with_keepalive(sleep_time)
+                        continue
+
+                    # Reutilizar la sesión IMAP; si se perdió, reconectar con espera exponencial
+                    if not self.email_client.ensure_connected():
                         continue
 
                     # Procesar correos
@@ -146,15 +181,17 @@ class FacturaProcessor:
                             interval = Config.POLLING_INTERVAL
                             logger.debug(f"Sin actividad ({idle_cycles} ciclos). Próximo ciclo en {interval}s")
 
-                    # Esperar antes del siguiente ciclo
-                    time.sleep(interval)
+                    # Esperar antes del siguiente ciclo (IDLE si está disponible)
+                    self._wait_for_next_cycle(interval)
 
                 except KeyboardInterrupt:
                     logger.info("Interrupción del usuario detectada. Deteniendo procesador.")
                     break
                 except Exception as e:
                     logger.error(f"Error en el ciclo de procesamiento: {str(e)}")
-                    time.sleep(30)  # Esperar 30 segundos antes de reintentar
+                    # Una sesión IMAP perdida se recupera en el siguiente ciclo con ensure_connected()
+                    if self.email_client.connected:
+                        time.sleep(30)  # Esperar 30 segundos antes de reintentar
 
         except Exception as e:
             logger.critical(f"Error crítico en el procesador: {str(e)}")
@@ -162,6 +199,45 @@ class FacturaProcessor:
             self._cleanup()
             logger.info("Procesador de facturas detenido")
     
+    def _wait_for_next_cycle(self, interval: int):
+        """
+        Espera hasta el siguiente ciclo de procesamiento
+
+        Con IMAP_IDLE_ENABLED y un servidor con capacidad IDLE, se mantiene la
+        conexión abierta y se despierta en cuanto el servidor notifica correo
+        nuevo. Cada espera en IDLE dura como máximo el intervalo de sondeo (y
+        IMAP_IDLE_TIMEOUT) para que los UIDs sin confirmar o fallidos se
+        reintenten aunque no llegue correo. Si IDLE no está disponible o
+        falla, se duerme el intervalo de sondeo.
+
+        Args:
+            interval: Segundos de espera en modo sondeo
+        """
+        if Config.IMAP_IDLE_ENABLED:
+            new_mail = self.email_client.wait_for_new_mail(min(Config.IMAP_IDLE_TIMEOUT, interval))
+            if new_mail is not None:
+                if not new_mail:
+                    logger.debug("IDLE expirado sin correo nuevo, iniciando ciclo de reintento")
+                return
+            logger.info("IDLE no disponible, usando sondeo")
+
+        self._sleep_with_keepalive(interval)
+
+    def _sleep_with_keepalive(self, seconds: int):
+        """
+        Duerme el tiempo indicado enviando NOOP para mantener viva la sesión IMAP
+
+        Args:
+            seconds: Segundos de espera
+        """
+        deadline = time.monotonic() + seconds
+        while self.running:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            time.sleep(min(remaining, Config.IMAP_KEEPALIVE_INTERVAL))
+            self.email_client.keepalive()
+
     def stop_processing(self):
         """Detiene el procesamiento"""
         logger.info("Deteniendo procesamiento de facturas")
@@ -192,6 +268,7 @@ class FacturaProcessor:
             'transfer_emails_processed': 0,
             'transfer_inserted': 0,
             'transfer_duplicates': 0,
+            'quarantined': 0,
             'errors': 0
         }
 
@@ -208,6 +285,9 @@ class FacturaProcessor:
                 logger.warning("No se pudo crear la carpeta 'BanBajio/otros', los correos 'otros' permanecerán en INBOX")
             else:
                 logger.info("Carpeta 'BanBajio/otros' disponible para correos no procesados")
+            if not self.email_client.create_folder_if_not_exists(Config.IMAP_QUARANTINE_FOLDER):
+                logger.warning(f"No se pudo crear la carpeta '{Config.IMAP_QUARANTINE_FOLDER}', "
+                               f"los correos fallidos permanecerán en INBOX")
 
             # Procesar correos
             stats = self._process_emails()
@@ -267,47 +347,34 @@ class FacturaProcessor:
             'transfer_emails_processed': 0,
             'transfer_inserted': 0,
             'transfer_duplicates': 0,
+            'quarantined': 0,
             'errors': 0
         }
         
         try:
-            # Obtener correos no leídos
-            unread_emails = self.email_client.get_unread_emails()
-            stats['emails_processed'] = len(unread_emails)
+            # Consumir los correos no leídos conforme se descargan (sin materializar la lista)
+            unread_emails = self.email_client.iter_unread_emails(
+                part_selector=self._select_email_parts,
+                search_plan=self.search_plan if Config.IMAP_SEARCH_PLAN_ENABLED else None
+            )
             
-            if not unread_emails:
+            self._consume_emails(unread_emails, stats)
+
+            # Mover de una sola vez los correos programados en este ciclo
+            self.email_client.flush_pending_moves()
+            self._confirm_quarantine(stats)
+
+            # Guardar el punto de control (los correos no confirmados se reintentan)
+            self.email_client.commit_checkpoint()
+
+            # Guardar el registro de fallos
+            self.failure_ledger.prune()
+            self.failure_ledger.save()
+
+            if stats['emails_processed'] == 0:
                 logger.info("No hay correos no leídos para procesar")
                 return stats
             
-            logger.info(f"Procesando {len(unread_emails)} correos no leídos")
-            
-            for email_id, msg in unread_emails:
-                try:
-                    # Procesar cada correo
-                    email_stats = self._process_single_email(email_id, msg)
-                    
-                    # Acumular estadísticas
-                    stats['xml_files_found'] += email_stats['xml_files_found']
-                    stats['facturas_processed'] += email_stats['facturas_processed']
-                    stats['facturas_inserted'] += email_stats['facturas_inserted']
-                    stats['duplicates_found'] += email_stats.get('duplicates_found', 0)
-                    stats['bank_emails_found'] += email_stats.get('bank_emails_found', 0)
-                    stats['bank_emails_processed'] += email_stats.get('bank_emails_processed', 0)
-                    stats['deposit_emails_found'] += email_stats.get('deposit_emails_found', 0)
-                    stats['deposit_emails_processed'] += email_stats.get('deposit_emails_processed', 0)
-                    stats['deposit_inserted'] += email_stats.get('deposit_inserted', 0)
-                    stats['deposit_duplicates'] += email_stats.get('deposit_duplicates', 0)
-                    stats['transfer_emails_found'] += email_stats.get('transfer_emails_found', 0)
-                    stats['transfer_emails_processed'] += email_stats.get('transfer_emails_processed', 0)
-                    stats['transfer_inserted'] += email_stats.get('transfer_inserted', 0)
-                    stats['transfer_duplicates'] += email_stats.get('transfer_duplicates', 0)
-                    stats['errors'] += email_stats['errors']
-                    
-                except Exception as e:
-                    logger.error(f"Error al procesar correo {email_id}: {str(e)}")
-                    stats['errors'] += 1
-                    continue
-            
             logger.info(f"📊 ESTADÍSTICAS FINALES:")
             logger.info(f"   - Correos totales procesados: {stats['emails_processed']}")
             logger.info(f"   - Transferencias SPEI encontradas: {stats['transfer_emails_found']}")
@@ -321,7 +388,14 @@ class FacturaProcessor:
             logger.info(f"   - Archivos XML encontrados: {stats['xml_files_found']}")
             logger.info(f"   - Facturas procesadas: {stats['facturas_processed']}")
             logger.info(f"   - Facturas insertadas: {stats['facturas_inserted']}")
+            logger.info(f"   - Correos en cuarentena: {stats['quarantined']}")
             logger.info(f"   - Errores: {stats['errors']}")
+            logger.info(f"   - Caché de parseo: {self.parse_cache.stats()}")
+            if self.xml_parser.schema_validator is not None:
+                # Solo los XML validados en este proceso (no los del pool de parseo)
+                logger.info(f"   - Validación XSD: {self.xml_parser.schema_validator.stats()}")
+            if self.xml_parser.seal_verifier is not None:
+                logger.info(f"   - Verificación de sellos: {self.xml_parser.seal_verifier.stats()}")
             logger.info(f"Procesamiento finalizado: {stats}")
             return stats
             
@@ -330,10 +404,259 @@ class FacturaProcessor:
             stats['errors'] += 1
             return stats
     
+    def _consume_emails(self, unread_emails, stats: dict):
+        """
+        Procesa los correos descargados (pipeline por etapas o uno a la vez)
+
+        Args:
+            unread_emails: Iterador de tuplas (email_id, msg)
+            stats: Estadísticas del ciclo
+        """
+        if Config.PIPELINE_ENABLED:
+            self._process_emails_pipeline(unread_emails, stats)
+            return
+
+        for email_id, msg in unread_emails:
+            stats['emails_processed'] += 1
+            work = self._new_work(email_id, msg)
+            try:
+                # Procesar cada correo (reuniendo los errores registrados para el registro de fallos)
+                self._extract_stage(work)
+                self._run_stage(self._persist_email, work)
+                self._complete_work(work, stats)
+
+            except Exception as e:
+                logger.error(f"Error al procesar correo {email_id}: {str(e)}")
+                stats['errors'] += 1
+                if work['extract_errors'] is None:
+                    work['extract_errors'] = [str(e)]
+                self._record_outcome(email_id, work['subject'], work['extract_errors'], stats)
+                continue
+            finally:
+                # Liberar el árbol MIME antes de descargar el siguiente correo
+                del msg, work
+
+    def _process_emails_pipeline(self, unread_emails, stats: dict):
+        """
+        Procesa los correos con el pipeline por etapas
+
+        Este hilo descarga los correos (IMAP) y los envía a la etapa de
+        extracción (CPU); la etapa de guardado inserta en Supabase con varios
+        hilos; las confirmaciones IMAP se aplican en este mismo hilo conforme
+        terminan los correos. Las colas acotadas (PIPELINE_QUEUE_SIZE) limitan
+        los correos en memoria.
+
+        Args:
+            unread_emails: Iterador de tuplas (email_id, msg)
+            stats: Estadísticas del ciclo
+        """
+        pipeline = StagedPipeline([
+            ('extraccion', self._extract_stage, Config.PIPELINE_EXTRACT_WORKERS),
+            ('guardado', lambda work: self._run_stage(self._persist_email, work),
+             Config.PIPELINE_PERSIST_WORKERS),
+        ], queue_size=Config.PIPELINE_QUEUE_SIZE, on_error=self._on_stage_error)
+
+        with pipeline:
+            for email_id, msg in unread_emails:
+                stats['emails_processed'] += 1
+                for work in pipeline.submit(self._new_work(email_id, msg)):
+                    self._complete_work(work, stats)
+                del msg
+
+                # Confirmar los correos que ya terminaron sin esperar al resto
+                for work in pipeline.drain():
+                    self._complete_work(work, stats)
+
+            for work in pipeline.finish():
+                self._complete_work(work, stats)
+
+    def _run_stage(self, stage, work: dict) -> dict:
+        """
+        Ejecuta una etapa reuniendo los errores que registre
+
+        Args:
+            stage: Método de la etapa (_extract_email, _persist_email)
+            work: Elemento de trabajo
+
+        Returns:
+            dict: El mismo elemento de trabajo
+        """
+        with logger.capture_errors() as errors:
+            stage(work)
+        work['errors'].extend(errors)
+        return work
+
+    def _extract_stage(self, work: dict) -> dict:
+        """
+        Ejecuta la etapa de extracción separando sus errores
+
+        Solo los errores de extracción (correo sin rastreo, XML que no se puede
+        parsear) cuentan para la cuarentena; los de Supabase e IMAP son
+        temporales y el correo se reintenta sin límite.
+
+        Args:
+            work: Elemento de trabajo
+
+        Returns:
+            dict: El mismo elemento de trabajo
+        """
+        self._run_stage(self._extract_email, work)
+        work['extract_errors'] = list(work['errors'])
+        return work
+
+    def _on_stage_error(self, work: dict, error: Exception):
+        """Registra en el elemento de trabajo una excepción no controlada de una etapa"""
+        work.pop('msg', None)
+        work['kind'] = None
+        work['stats']['errors'] += 1
+        work['errors'].append(str(error))
+        if work['extract_errors'] is None:
+            work['extract_errors'] = [str(error)]
+
+    def _complete_work(self, work: dict, stats: dict):
+        """
+        Confirma un correo en el servidor y acumula sus estadísticas
+
+        Args:
+            work: Elemento de trabajo que pasó por las etapas de extracción y guardado
+            stats: Estadísticas del ciclo
+        """
+        self._run_stage(self._ack_email, work)
+        email_stats = work['stats']
+
+        # Acumular estadísticas
+        for key in ('xml_files_found', 'facturas_processed', 'facturas_inserted', 'duplicates_found',
+                    'bank_emails_found', 'bank_emails_processed',
+                    'deposit_emails_found', 'deposit_emails_processed', 'deposit_inserted', 'deposit_duplicates',
+                    'transfer_emails_found', 'transfer_emails_processed', 'transfer_inserted', 'transfer_duplicates',
+                    'errors'):
+            stats[key] += email_stats[key]
+        stats['otros_moved'] = stats.get('otros_moved', 0) + email_stats.get('otros_moved', 0)
+
+        self._record_outcome(work['email_id'], work['subject'], work['extract_errors'] or [], stats)
+
+    def _record_outcome(self, email_id: bytes, subject: str, errors: List[str], stats: dict):
+        """
+        Actualiza el registro de fallos con el resultado de un correo
+
+        Un correo confirmado (marcado como leído o programado para moverse) se
+        elimina del registro. Un correo con errores de extracción suma un
+        intento fallido y, al llegar a IMAP_MAX_ATTEMPTS, se mueve a la carpeta
+        de cuarentena para no volver a descargarse en cada ciclo. Los errores
+        al guardar en Supabase o confirmar en IMAP no cuentan: una caída del
+        servicio no debe mandar correos válidos a cuarentena.
+
+        Args:
+            email_id: UID del correo
+            subject: Asunto del correo
+            errors: Mensajes de error registrados durante la extracción
+            stats: Estadísticas del ciclo
+        """
+        key = FailureLedger.key(self.email_client.uidvalidity, email_id)
+        if (email_id in self.email_client.acknowledged_uids or
+                email_id in self.email_client.pending_moves):
+            self.failure_ledger.clear(key)
+            return
+        if not errors:
+            return
+
+        last_error = '; '.join(errors[-3:])
+        attempts = self.failure_ledger.record_failure(key, subject, last_error)
+        logger.debug(f"Correo {email_id} falló {attempts}/{self.failure_ledger.max_attempts} veces")
+
+        if self.failure_ledger.should_quarantine(key):
+            if self.email_client.move_email_to_folder(email_id, Config.IMAP_QUARANTINE_FOLDER):
+                # Se marca en el registro cuando flush_pending_moves() confirme el movimiento
+                self.pending_quarantine[email_id] = key
+
+    def _confirm_quarantine(self, stats: dict):
+        """
+        Marca en el registro de fallos los correos que llegaron a cuarentena
+
+        Se llama después de flush_pending_moves(). Si el movimiento falló, el
+        registro queda sin marcar y el correo se vuelve a enviar a cuarentena
+        en el siguiente ciclo.
+
+        Args:
+            stats: Estadísticas del ciclo
+        """
+        for email_id, key in self.pending_quarantine.items():
+            entry = self.failure_ledger.entries.get(key, {})
+            if email_id in self.email_client.acknowledged_uids:
+                self.failure_ledger.mark_quarantined(key, Config.IMAP_QUARANTINE_FOLDER)
+                stats['quarantined'] += 1
+                logger.warning(f"Correo {email_id} ({entry.get('subject')}) enviado a "
+                               f"'{Config.IMAP_QUARANTINE_FOLDER}' tras {entry.get('attempts')} "
+                               f"intentos fallidos: {entry.get('last_error')}")
+            else:
+                logger.error(f"No se pudo mover el correo {email_id} a '{Config.IMAP_QUARANTINE_FOLDER}'; "
+                             f"se reintentará en el siguiente ciclo")
+        self.pending_quarantine = {}
+
+    def _build_search_plan(self) -> SearchPlan:
+        """
+        Construye el plan de búsqueda del servidor con las reglas de clasificación
+
+        El orden es el mismo de _process_single_email: transferencias, depósitos
+        y correos bancarios (de estos últimos solo se descarga la cabecera).
+
+        Returns:
+            SearchPlan para EmailClient.iter_unread_emails()
+        """
+        return SearchPlan([
+            SearchClass('transferencia', self.transfer_processor.search_criteria()),
+            SearchClass('deposito', self.deposit_processor.search_criteria()),
+            SearchClass('bancario', [[('FROM', domain)] for domain in self.email_client.bank_domains],
+                        header_only=True, confirm=self._is_bank_only_email),
+        ])
+
+    def _is_bank_only_email(self, msg: Message) -> bool:
+        """
+        Indica si un correo se procesa como bancario con solo su cabecera
+
+        Args:
+            msg: Mensaje (puede contener solo la cabecera)
+
+        Returns:
+            bool: True si es del banco y no es transferencia ni depósito
+        """
+        subject = msg.get('subject', '')
+        return (not self.transfer_processor.is_transfer_email(subject) and
+                not self.deposit_processor.is_deposit_email(subject) and
+                self.email_client.is_bank_email(msg))
+
+    def _select_email_parts(self, structure: MessageStructure) -> List[MessagePart]:
+        """
+        Elige las partes MIME a descargar según la clasificación del correo
+
+        Usa la misma lógica de asunto y remitente que _process_single_email:
+        transferencias y depósitos solo necesitan el cuerpo de texto/HTML,
+        los correos bancarios y 'otros' solo la cabecera, y las facturas solo
+        sus adjuntos XML.
+
+        Args:
+            structure: ENVELOPE + BODYSTRUCTURE del correo
+
+        Returns:
+            List de partes a descargar (vacía para descargar solo la cabecera)
+        """
+        if (self.transfer_processor.is_transfer_email(structure.subject) or
+                self.deposit_processor.is_deposit_email(structure.subject)):
+            return structure.text_parts()
+
+        if self.email_client.is_bank_address(structure.from_addr):
+            return []
+
+        return structure.xml_attachments()
+
     def _process_single_email(self, email_id: bytes, msg: Message) -> dict:
         """
         Procesa un solo correo electrónico
 
+        Ejecuta en secuencia las etapas del pipeline: extracción
+        (_extract_email), guardado en Supabase (_persist_email) y confirmación
+        en el servidor IMAP (_ack_email).
+
         Args:
             email_id: ID del correo
             msg: Mensaje de correo
@@ -341,30 +664,73 @@ class FacturaProcessor:
         Returns:
             dict: Estadísticas del procesamiento del correo
         """
-        stats = {
-            'xml_files_found': 0,
-            'facturas_processed': 0,
-            'facturas_inserted': 0,
-            'duplicates_found': 0,
-            'bank_emails_found': 0,
-            'bank_emails_processed': 0,
-            'deposit_emails_found': 0,
-            'deposit_emails_processed': 0,
-            'deposit_inserted': 0,
-            'deposit_duplicates': 0,
-            'transfer_emails_found': 0,
-            'transfer_emails_processed': 0,
-            'transfer_inserted': 0,
-            'transfer_duplicates': 0,
-            'errors': 0
+        work = self._new_work(email_id, msg)
+        self._extract_email(work)
+        self._persist_email(work)
+        self._ack_email(work)
+        return work['stats']
+
+    def _new_work(self, email_id: bytes, msg: Message) -> dict:
+        """
+        Crea el elemento de trabajo de un correo para las etapas de procesamiento
+
+        Args:
+            email_id: UID del correo
+            msg: Mensaje de correo (se libera al terminar la extracción)
+
+        Returns:
+            dict: Elemento de trabajo
+        """
+        return {
+            'email_id': email_id,
+            'msg': msg,
+            'subject': msg.get('subject', 'Sin asunto'),
+            'kind': None,          # transfer, deposit, bank, otros o factura
+            'data': None,          # Movimiento bancario a insertar
+            'facturas': [],        # Facturas mapeadas a insertar
+            'acknowledge': False,  # Movimiento insertado o duplicado: marcar como leído y mover
+            'duplicate': False,
+            'errors': [],          # Mensajes de error registrados en las etapas
+            'extract_errors': None,  # Errores de la extracción (None mientras no termina)
+            'stats': {
+                'xml_files_found': 0,
+                'facturas_processed': 0,
+                'facturas_inserted': 0,
+                'duplicates_found': 0,
+                'bank_emails_found': 0,
+                'bank_emails_processed': 0,
+                'deposit_emails_found': 0,
+                'deposit_emails_processed': 0,
+                'deposit_inserted': 0,
+                'deposit_duplicates': 0,
+                'transfer_emails_found': 0,
+                'transfer_emails_processed': 0,
+                'transfer_inserted': 0,
+                'transfer_duplicates': 0,
+                'errors': 0
+            }
         }
 
+    def _extract_email(self, work: dict):
+        """
+        Etapa de extracción (CPU): clasifica el correo y extrae sus datos
+
+        No usa la conexión IMAP ni Supabase, por lo que puede ejecutarse en
+        un hilo del pipeline.
+
+        Args:
+            work: Elemento de trabajo (ver _new_work)
+        """
+        msg = work.pop('msg')
+        stats = work['stats']
+
         try:
             # Obtener información del correo
             email_info = self.email_client.get_email_info(msg)
             subject = email_info['subject']
             from_addr = email_info['from']
             is_bank = email_info['is_bank']
+            work['subject'] = subject
 
             logger.info(f"🔍 ANALIZANDO CORREO: {subject} de {from_addr}")
 
@@ -372,6 +738,7 @@ class FacturaProcessor:
             # Usar el subject directamente del mensaje para mejor detección
             raw_subject = msg.get('subject', '')
             if self.transfer_processor.is_transfer_email(raw_subject):
+                work['kind'] = 'transfer'
                 stats['transfer_emails_found'] = 1
                 logger.info(f"Correo de transferencia SPEI identificado: {subject}")
 
@@ -382,55 +749,16 @@ class FacturaProcessor:
 
                 if transfer_result['processed'] and transfer_result['data']:
                     stats['transfer_emails_processed'] = 1
-
-                    # Insertar en Supabase
-                    if self.supabase_client.insert_movimiento_bancario(transfer_result['data']):
-                        stats['transfer_inserted'] = 1
-                        logger.info(f"Transferencia SPEI insertada correctamente: {transfer_result['data'].get('rastreo')}")
-
-                        # Marcar como leído
-                        if self.email_client.mark_email_as_read(email_id):
-                            logger.info(f"✅ Correo TRANSFERENCIA SPEI marcado como leído: {subject}")
-
-                            # Mover a carpeta BanBajio
-                            logger.info(f"ACCION: Moviendo correo TRANSFERENCIA SPEI a carpeta 'BanBajio'")
-                            if self.email_client.move_email_to_folder(email_id, 'BanBajio'):
-                                logger.info(f"✅ EXITO: Correo TRANSFERENCIA SPEI movido a 'BanBajio': {subject}")
-                            else:
-                                logger.warning(f"❌ ERROR: No se pudo mover correo TRANSFERENCIA SPEI a 'BanBajio': {subject}")
-                    else:
-                        # Verificar si es un duplicado (no contar como error, pero SÍ marcar como leído)
-                        if transfer_result['data'].get('rastreo'):
-                            existing = self.supabase_client.get_movimiento_by_rastreo(transfer_result['data']['rastreo'])
-                            if existing:
-                                stats['transfer_duplicates'] += 1
-                                logger.warning(f"Transferencia SPEI duplicada (ya existe): {transfer_result['data']['rastreo']}")
-
-                                # IMPORTANTE: Marcar como leído y mover para evitar ciclo infinito
-                                if self.email_client.mark_email_as_read(email_id):
-                                    logger.info(f"✅ Correo TRANSFERENCIA SPEI duplicado marcado como leído: {subject}")
-
-                                    # Mover a carpeta BanBajio
-                                    logger.info(f"ACCION: Moviendo correo TRANSFERENCIA SPEI duplicado a carpeta 'BanBajio'")
-                                    if self.email_client.move_email_to_folder(email_id, 'BanBajio'):
-                                        logger.info(f"✅ EXITO: Correo TRANSFERENCIA SPEI duplicado movido a 'BanBajio': {subject}")
-                                    else:
-                                        logger.warning(f"❌ ERROR: No se pudo mover correo TRANSFERENCIA SPEI duplicado a 'BanBajio': {subject}")
-                                else:
-                                    logger.warning(f"❌ ERROR: No se pudo marcar correo duplicado como leído: {subject}")
-                                    stats['errors'] += 1
-                            else:
-                                logger.error(f"Error al insertar transferencia SPEI: {transfer_result['data'].get('rastreo')}")
-                                stats['errors'] += 1
+                    work['data'] = transfer_result['data']
                 else:
                     stats['errors'] += transfer_result['errors']
                     logger.error(f"Error al procesar correo de transferencia SPEI: {subject}")
-
-                return stats
+                return
 
             # Verificar si es un correo de depósito
             # Usar el subject directamente del mensaje para mejor detección
             if self.deposit_processor.is_deposit_email(raw_subject):
+                work['kind'] = 'deposit'
                 stats['deposit_emails_found'] = 1
                 logger.info(f"Correo de depósito identificado: {subject}")
 
@@ -441,59 +769,16 @@ class FacturaProcessor:
 
                 if deposit_result['processed'] and deposit_result['data']:
                     stats['deposit_emails_processed'] = 1
-
-                    # Insertar en Supabase
-                    if self.supabase_client.insert_movimiento_bancario(deposit_result['data']):
-                        stats['deposit_inserted'] = 1
-                        logger.info(f"Depósito insertado correctamente: {deposit_result['data'].get('rastreo')}")
-
-                        # Marcar como leído
-                        if self.email_client.mark_email_as_read(email_id):
-                            logger.info(f"✅ Correo DEPÓSITO marcado como leído: {subject}")
-
-                            # Mover a carpeta BanBajio
-                            logger.info(f"ACCION: Moviendo correo DEPÓSITO a carpeta 'BanBajio'")
-                            if self.email_client.move_email_to_folder(email_id, 'BanBajio'):
-                                logger.info(f"✅ EXITO: Correo DEPÓSITO movido a 'BanBajio': {subject}")
-                            else:
-                                logger.warning(f"❌ ERROR: No se pudo mover correo DEPÓSITO a 'BanBajio': {subject}")
-                    else:
-                        # Verificar si es un duplicado (no contar como error, pero SÍ marcar como leído)
-                        if deposit_result['data'].get('rastreo'):
-                            existing = self.supabase_client.get_movimiento_by_rastreo(deposit_result['data']['rastreo'])
-                            if existing:
-                                stats['deposit_duplicates'] += 1
-                                logger.warning(f"Depósito duplicado (ya existe): {deposit_result['data']['rastreo']}")
-
-                                # IMPORTANTE: Marcar como leído y mover para evitar ciclo infinito
-                                if self.email_client.mark_email_as_read(email_id):
-                                    logger.info(f"✅ Correo DEPÓSITO duplicado marcado como leído: {subject}")
-
-                                    # Mover a carpeta BanBajio
-                                    logger.info(f"ACCION: Moviendo correo DEPÓSITO duplicado a carpeta 'BanBajio'")
-                                    if self.email_client.move_email_to_folder(email_id, 'BanBajio'):
-                                        logger.info(f"✅ EXITO: Correo DEPÓSITO duplicado movido a 'BanBajio': {subject}")
-                                    else:
-                                        logger.warning(f"❌ ERROR: No se pudo mover correo DEPÓSITO duplicado a 'BanBajio': {subject}")
-                                else:
-                                    logger.warning(f"❌ ERROR: No se pudo marcar correo duplicado como leído: {subject}")
-                                    stats['errors'] += 1
-                            else:
-                                logger.error(f"Error al insertar depósito: {deposit_result['data'].get('rastreo')}")
-                                stats['errors'] += 1
+                    work['data'] = deposit_result['data']
                 else:
                     stats['errors'] += deposit_result['errors']
                     logger.error(f"Error al procesar correo de depósito: {subject}")
-
-                return stats
+                return
 
             # Extraer archivos XML adjuntos
             xml_files = self.email_client.get_xml_attachments(msg)
             stats['xml_files_found'] = len(xml_files)
 
-            # Determinar el tipo de correo y cómo procesarlo
-            email_processed = False
-
             # Tipos de correos que se procesan y van a carpeta BanBajio
             processed_email_types = [
                 self.transfer_processor.is_transfer_email(subject),  # Correos de transferencia SPEI
@@ -504,6 +789,7 @@ class FacturaProcessor:
 
             # Si es un correo bancario regular (no es depósito), procesarlo diferente
             if is_bank and not processed_email_types[0]:
+                work['kind'] = 'bank'
                 stats['bank_emails_found'] = 1
                 logger.info(f"Correo bancario identificado: {subject}")
 
@@ -516,7 +802,142 @@ class FacturaProcessor:
                 else:
                     stats['errors'] += bank_result['errors']
                     logger.error(f"Error al procesar correo bancario: {subject}")
+                return
+
+            # Si no tiene XML y no es un tipo de correo procesado
+            if not xml_files and not any(processed_email_types):
+                work['kind'] = 'otros'
+                logger.info(f"Correo identificado como 'OTROS' - no contiene XML ni es tipo procesado: {subject}")
+                logger.info(f"De: {from_addr} | Subject: {subject}")
+                return
+
+            # Parsear todos los XML del correo (en procesos separados si son muchos;
+            # los adjuntos idénticos a uno ya parseado se toman de la caché)
+            work['kind'] = 'factura'
+            xml_results = self.parse_cache.parse_many(xml_files, self.xml_parser.parse_many)
+            facturas = self.factura_mapper.map_many(xml_results)
+
+            for xml_data, factura_data in zip(xml_results, facturas):
+                if not xml_data:
+                    logger.error("Error al parsear XML")
+                    stats['errors'] += 1
+                    continue
+
+                stats['facturas_processed'] += 1
+
+                if not factura_data:
+                    logger.error("Error al mapear factura")
+                    stats['errors'] += 1
+                    continue
+
+                work['facturas'].append(factura_data)
+
+        except Exception as e:
+            logger.error(f"Error al procesar correo individual: {str(e)}")
+            stats['errors'] += 1
+            work['kind'] = None
+
+    def _persist_email(self, work: dict):
+        """
+        Etapa de guardado (red): inserta los datos extraídos en Supabase
+
+        Los duplicados no cuentan como error; el correo se confirma igual para
+        evitar reprocesarlo en cada ciclo.
+
+        Args:
+            work: Elemento de trabajo (ver _new_work)
+        """
+        stats = work['stats']
+        kind = work['kind']
+
+        try:
+            if kind in MOVEMENT_LABELS and work['data']:
+                data = work['data']
+                texts = MOVEMENT_LABELS[kind]
+
+                if self.supabase_client.insert_movimiento_bancario(data):
+                    stats[f'{kind}_inserted'] = 1
+                    work['acknowledge'] = True
+                    logger.info(f"{texts['name']} {texts['inserted']} correctamente: {data.get('rastreo')}")
+                elif data.get('rastreo'):
+                    # Verificar si es un duplicado (no contar como error, pero SÍ marcar como leído)
+                    if self.supabase_client.get_movimiento_by_rastreo(data['rastreo']):
+                        stats[f'{kind}_duplicates'] += 1
+                        work['acknowledge'] = True
+                        work['duplicate'] = True
+                        logger.warning(f"{texts['name']} {texts['duplicate']} (ya existe): {data['rastreo']}")
+                    else:
+                        logger.error(f"Error al insertar {texts['name']}: {data.get('rastreo')}")
+                        stats['errors'] += 1
+
+            elif kind == 'factura':
+                for factura_data in work['facturas']:
+                    try:
+                        uuid = factura_data.get('uuidCFDI')
+
+                        # UUID ya insertado o encontrado en este proceso: duplicado sin consultar Supabase
+                        if self.parse_cache.is_known_uuid(uuid):
+                            stats['duplicates_found'] += 1
+                            logger.warning(f"Factura duplicada (ya procesada): {uuid}")
+                            continue
+
+                        # Insertar en Supabase
+                        if self.supabase_client.insert_factura(factura_data):
+                            stats['facturas_inserted'] += 1
+                            self.parse_cache.add_known_uuid(uuid)
+                            logger.info(f"Factura insertada correctamente: {factura_data.get('uuidCFDI')}")
+                        else:
+                            # Verificar si es un duplicado (no contar como error para marcar correo)
+                            existing = self.supabase_client.get_factura_by_uuid(factura_data.get('uuidCFDI'))
+                            if existing:
+                                self.parse_cache.add_known_uuid(uuid)
+                                stats['duplicates_found'] += 1
+                                logger.warning(f"Factura duplicada (ya existe): {factura_data.get('uuidCFDI')}")
+                            else:
+                                logger.error(f"Error al insertar factura: {factura_data.get('uuidCFDI')}")
+                                stats['errors'] += 1
+                    except Exception as e:
+                        logger.error(f"Error al procesar archivo XML: {str(e)}")
+                        stats['errors'] += 1
+
+        except Exception as e:
+            logger.error(f"Error al guardar correo en Supabase: {str(e)}")
+            stats['errors'] += 1
+            work['acknowledge'] = False
+
+    def _ack_email(self, work: dict):
+        """
+        Etapa de confirmación (IMAP): marca como leído y programa el movimiento
+
+        Se ejecuta siempre en el hilo dueño de la conexión IMAP.
 
+        Args:
+            work: Elemento de trabajo (ver _new_work)
+        """
+        email_id = work['email_id']
+        subject = work['subject']
+        stats = work['stats']
+        kind = work['kind']
+
+        try:
+            if kind in MOVEMENT_LABELS:
+                if not work['acknowledge']:
+                    return
+                label = MOVEMENT_LABELS[kind]['label'] + (' duplicado' if work['duplicate'] else '')
+
+                # Marcar como leído y mover a carpeta BanBajio
+                if self.email_client.mark_email_as_read(email_id):
+                    logger.info(f"✅ Correo {label} marcado como leído: {subject}")
+                    logger.info(f"ACCION: Moviendo correo {label} a carpeta 'BanBajio'")
+                    if self.email_client.move_email_to_folder(email_id, 'BanBajio'):
+                        logger.info(f"✅ EXITO: Correo {label} movido a 'BanBajio': {subject}")
+                    else:
+                        logger.warning(f"❌ ERROR: No se pudo mover correo {label} a 'BanBajio': {subject}")
+                elif work['duplicate']:
+                    logger.warning(f"❌ ERROR: No se pudo marcar correo duplicado como leído: {subject}")
+                    stats['errors'] += 1
+
+            elif kind == 'bank':
                 # IMPORTANTE: No marcar correos bancarios como leídos, pero SÍ moverlos a otros
                 logger.info(f"ACCION: Moviendo correo BANCARIO a carpeta 'BanBajio/otros' (sin marcar como leído)")
                 if self.email_client.move_email_to_folder(email_id, 'BanBajio/otros'):
@@ -526,13 +947,7 @@ class FacturaProcessor:
                     logger.warning(f"❌ ERROR: No se pudo mover correo BANCARIO a 'BanBajio/otros': {subject}")
                     stats['errors'] += 1
 
-                return stats
-
-            # Si no tiene XML y no es un tipo de correo procesado
-            if not xml_files and not any(processed_email_types):
-                logger.info(f"Correo identificado como 'OTROS' - no contiene XML ni es tipo procesado: {subject}")
-                logger.info(f"De: {from_addr} | Subject: {subject}")
-
+            elif kind == 'otros':
                 # Mover a carpeta BanBajio/otros sin marcar como leído
                 logger.info(f"ACCION: Moviendo correo 'OTROS' a carpeta 'BanBajio/otros' (sin marcar como leído)")
                 if self.email_client.move_email_to_folder(email_id, 'BanBajio/otros'):
@@ -544,80 +959,39 @@ class FacturaProcessor:
                     logger.info(f"FALLBACK: Marcando correo 'OTROS' como leído para evitar reprocesar")
                     self.email_client.mark_email_as_read(email_id)
 
-                return stats
-
-            # Procesar cada archivo XML
-            for xml_content in xml_files:
-                try:
-                    # Parsear XML
-                    xml_data = self.xml_parser.parse_xml(xml_content)
-                    if not xml_data:
-                        logger.error("Error al parsear XML")
-                        stats['errors'] += 1
-                        continue
-
-                    stats['facturas_processed'] += 1
-
-                    # Mapear a estructura de catFacturas
-                    factura_data = self.factura_mapper.map_to_catfacturas(xml_data)
-                    if not factura_data:
-                        logger.error("Error al mapear factura")
-                        stats['errors'] += 1
-                        continue
-
-                    # Insertar en Supabase
-                    if self.supabase_client.insert_factura(factura_data):
-                        stats['facturas_inserted'] += 1
-                        logger.info(f"Factura insertada correctamente: {factura_data.get('uuidCFDI')}")
-                    else:
-                        # Verificar si es un duplicado (no contar como error para marcar correo)
-                        existing = self.supabase_client.get_factura_by_uuid(factura_data.get('uuidCFDI'))
-                        if existing:
-                            stats['duplicates_found'] += 1
-                            logger.warning(f"Factura duplicada (ya existe): {factura_data.get('uuidCFDI')}")
+            elif kind == 'factura':
+                # Marcar correo como leído y mover a procesados si:
+                # - No hubo errores, O
+                # - Solo hubo duplicados (los duplicados no son errores críticos)
+                if stats['errors'] == 0:
+                    # Marcar como leído
+                    if self.email_client.mark_email_as_read(email_id):
+                        if stats['duplicates_found'] > 0:
+                            logger.info(f"✅ Correo FACTURA marcado como leído ({stats['duplicates_found']} duplicados): {subject}")
                         else:
-                            logger.error(f"Error al insertar factura: {factura_data.get('uuidCFDI')}")
-                            stats['errors'] += 1
-
-                except Exception as e:
-                    logger.error(f"Error al procesar archivo XML: {str(e)}")
-                    stats['errors'] += 1
-                    continue
-
-            # Marcar correo como leído y mover a procesados si:
-            # - No hubo errores, O
-            # - Solo hubo duplicados (los duplicados no son errores críticos)
-            if stats['errors'] == 0:
-                # Marcar como leído
-                if self.email_client.mark_email_as_read(email_id):
-                    if stats['duplicates_found'] > 0:
-                        logger.info(f"✅ Correo FACTURA marcado como leído ({stats['duplicates_found']} duplicados): {subject}")
-                    else:
-                        logger.info(f"✅ Correo FACTURA marcado como leído: {subject}")
+                            logger.info(f"✅ Correo FACTURA marcado como leído: {subject}")
 
-                    # Mover a carpeta procesados (solo para correos no bancarios)
-                    logger.info(f"ACCION: Moviendo correo FACTURA XML a carpeta 'procesados'")
-                    if self.email_client.move_email_to_folder(email_id, 'procesados'):
-                        logger.info(f"✅ EXITO: Correo FACTURA XML movido a 'procesados': {subject}")
+                        # Mover a carpeta procesados (solo para correos no bancarios)
+                        logger.info(f"ACCION: Moviendo correo FACTURA XML a carpeta 'procesados'")
+                        if self.email_client.move_email_to_folder(email_id, 'procesados'):
+                            logger.info(f"✅ EXITO: Correo FACTURA XML movido a 'procesados': {subject}")
+                        else:
+                            logger.error(f"❌ ERROR: No se pudo mover correo FACTURA XML a 'procesados': {subject}")
                     else:
-                        logger.error(f"❌ ERROR: No se pudo mover correo FACTURA XML a 'procesados': {subject}")
+                        logger.warning(f"No se pudo marcar como leído: {subject}")
                 else:
-                    logger.warning(f"No se pudo marcar como leído: {subject}")
-            else:
-                logger.warning(f"Correo NO marcado como leído debido a {stats['errors']} errores: {subject}")
-            
-            return stats
-            
+                    logger.warning(f"Correo NO marcado como leído debido a {stats['errors']} errores: {subject}")
+
         except Exception as e:
-            logger.error(f"Error al procesar correo individual: {str(e)}")
+            logger.error(f"Error al confirmar correo {email_id} en el servidor: {str(e)}")
             stats['errors'] += 1
-            return stats
-    
+
     def _cleanup(self):
         """Realiza limpieza de recursos"""
         try:
             # Cerrar conexión de correo
             self.email_client.disconnect()
+            parse_pool.shutdown()
             logger.info("Limpieza de recursos completada")
         except Exception as e:
             logger.error(f"Error en limpieza: {str(e)}")
@@ -636,6 +1010,11 @@ class FacturaProcessor:
             status = {
                 'running': self.running,
                 'facturas_en_db': facturas_count,
+                'parse_cache': self.parse_cache.stats(),
+                'schema_validation': (self.xml_parser.schema_validator.stats()
+                                      if self.xml_parser.schema_validator is not None else None),
+                'seal_verification': (self.xml_parser.seal_verifier.stats()
+                                      if self.xml_parser.seal_verifier is not None else None),
                 'config': {
                     'imap_server': Config.IMAP_SERVER,
                     'imap_port': Config.IMAP_PORT,
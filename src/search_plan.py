@@ -0,0 +1,140 @@
+"""
+Módulo de plan de búsqueda IMAP del lado del servidor
+
+Traduce las reglas de clasificación de correos (remitente y asunto) a
+criterios UID SEARCH para que el servidor entregue los UIDs ya agrupados
+por tipo de correo, antes de descargar cualquier mensaje.
+"""
+
+from email.message import Message
+from typing import Callable, Dict, List, Optional, Tuple
+from .logger import logger
+
+# Criterio: alternativas unidas con OR; cada alternativa es una lista de
+# (clave, valor) que deben cumplirse todas (ej: [('SUBJECT', 'spei'), ('SUBJECT', 'transferencia')])
+SearchCriteria = List[List[Tuple[str, str]]]
+
+
+def quote_search_value(value: str) -> str:
+    """Convierte un valor ASCII en string IMAP entre comillas"""
+    return '"' + value.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+class SearchClass:
+    """Tipo de correo identificado por criterios de búsqueda del servidor"""
+
+    def __init__(self, name: str, criteria: SearchCriteria, header_only: bool = False,
+                 confirm: Optional[Callable[[Message], bool]] = None):
+        """
+        Args:
+            name: Nombre del tipo de correo (ej: 'transferencia')
+            criteria: Alternativas de búsqueda (unidas con OR)
+            header_only: Si los correos de este tipo solo requieren la cabecera
+            confirm: Verificación del lado del cliente sobre la cabecera; los
+                correos que no la cumplan se descargan completos
+        """
+        for alternative in criteria:
+            non_ascii = [value for _, value in alternative if not value.isascii()]
+            if len(non_ascii) > 1:
+                # imaplib solo envía un literal por comando
+                raise ValueError(f"La alternativa {alternative} de '{name}' tiene más de un valor no ASCII")
+        self.name = name
+        self.criteria = criteria
+        self.header_only = header_only
+        self.confirm = confirm
+
+    def build_searches(self) -> List[Tuple[List[str], Optional[bytes]]]:
+        """
+        Compila los criterios en comandos SEARCH
+
+        Las alternativas ASCII se combinan en un solo SEARCH con OR; cada
+        alternativa con acentos usa su propio SEARCH con CHARSET UTF-8 y el
+        valor enviado como literal (siempre al final del comando).
+
+        Returns:
+            List de tuplas (criterios, literal UTF-8 o None)
+        """
+        searches: List[Tuple[List[str], Optional[bytes]]] = []
+        ascii_keys: List[List[str]] = []
+
+        for alternative in self.criteria:
+            # El término no ASCII (si existe) va al final para enviarlo como literal
+            ordered = sorted(alternative, key=lambda term: not term[1].isascii())
+            keys: List[str] = []
+            literal = None
+            for key, value in ordered:
+                if value.isascii():
+                    keys += [key, quote_search_value(value)]
+                else:
+                    keys.append(key)
+                    literal = value.encode('utf-8')
+
+            if literal is not None:
+                searches.append((keys, literal))
+            else:
+                ascii_keys.append(keys)
+
+        if ascii_keys:
+            # 'OR a OR b c' equivale a a | (b | c); las alternativas compuestas van entre paréntesis
+            terms = [' '.join(keys) if len(keys) == 2 else f"({' '.join(keys)})" for keys in ascii_keys]
+            searches.insert(0, (['OR'] * (len(terms) - 1) + terms, None))
+
+        return searches
+
+
+class SearchPlan:
+    """Conjunto ordenado de tipos de correo a clasificar en el servidor"""
+
+    def __init__(self, classes: List[SearchClass]):
+        """
+        Args:
+            classes: Tipos de correo en orden de prioridad (un correo que cumple
+                varios tipos se asigna al primero, igual que en el procesador)
+        """
+        self.classes = classes
+
+    def bucket(self, email_client, uids: List[bytes]) -> List[Tuple[Optional[SearchClass], List[bytes]]]:
+        """
+        Agrupa los UIDs por tipo de correo con búsquedas del servidor
+
+        Args:
+            email_client: EmailClient con el buzón seleccionado
+            uids: UIDs candidatos, en el orden en que se desean procesar
+
+        Returns:
+            List de tuplas (tipo, uids) en orden de prioridad; el tipo None
+            agrupa los correos sin clasificar o cuyo tipo no se pudo buscar
+        """
+        buckets: List[Tuple[Optional[SearchClass], List[bytes]]] = []
+        remaining = list(uids)
+
+        for search_class in self.classes:
+            if not remaining:
+                break
+
+            matched = email_client.search_class_uids(search_class, remaining)
+            if matched is None:
+                logger.warning(f"No se pudo buscar '{search_class.name}' en el servidor; "
+                               f"esos correos se clasificarán al descargarlos")
+                continue
+
+            class_uids = [uid for uid in remaining if uid in matched]
+            if class_uids:
+                buckets.append((search_class, class_uids))
+                remaining = [uid for uid in remaining if uid not in matched]
+
+        if remaining:
+            buckets.append((None, remaining))
+
+        logger.info("Clasificación del servidor: " + ', '.join(
+            f"{search_class.name if search_class else 'sin clasificar'}={len(class_uids)}"
+            for search_class, class_uids in buckets
+        ))
+        return buckets
+
+    def class_named(self, name: str) -> Optional[SearchClass]:
+        """Obtiene un tipo de correo por nombre"""
+        for search_class in self.classes:
+            if search_class.name == name:
+                return search_class
+        return None
@@ -104,6 +104,21 @@ class TransferProcessor:
         logger.info(f"¿Es correo de transferencia SPEI? {is_transfer}")
         return is_transfer
 
+    def search_criteria(self) -> list:
+        """
+        Criterios de búsqueda IMAP equivalentes a is_transfer_email
+
+        SUBJECT del servidor no distingue mayúsculas, igual que la comparación
+        en minúsculas del cliente.
+
+        Returns:
+            Alternativas de (clave, valor) para SearchClass
+        """
+        return [
+            [('SUBJECT', 'transferencia interbancaria')],
+            [('SUBJECT', 'spei'), ('SUBJECT', 'transferencia')],
+        ]
+
     def extract_transfer_info(self, msg: Message) -> Dict[str, Any]:
         """
         Extrae información de transferencia SPEI del cuerpo del correo
@@ -3,26 +3,91 @@ Módulo para parseo de archivos XML de facturas CFDI
 """
 
 import xml.etree.ElementTree as ET
-from typing import Dict, Any, Optional
+from typing import Dict, List, Mapping, Optional, Tuple, Union
 from datetime import datetime
+from decimal import Decimal, InvalidOperation
 import re
+from . import parse_pool
+from .cfdi_record import CFDIRecord, ConceptoRecord
+from .config import Config
 from .logger import logger
 
+# Elemento XML (xml.etree o lxml) o copia de sus atributos: todo lo que tenga .get()
+Attributes = Union[ET.Element, Mapping[str, str]]
+_NO_ATTRIBUTES: Mapping[str, str] = {}
+
+# Forma exacta de los formatos de fecha aceptados (YYYY-MM-DD con hora y fracción opcionales)
+_ISO_DATE = re.compile(r'\d{4}-\d{2}-\d{2}(?:T\d{2}:\d{2}:\d{2}(?:\.\d{1,6})?)?', re.ASCII)
+_ZERO = Decimal('0')
+
+# Versión del CFDI según el namespace del elemento Comprobante
+CFDI_VERSIONS = {
+    'http://www.sat.gob.mx/cfd/4': '4.0',
+    'http://www.sat.gob.mx/cfd/3': '3.3',
+}
+DEFAULT_CFDI_VERSION = '4.0'
+
+# El Timbre Fiscal Digital 1.1 es el mismo para CFDI 3.3 y 4.0
+TFD_NAMESPACE = 'http://www.sat.gob.mx/TimbreFiscalDigital'
+
+
+class CFDIRejectedError(ValueError):
+    """XML bien formado que no se acepta como factura (esquema o sello no válidos)"""
+
+    # Motivo para el registro (ej: "por el esquema CFDI")
+    reason = ''
+
+
+def cfdi_namespace(root: ET.Element) -> str:
+    """Namespace del elemento raíz ('' si no tiene)"""
+    tag = root.tag
+    return tag[1:tag.index('}')] if tag[:1] == '{' else ''
+
+
+def _cfdi_paths(cfdi_ns: str) -> Dict[str, str]:
+    """Rutas de las secciones de un CFDI en notación {namespace}Elemento"""
+    return {
+        'emisor': f'{{{cfdi_ns}}}Emisor',
+        'receptor': f'{{{cfdi_ns}}}Receptor',
+        'conceptos': f'{{{cfdi_ns}}}Conceptos',
+        'concepto': f'{{{cfdi_ns}}}Concepto',
+        'impuestos': f'{{{cfdi_ns}}}Impuestos',
+        'complemento': f'{{{cfdi_ns}}}Complemento',
+        'timbre': f'.//{{{TFD_NAMESPACE}}}TimbreFiscalDigital',
+    }
+
+
 class XMLParser:
     """Parser para archivos XML de facturas CFDI"""
     
-    # Namespaces comunes en CFDI
+    # Namespaces comunes en CFDI (versión 4.0)
     NAMESPACES = {
         'cfdi': 'http://www.sat.gob.mx/cfd/4',
-        'tfd': 'http://www.sat.gob.mx/TimbreFiscalDigital',
+        'tfd': TFD_NAMESPACE,
         'xsi': 'http://www.w3.org/2001/XMLSchema-instance'
     }
+
+    # Tabla de rutas por versión de CFDI, armada una sola vez al importar
+    PATHS = {version: _cfdi_paths(namespace) for namespace, version in CFDI_VERSIONS.items()}
+
+    # Excepciones de sintaxis XML del backend
+    PARSE_ERRORS = (ET.ParseError,)
     
     def __init__(self):
         """Inicializa el parser de XML"""
-        pass
+        # Validación XSD y verificación de sellos opcionales (esquemas y XSLT se
+        # compilan una vez por proceso); sus módulos requieren lxml y se
+        # importan solo si están activadas
+        self.schema_validator = None
+        if Config.XML_SCHEMA_VALIDATION:
+            from .cfdi_schema import get_schema_validator
+            self.schema_validator = get_schema_validator()
+        self.seal_verifier = None
+        if Config.SEAL_VERIFICATION:
+            from .cfdi_seal import get_seal_verifier
+            self.seal_verifier = get_seal_verifier()
     
-    def parse_xml(self, xml_content: bytes) -> Optional[Dict[str, Any]]:
+    def parse_xml(self, xml_content: bytes) -> Optional[CFDIRecord]:
         """
         Parsea el contenido de un archivo XML de factura
         
@@ -30,200 +95,212 @@ class XMLParser:
             xml_content: Contenido del archivo XML en bytes
             
         Returns:
-            Dict con los datos extraídos o None si hay error
+            CFDIRecord con los datos extraídos o None si hay error
         """
         try:
-            # Decodificar el contenido XML
-            xml_str = xml_content.decode('utf-8')
-            
-            # Parsear el XML
-            root = ET.fromstring(xml_str)
+            # Parsear el XML y extraer los datos
+            record = self._extract_document(xml_content)
             
-            # Extraer datos del comprobante
-            comprobante_data = self._extract_comprobante_data(root)
+            logger.info(f"XML parseado correctamente - UUID: {record.uuid or 'N/A'}")
+            return record
             
-            # Extraer datos del emisor
-            emisor_data = self._extract_emisor_data(root)
-            
-            # Extraer datos del receptor
-            receptor_data = self._extract_receptor_data(root)
-            
-            # Extraer conceptos
-            conceptos_data = self._extract_conceptos_data(root)
-            
-            # Extraer timbre fiscal
-            timbre_data = self._extract_timbre_data(root)
-            
-            # Extraer impuestos
-            impuestos_data = self._extract_impuestos_data(root)
-            
-            # Combinar todos los datos
-            factura_data = {
-                **comprobante_data,
-                **emisor_data,
-                **receptor_data,
-                **conceptos_data,
-                **timbre_data,
-                **impuestos_data
-            }
-            
-            logger.info(f"XML parseado correctamente - UUID: {factura_data.get('uuidCFDI', 'N/A')}")
-            return factura_data
-            
-        except ET.ParseError as e:
+        except self.PARSE_ERRORS as e:
             logger.error(f"Error al parsear XML: {str(e)}")
             return None
+        except CFDIRejectedError as e:
+            logger.warning(f"XML rechazado {e.reason}: {str(e)}")
+            return None
         except Exception as e:
             logger.error(f"Error inesperado al parsear XML: {str(e)}")
             return None
+
+    def parse_many(self, xml_contents: List[bytes]) -> List[Optional[CFDIRecord]]:
+        """
+        Parsea varios archivos XML (en procesos separados si son al menos XML_PARSE_POOL_MIN_BATCH)
+
+        Args:
+            xml_contents: Contenido de los archivos XML en bytes
+
+        Returns:
+            Lista con el resultado de parse_xml de cada archivo, en el mismo orden
+        """
+        return parse_pool.parse_many(self, xml_contents)
+
+    def _extract_document(self, xml_content: bytes) -> CFDIRecord:
+        """
+        Parsea el documento completo, lo valida (si XML_SCHEMA_VALIDATION),
+        verifica sus sellos (si SEAL_VERIFICATION) y extrae los datos de la factura
+
+        Args:
+            xml_content: Contenido del archivo XML en bytes
+
+        Returns:
+            CFDIRecord con los datos de la factura
+
+        Raises:
+            CFDISchemaError: Si el documento no cumple el esquema del CFDI
+            SealVerificationError: Si el sello del emisor o del SAT no es válido
+        """
+        root = self._parse_document(xml_content)
+        if self.schema_validator is not None:
+            self.schema_validator.validate(xml_content, root)
+        if self.seal_verifier is not None:
+            self.seal_verifier.verify(xml_content, root)
+        return self._extract_factura_data(root)
+
+    def _parse_document(self, xml_content: bytes) -> ET.Element:
+        """
+        Convierte el contenido del archivo en el elemento raíz (Comprobante)
+
+        Args:
+            xml_content: Contenido del archivo XML en bytes
+
+        Returns:
+            Elemento raíz del documento
+        """
+        # Se parsean los bytes tal cual (sin copiarlos a un str) para que el
+        # parser respete el BOM y la codificación declarada (ej: ISO-8859-1)
+        return ET.fromstring(xml_content)
+
+    def _extract_factura_data(self, root: ET.Element) -> CFDIRecord:
+        """
+        Localiza las secciones del comprobante y arma el registro de la factura
+
+        Args:
+            root: Elemento raíz del documento
+
+        Returns:
+            CFDIRecord con los datos de la factura
+        """
+        paths = self.PATHS[self._detect_version(root)]
+        emisor, receptor, conceptos, timbre, impuestos = self._find_sections(root, paths)
+        if conceptos is not None:
+            conceptos = [self._concepto_record(concepto) for concepto in conceptos]
+        return self._build_record(root, emisor, receptor, conceptos, timbre, impuestos)
+
+    def _detect_version(self, root: ET.Element) -> str:
+        """
+        Determina la versión del CFDI a partir del namespace del Comprobante
+
+        Args:
+            root: Elemento raíz del documento
+
+        Returns:
+            str: Versión ('4.0', '3.3'); DEFAULT_CFDI_VERSION si el namespace no se reconoce
+        """
+        namespace = cfdi_namespace(root)
+        version = CFDI_VERSIONS.get(namespace)
+        if version is None:
+            logger.warning(f"Namespace de CFDI no reconocido '{namespace}' "
+                           f"(Version={root.get('Version')}), usando CFDI {DEFAULT_CFDI_VERSION}")
+            return DEFAULT_CFDI_VERSION
+        if root.get('Version') not in (None, version):
+            logger.warning(f"Atributo Version={root.get('Version')} no coincide con el namespace "
+                           f"de CFDI {version}, se usa el namespace")
+        return version
     
-    def _extract_comprobante_data(self, root: ET.Element) -> Dict[str, Any]:
-        """Extrae datos del comprobante principal"""
-        data = {}
-        
-        try:
-            # Datos básicos del comprobante
-            data['folioCFDI'] = root.get('Folio', '')
-            data['fecCFDI'] = self._parse_date(root.get('Fecha'))
-            data['totalCFDI'] = self._parse_float(root.get('Total', '0'))
-            data['subtotalCFDI'] = self._parse_float(root.get('SubTotal', '0'))
-            data['moneda'] = root.get('Moneda', 'MXN')
-            
-            # Extraer mes y año de la fecha
-            if data['fecCFDI']:
-                data['mesFactura'] = data['fecCFDI'].month
-                data['anioCFDI'] = data['fecCFDI'].year
-            else:
-                data['mesFactura'] = datetime.now().month
-                data['anioCFDI'] = datetime.now().year
-            
-            # No. Certificado
-            data['noCertificadoSAT'] = root.get('NoCertificado', '')
-            
-        except Exception as e:
-            logger.error(f"Error al extraer datos del comprobante: {str(e)}")
-        
-        return data
-    
-    def _extract_emisor_data(self, root: ET.Element) -> Dict[str, Any]:
-        """Extrae datos del emisor"""
-        data = {}
-        
-        try:
-            emisor = root.find('cfdi:Emisor', self.NAMESPACES)
-            if emisor is not None:
-                data['rfcEmisor'] = emisor.get('Rfc', '')
-                data['nombreEmisor'] = emisor.get('Nombre', '')
-                data['regimenFiscal'] = self._parse_int(emisor.get('RegimenFiscal', '0'))
-            
-        except Exception as e:
-            logger.error(f"Error al extraer datos del emisor: {str(e)}")
-        
-        return data
-    
-    def _extract_receptor_data(self, root: ET.Element) -> Dict[str, Any]:
-        """Extrae datos del receptor"""
-        data = {}
-        
-        try:
-            receptor = root.find('cfdi:Receptor', self.NAMESPACES)
-            if receptor is not None:
-                # Guardar datos del receptor para referencia (no se usan en la tabla)
-                data['receptorRFC'] = receptor.get('Rfc', '')
-                data['receptorNombre'] = receptor.get('Nombre', '')
-            
-        except Exception as e:
-            logger.error(f"Error al extraer datos del receptor: {str(e)}")
-        
-        return data
-    
-    def _extract_conceptos_data(self, root: ET.Element) -> Dict[str, Any]:
-        """Extrae datos de los conceptos"""
-        data = {}
-        
-        try:
-            conceptos = root.find('cfdi:Conceptos', self.NAMESPACES)
-            if conceptos is not None:
-                conceptos_list = []
-                concepto_principal = ""
-                
-                for concepto in conceptos.findall('cfdi:Concepto', self.NAMESPACES):
-                    descripcion = concepto.get('Descripcion', '')
-                    cantidad = concepto.get('Cantidad', '1')
-                    valor_unitario = concepto.get('ValorUnitario', '0')
-                    importe = concepto.get('Importe', '0')
-                    
-                    conceptos_list.append({
-                        'descripcion': descripcion,
-                        'cantidad': cantidad,
-                        'valor_unitario': valor_unitario,
-                        'importe': importe
-                    })
-                    
-                    # Usar el primer concepto como concepto principal
-                    if not concepto_principal:
-                        concepto_principal = descripcion
-                
-                data['concepto'] = concepto_principal
-                data['conceptos_detalle'] = conceptos_list
-            
-        except Exception as e:
-            logger.error(f"Error al extraer datos de conceptos: {str(e)}")
-        
-        return data
-    
-    def _extract_timbre_data(self, root: ET.Element) -> Dict[str, Any]:
-        """Extrae datos del timbre fiscal digital"""
-        data = {}
-        
-        try:
-            # Buscar el timbre fiscal en diferentes ubicaciones posibles
-            timbre = None
-            
-            # Buscar en complementos
-            complementos = root.find('cfdi:Complementos', self.NAMESPACES)
-            if complementos is not None:
-                timbre = complementos.find('.//tfd:TimbreFiscalDigital', self.NAMESPACES)
-            
-            # Si no se encuentra, buscar en cualquier lugar
-            if timbre is None:
-                timbre = root.find('.//tfd:TimbreFiscalDigital', self.NAMESPACES)
-            
-            if timbre is not None:
-                data['uuidCFDI'] = timbre.get('UUID', '')
-                data['selloSAT'] = timbre.get('SelloSAT', '')
-                data['idFactura'] = timbre.get('UUID', '')  # Usar UUID como idFactura
-                data['fum'] = self._parse_date(timbre.get('FechaTimbrado'))
-            
-        except Exception as e:
-            logger.error(f"Error al extraer datos del timbre: {str(e)}")
-        
-        return data
-    
-    def _extract_impuestos_data(self, root: ET.Element) -> Dict[str, Any]:
-        """Extrae datos de los impuestos"""
-        data = {}
-        
-        try:
-            impuestos = root.find('cfdi:Impuestos', self.NAMESPACES)
-            if impuestos is not None:
-                # Extraer totales de impuestos
-                total_traslados = impuestos.get('TotalTraslados', '0')
-                total_retenciones = impuestos.get('TotalRetenciones', '0')
-                
-                data['totalTraslados'] = self._parse_float(total_traslados)
-                data['totalRetenciones'] = self._parse_float(total_retenciones)
-            
-        except Exception as e:
-            logger.error(f"Error al extraer datos de impuestos: {str(e)}")
-        
-        return data
+    def _find_sections(self, root: ET.Element, paths: Dict[str, str]) -> Tuple[Optional[ET.Element], ...]:
+        """
+        Localiza las secciones del comprobante (el primer hijo directo de cada tipo)
+
+        Args:
+            root: Elemento raíz del documento
+            paths: Tabla de rutas de la versión del CFDI
+
+        Returns:
+            Tupla (emisor, receptor, conceptos, timbre, impuestos); conceptos es
+            la lista de elementos cfdi:Concepto. Cada valor es None si no existe.
+        """
+        conceptos = root.find(paths['conceptos'])
+
+        # Buscar el timbre fiscal en cfdi:Complemento y, si no está, en cualquier lugar
+        timbre = None
+        complemento = root.find(paths['complemento'])
+        if complemento is not None:
+            timbre = complemento.find(paths['timbre'])
+        if timbre is None:
+            timbre = root.find(paths['timbre'])
+
+        return (
+            root.find(paths['emisor']),
+            root.find(paths['receptor']),
+            conceptos.findall(paths['concepto']) if conceptos is not None else None,
+            timbre,
+            root.find(paths['impuestos'])
+        )
+
+    def _concepto_record(self, concepto: Attributes) -> ConceptoRecord:
+        """Registro de un cfdi:Concepto a partir de sus atributos"""
+        return ConceptoRecord(
+            descripcion=concepto.get('Descripcion', ''),
+            cantidad=concepto.get('Cantidad', '1'),
+            valor_unitario=concepto.get('ValorUnitario', '0'),
+            importe=concepto.get('Importe', '0')
+        )
+
+    def _build_record(self, comprobante: Attributes, emisor: Optional[Attributes],
+                      receptor: Optional[Attributes], conceptos: Optional[List[ConceptoRecord]],
+                      timbre: Optional[Attributes], impuestos: Optional[Attributes]) -> CFDIRecord:
+        """
+        Arma el registro de la factura leyendo los atributos de cada sección
+
+        Args:
+            comprobante: Elemento raíz (o sus atributos)
+            emisor, receptor, timbre, impuestos: Elemento de la sección (o sus
+                atributos), None si el comprobante no la tiene
+            conceptos: Registros de los conceptos, None si no hay cfdi:Conceptos
+
+        Returns:
+            CFDIRecord con los datos de la factura
+        """
+        # Una sección ausente da los mismos valores que una sección sin atributos
+        emisor = _NO_ATTRIBUTES if emisor is None else emisor
+        receptor = _NO_ATTRIBUTES if receptor is None else receptor
+        timbre = _NO_ATTRIBUTES if timbre is None else timbre
+        impuestos = _NO_ATTRIBUTES if impuestos is None else impuestos
+        conceptos = conceptos or ()
+
+        # Sin fecha de emisión se usan el mes y año actuales
+        fecha = self._parse_date(comprobante.get('Fecha'))
+        fecha_mes = fecha or datetime.now()
+
+        return CFDIRecord(
+            folio=comprobante.get('Folio', ''),
+            fecha=fecha,
+            total=self._parse_amount(comprobante.get('Total', '0')),
+            subtotal=self._parse_amount(comprobante.get('SubTotal', '0')),
+            moneda=comprobante.get('Moneda', 'MXN'),
+            mes=fecha_mes.month,
+            anio=fecha_mes.year,
+            no_certificado=comprobante.get('NoCertificado', ''),
+            rfc_emisor=emisor.get('Rfc', ''),
+            nombre_emisor=emisor.get('Nombre', ''),
+            regimen_fiscal=self._parse_int(emisor.get('RegimenFiscal', '0')),
+            rfc_receptor=receptor.get('Rfc', ''),
+            nombre_receptor=receptor.get('Nombre', ''),
+            # Usar el primer concepto con descripción como concepto principal
+            concepto=next((concepto.descripcion for concepto in conceptos if concepto.descripcion), ''),
+            conceptos=tuple(conceptos),
+            uuid=timbre.get('UUID', ''),
+            sello_sat=timbre.get('SelloSAT', ''),
+            fecha_timbrado=self._parse_date(timbre.get('FechaTimbrado')),
+            total_traslados=self._parse_amount(impuestos.get('TotalTraslados', '0')),
+            total_retenciones=self._parse_amount(impuestos.get('TotalRetenciones', '0'))
+        )
     
     def _parse_date(self, date_str: str) -> Optional[datetime]:
         """Parsea una fecha en formato ISO 8601"""
         if not date_str:
             return None
         
+        # Camino rápido: la forma exacta de uno de los formatos de abajo se
+        # convierte con fromisoformat, que da el mismo resultado que strptime
+        if _ISO_DATE.fullmatch(date_str):
+            try:
+                return datetime.fromisoformat(date_str)
+            except ValueError:
+                pass
+        
         try:
             # Formatos comunes de fecha en CFDI
             formats = [
@@ -243,14 +320,16 @@ class XMLParser:
         except Exception:
             return None
     
-    def _parse_float(self, value_str: str) -> float:
-        """Parsea un valor a float"""
+    def _parse_amount(self, value_str: str) -> Decimal:
+        """Parsea un importe de forma exacta (admite separadores de miles con coma)"""
         try:
             if not value_str:
-                return 0.0
-            return float(value_str.replace(',', ''))
-        except (ValueError, AttributeError):
-            return 0.0
+                return _ZERO
+            if ',' in value_str:
+                value_str = value_str.replace(',', '')
+            return Decimal(value_str)
+        except (InvalidOperation, TypeError, AttributeError):
+            return _ZERO
     
     def _parse_int(self, value_str: str) -> int:
         """Parsea un valor a int"""
@@ -261,12 +340,12 @@ class XMLParser:
         except (ValueError, AttributeError):
             return 0
     
-    def generate_descripcion(self, factura_data: Dict[str, Any]) -> str:
+    def generate_descripcion(self, record: CFDIRecord) -> str:
         """
         Genera una descripción formateada de la factura
         
         Args:
-            factura_data: Datos de la factura
+            record: Datos de la factura
             
         Returns:
             str: Descripción formateada
@@ -274,22 +353,49 @@ class XMLParser:
         try:
             descripcion = "# Datos del CFDI\n"
             descripcion += f"## EMISOR\n"
-            descripcion += f"- **Nombre:** {factura_data.get('nombreEmisor', 'N/A')}\n"
-            descripcion += f"- **RFC:** {factura_data.get('rfcEmisor', 'N/A')}\n"
-            descripcion += f"- **Régimen Fiscal:** {factura_data.get('regimenFiscal', 'N/A')}\n\n"
+            descripcion += f"- **Nombre:** {record.nombre_emisor}\n"
+            descripcion += f"- **RFC:** {record.rfc_emisor}\n"
+            descripcion += f"- **Régimen Fiscal:** {record.regimen_fiscal}\n\n"
             
             descripcion += f"## DATOS GENERALES DEL CFDI\n"
-            descripcion += f"- **Folio:** {factura_data.get('folioCFDI', 'N/A')}\n"
-            descripcion += f"- **Fecha de Emisión:** {factura_data.get('fecCFDI', 'N/A')}\n"
-            descripcion += f"- **UUID:** {factura_data.get('uuidCFDI', 'N/A')}\n"
-            descripcion += f"- **Moneda:** {factura_data.get('moneda', 'N/A')}\n\n"
+            descripcion += f"- **Folio:** {record.folio}\n"
+            descripcion += f"- **Fecha de Emisión:** {record.fecha or 'N/A'}\n"
+            descripcion += f"- **UUID:** {record.uuid or 'N/A'}\n"
+            descripcion += f"- **Moneda:** {record.moneda}\n\n"
             
             descripcion += f"## TOTALES\n"
-            descripcion += f"- **Subtotal:** {factura_data.get('subtotalCFDI', 0):.2f}\n"
-            descripcion += f"- **Total:** {factura_data.get('totalCFDI', 0):.2f}\n"
+            descripcion += f"- **Subtotal:** {record.subtotal:.2f}\n"
+            descripcion += f"- **Total:** {record.total:.2f}\n"
             
             return descripcion
             
         except Exception as e:
             logger.error(f"Error al generar descripción: {str(e)}")
-            return "Error al generar descripción"
\ No newline at end of file
+            return "Error al generar descripción"
+
+def create_xml_parser(backend: Optional[str] = None) -> XMLParser:
+    """
+    Crea el parser de CFDI según el backend configurado
+
+    Args:
+        backend: 'lxml', 'stream' o 'etree' (default Config.XML_PARSER_BACKEND)
+
+    Returns:
+        XMLParser (o LxmlXMLParser / StreamingXMLParser si lxml está disponible)
+    """
+    backend = (backend or Config.XML_PARSER_BACKEND).lower()
+    if backend == 'lxml':
+        try:
+            from .xml_parser_lxml import LxmlXMLParser
+            return LxmlXMLParser()
+        except ImportError as e:
+            logger.warning(f"lxml no disponible, usando xml.etree: {str(e)}")
+    elif backend == 'stream':
+        try:
+            from .xml_parser_stream import StreamingXMLParser
+            return StreamingXMLParser()
+        except ImportError as e:
+            logger.warning(f"lxml no disponible, usando xml.etree: {str(e)}")
+    elif backend != 'etree':
+        logger.warning(f"XML_PARSER_BACKEND desconocido '{backend}', usando xml.etree")
+    return XMLParser()
@@ -0,0 +1,78 @@
+"""
+Módulo de parseo de facturas CFDI con lxml
+
+Mismo resultado que XMLParser, pero el documento se parsea con libxml2 y
+cada sección se localiza con expresiones XPath compiladas una sola vez al
+importar el módulo (una tabla por versión de CFDI). El Timbre Fiscal
+Digital se busca con una sola expresión que se detiene en el primer
+resultado, en lugar de recorrer todo el árbol.
+"""
+
+import threading
+from typing import Dict, Optional, Tuple
+from lxml import etree
+from .xml_parser import CFDI_VERSIONS, TFD_NAMESPACE, XMLParser
+
+
+def _compile_paths(cfdi_ns: str) -> Dict[str, etree.XPath]:
+    """Expresiones XPath de las secciones de un CFDI con el namespace indicado"""
+    ns = {'cfdi': cfdi_ns, 'tfd': TFD_NAMESPACE}
+    return {
+        # Secciones del comprobante (hijos directos del elemento raíz, el primero de cada uno)
+        'emisor': etree.XPath('cfdi:Emisor[1]', namespaces=ns),
+        'receptor': etree.XPath('cfdi:Receptor[1]', namespaces=ns),
+        'conceptos': etree.XPath('cfdi:Conceptos[1]', namespaces=ns),
+        'concepto': etree.XPath('cfdi:Concepto', namespaces=ns),
+        'impuestos': etree.XPath('cfdi:Impuestos[1]', namespaces=ns),
+        # Timbre: primero dentro de cfdi:Complemento y, si no, el primero del documento
+        'timbre_complemento': etree.XPath('cfdi:Complemento[1]/descendant::tfd:TimbreFiscalDigital[1]',
+                                           namespaces=ns),
+        'timbre': etree.XPath('descendant::tfd:TimbreFiscalDigital[1]', namespaces=ns),
+    }
+
+
+# Un parser por hilo (los parsers de lxml no se usan en paralelo); la
+# codificación se toma del BOM o de la declaración XML, igual que XMLParser
+_local = threading.local()
+
+
+def _get_parser() -> etree.XMLParser:
+    """Parser de lxml del hilo actual"""
+    parser = getattr(_local, 'parser', None)
+    if parser is None:
+        parser = etree.XMLParser(resolve_entities='internal', no_network=True)
+        _local.parser = parser
+    return parser
+
+
+def _first(xpath: etree.XPath, element: etree._Element):
+    """Primer resultado de una expresión XPath o None"""
+    result = xpath(element)
+    return result[0] if result else None
+
+
+class LxmlXMLParser(XMLParser):
+    """Parser de facturas CFDI con lxml y XPath precompilado"""
+
+    PARSE_ERRORS = (etree.XMLSyntaxError,)
+
+    # Expresiones XPath por versión de CFDI, compiladas una sola vez al importar
+    PATHS = {version: _compile_paths(namespace) for namespace, version in CFDI_VERSIONS.items()}
+
+    def _parse_document(self, xml_content: bytes) -> etree._Element:
+        """Parsea los bytes del archivo y devuelve el elemento raíz"""
+        return etree.fromstring(xml_content, _get_parser())
+
+    def _find_sections(self, root: etree._Element, paths: Dict[str, etree.XPath]) -> Tuple[Optional[etree._Element], ...]:
+        """Localiza las secciones del comprobante con las expresiones XPath de su versión"""
+        conceptos = _first(paths['conceptos'], root)
+        timbre = _first(paths['timbre_complemento'], root)
+        if timbre is None:
+            timbre = _first(paths['timbre'], root)
+        return (
+            _first(paths['emisor'], root),
+            _first(paths['receptor'], root),
+            paths['concepto'](conceptos) if conceptos is not None else None,
+            timbre,
+            _first(paths['impuestos'], root)
+        )
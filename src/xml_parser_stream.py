@@ -0,0 +1,146 @@
+"""
+Módulo de parseo de facturas CFDI en una sola pasada (iterparse)
+
+Mismo resultado que XMLParser, pero sin construir el árbol completo: el
+documento se recorre con lxml.etree.iterparse, los atributos de cada
+sección se leen en el evento 'start' y cada elemento se libera al
+cerrarse. La memoria usada no depende de la cantidad de conceptos ni del
+tamaño de la addenda.
+
+El recorrido termina antes del final del documento cuando ya no puede
+cambiar el resultado:
+- se encontraron todas las secciones y el timbre dentro de cfdi:Complemento, o
+- empieza una cfdi:Addenda en la raíz (por esquema, el último elemento del
+  comprobante) y ya se encontró un timbre.
+
+Por eso un documento que está malformado después de ese punto se procesa
+igual, a diferencia de XMLParser que lo rechaza completo.
+"""
+
+import io
+from typing import Any, Dict, List, Optional
+from lxml import etree
+from .cfdi_record import CFDIRecord, ConceptoRecord
+from .xml_parser import CFDI_VERSIONS, TFD_NAMESPACE, XMLParser
+from .xml_parser_lxml import _get_parser
+
+
+def _cfdi_tags(cfdi_ns: str) -> Dict[str, Any]:
+    """Nombres ({namespace}Elemento) de los elementos de un CFDI con el namespace indicado"""
+    tags = {
+        'emisor': f'{{{cfdi_ns}}}Emisor',
+        'receptor': f'{{{cfdi_ns}}}Receptor',
+        'conceptos': f'{{{cfdi_ns}}}Conceptos',
+        'concepto': f'{{{cfdi_ns}}}Concepto',
+        'impuestos': f'{{{cfdi_ns}}}Impuestos',
+        'complemento': f'{{{cfdi_ns}}}Complemento',
+        'addenda': f'{{{cfdi_ns}}}Addenda',
+        'timbre': f'{{{TFD_NAMESPACE}}}TimbreFiscalDigital',
+    }
+    # Secciones que se leen de los hijos directos del comprobante (el primero de cada una)
+    tags['sections'] = (tags['emisor'], tags['receptor'], tags['conceptos'], tags['impuestos'])
+    return tags
+
+
+class StreamingXMLParser(XMLParser):
+    """Parser de facturas CFDI en una sola pasada con lxml.etree.iterparse"""
+
+    PARSE_ERRORS = (etree.XMLSyntaxError,)
+
+    # Nombres de elementos por versión de CFDI
+    PATHS = {version: _cfdi_tags(namespace) for namespace, version in CFDI_VERSIONS.items()}
+
+    def _extract_document(self, xml_content: bytes) -> CFDIRecord:
+        """
+        Recorre el documento una vez y extrae los datos de la factura
+
+        Los atributos de cada sección se copian al leerla, porque el elemento
+        se libera al cerrarse. Con XML_SCHEMA_VALIDATION o SEAL_VERIFICATION el
+        documento se valida completo antes del recorrido (eso requiere
+        construir el árbol).
+
+        Args:
+            xml_content: Contenido del archivo XML en bytes
+
+        Returns:
+            CFDIRecord con los datos de la factura
+
+        Raises:
+            CFDISchemaError: Si el documento no cumple el esquema del CFDI
+            SealVerificationError: Si el sello del emisor o del SAT no es válido
+        """
+        if self.schema_validator is not None or self.seal_verifier is not None:
+            root = etree.fromstring(xml_content, _get_parser())
+            if self.schema_validator is not None:
+                self.schema_validator.validate(xml_content, root)
+            if self.seal_verifier is not None:
+                self.seal_verifier.verify(xml_content, root)
+
+        events = etree.iterparse(io.BytesIO(xml_content), events=('start', 'end'),
+                                 resolve_entities='internal', no_network=True,
+                                 remove_comments=True, remove_pis=True)
+
+        comprobante: Dict[str, str] = {}
+        sections: Dict[str, Any] = {}     # Atributos de cada sección (conceptos: sus registros)
+        conceptos: Optional[List[ConceptoRecord]] = None
+        timbre: Optional[Dict[str, str]] = None
+        timbre_final = False       # El timbre ya no puede ser reemplazado por otro
+        in_conceptos = False       # Dentro del primer cfdi:Conceptos
+        in_complemento = False     # Dentro del primer cfdi:Complemento
+        complemento_seen = False
+        depth = 0
+        tags: Optional[Dict[str, Any]] = None
+
+        for event, elem in events:
+            if event == 'end':
+                depth -= 1
+                if depth == 1:
+                    if elem.tag == tags['conceptos'] and in_conceptos:
+                        in_conceptos = False
+                        sections[tags['conceptos']] = conceptos
+                    elif elem.tag == tags['complemento'] and in_complemento:
+                        in_complemento = False
+                        # Sin timbre dentro de Complemento vale el primero del documento
+                        timbre_final = timbre is not None
+                    if timbre_final and len(sections) == len(tags['sections']):
+                        break
+
+                # Liberar el elemento y los hermanos ya procesados
+                elem.clear()
+                while elem.getprevious() is not None:
+                    del elem.getparent()[0]
+                continue
+
+            depth += 1
+            tag = elem.tag
+            if depth == 1:
+                # La versión se determina una sola vez, en el Comprobante
+                tags = self.PATHS[self._detect_version(elem)]
+                comprobante = dict(elem.attrib)
+            elif depth == 2:
+                if tag in tags['sections'] and tag not in sections:
+                    if tag == tags['conceptos']:
+                        if conceptos is None:
+                            conceptos = []
+                            in_conceptos = True
+                    else:
+                        sections[tag] = dict(elem.attrib)
+                elif tag == tags['complemento'] and not complemento_seen:
+                    complemento_seen = in_complemento = True
+                elif tag == tags['addenda'] and timbre is not None:
+                    break
+            elif depth == 3 and in_conceptos and tag == tags['concepto']:
+                conceptos.append(self._concepto_record(elem))
+
+            if tag == tags['timbre'] and depth > 1 and not timbre_final:
+                if in_complemento:
+                    timbre = dict(elem.attrib)
+                    timbre_final = True
+                elif timbre is None:
+                    timbre = dict(elem.attrib)
+                    timbre_final = complemento_seen
+                if timbre_final and len(sections) == len(tags['sections']):
+                    break
+
+        return self._build_record(comprobante, sections.get(tags['emisor']), sections.get(tags['receptor']),
+                                  conceptos, timbre, sections.get(tags['impuestos']))
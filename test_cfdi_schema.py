@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Test para verificar la validación de CFDI contra su esquema XSD
+"""
+
+import sys
+import os
+import shutil
+import tempfile
+sys.path.append(os.path.dirname(__file__))
+
+from src.cfdi_schema import SCHEMA_DIR, CFDISchemaError, CFDISchemaValidator
+from src.config import Config
+from src.xml_parser import create_xml_parser
+
+CFDI = '''<?xml version="1.0" encoding="UTF-8"?>
+<cfdi:Comprobante xmlns:cfdi="http://www.sat.gob.mx/cfd/4" xmlns:tfd="http://www.sat.gob.mx/TimbreFiscalDigital" Version="4.0" Folio="1234" Fecha="2024-05-10T12:30:45" SubTotal="1000.00" Moneda="MXN" Total="1160.00" NoCertificado="00001000000504465028" TipoDeComprobante="I">
+  <cfdi:Emisor Rfc="AAA010101AAA" Nombre="EMPRESA SA DE CV" RegimenFiscal="601"/>
+  <cfdi:Receptor Rfc="XAXX010101000" Nombre="PÚBLICO EN GENERAL" UsoCFDI="G03"/>
+  <cfdi:Conceptos>
+    <cfdi:Concepto Cantidad="1" Descripcion="Servicio de mantenimiento" ValorUnitario="1000.00" Importe="1000.00">
+      <cfdi:Impuestos><cfdi:Traslados><cfdi:Traslado Base="1000.00" Importe="160.00"/></cfdi:Traslados></cfdi:Impuestos>
+    </cfdi:Concepto>
+  </cfdi:Conceptos>
+  <cfdi:Impuestos TotalImpuestosTrasladados="160.00"/>
+  <cfdi:Complemento>
+    <tfd:TimbreFiscalDigital UUID="6F1E7D5A-1234-4ABC-9DEF-0123456789AB" FechaTimbrado="2024-05-10T12:31:00" SelloSAT="xyz=="/>
+  </cfdi:Complemento>
+  <cfdi:Addenda><proveedor pedido="A-1"/></cfdi:Addenda>
+</cfdi:Comprobante>'''
+
+CFDI_33 = CFDI.replace('http://www.sat.gob.mx/cfd/4', 'http://www.sat.gob.mx/cfd/3').replace('Version="4.0"', 'Version="3.3"')
+
+CATALOGO = b'<?xml version="1.0"?><Catalogo proveedor="AAA010101AAA"><Articulo clave="1" precio="10.00"/></Catalogo>'
+
+def make_parsers():
+    """Un parser de cada backend con la validación activada"""
+    original = Config.XML_SCHEMA_VALIDATION
+    Config.XML_SCHEMA_VALIDATION = True
+    try:
+        return [create_xml_parser(backend) for backend in ('etree', 'lxml', 'stream')]
+    finally:
+        Config.XML_SCHEMA_VALIDATION = original
+
+def test_valid_cfdi():
+    """Prueba que los CFDI 4.0 y 3.3 válidos se acepten en todos los backends"""
+
+    print("TEST DE VALIDACIÓN XSD DE CFDI")
+    print("=" * 50)
+
+    for xml_parser in make_parsers():
+        for xml_content in (CFDI, CFDI_33):
+            data = xml_parser.parse_xml(xml_content.encode('utf-8'))
+            assert data is not None and data.uuid == '6F1E7D5A-1234-4ABC-9DEF-0123456789AB'
+        print(f"OK | CFDI válidos aceptados [{type(xml_parser).__name__}]")
+
+def test_rejected():
+    """Prueba que se rechacen los XML que no son CFDI o no cumplen el esquema"""
+
+    invalid = {
+        'catálogo de proveedor': CATALOGO,
+        'importe con comas': CFDI.replace('SubTotal="1000.00"', 'SubTotal="1,000.00"').encode('utf-8'),
+        'sin Emisor': CFDI.replace('<cfdi:Emisor Rfc="AAA010101AAA" Nombre="EMPRESA SA DE CV" RegimenFiscal="601"/>', '').encode('utf-8'),
+        'versión equivocada': CFDI.replace('Version="4.0"', 'Version="3.3"').encode('utf-8'),
+        'malformado': CFDI.encode('utf-8')[:300],
+    }
+    for xml_parser in make_parsers():
+        for name, xml_content in invalid.items():
+            assert xml_parser.parse_xml(xml_content) is None, name
+    print(f"OK | {len(invalid)} XML rechazados en todos los backends")
+
+    # Sin validación el catálogo llega hasta el mapeo como factura sin UUID
+    assert create_xml_parser('lxml').parse_xml(CATALOGO).uuid == ''
+
+    validator = make_parsers()[0].schema_validator
+    try:
+        validator.validate(CATALOGO)
+        assert False, "Se esperaba CFDISchemaError"
+    except CFDISchemaError as e:
+        assert 'no es un CFDI' in str(e)
+    stats = validator.stats()
+    assert stats['validated'] >= stats['rejected'] > 0 and stats['max_ms'] >= stats['avg_ms'] > 0
+    print(f"OK | Tiempos de validación: {stats}")
+
+def test_official_schema_dir():
+    """Prueba que las importaciones de www.sat.gob.mx se resuelvan con archivos locales"""
+
+    schema_dir = tempfile.mkdtemp()
+    try:
+        shutil.copy(os.path.join(SCHEMA_DIR, 'cfdv33.xsd'), schema_dir)
+        with open(os.path.join(SCHEMA_DIR, 'cfdv40.xsd'), encoding='utf-8') as f:
+            cfdv40 = f.read()
+        # Catálogo de monedas importado como en cfdv40.xsd del SAT
+        cfdv40 = cfdv40.replace('xmlns:cfdi=', 'xmlns:catCFDI="http://www.sat.gob.mx/sitio_internet/cfd/catalogos" xmlns:cfdi=', 1)
+        cfdv40 = cfdv40.replace('<xs:simpleType name="t_Importe">',
+                                '<xs:import namespace="http://www.sat.gob.mx/sitio_internet/cfd/catalogos" '
+                                'schemaLocation="http://www.sat.gob.mx/sitio_internet/cfd/catalogos/catCFDI.xsd"/>\n'
+                                '  <xs:simpleType name="t_Importe">', 1)
+        cfdv40 = cfdv40.replace('type="cfdi:c_Moneda"', 'type="catCFDI:c_Moneda"')
+        with open(os.path.join(schema_dir, 'cfdv40.xsd'), 'w', encoding='utf-8') as f:
+            f.write(cfdv40)
+        with open(os.path.join(schema_dir, 'catCFDI.xsd'), 'w', encoding='utf-8') as f:
+            f.write('<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema" '
+                    'targetNamespace="http://www.sat.gob.mx/sitio_internet/cfd/catalogos">'
+                    '<xs:simpleType name="c_Moneda"><xs:restriction base="xs:string">'
+                    '<xs:enumeration value="MXN"/><xs:enumeration value="USD"/>'
+                    '</xs:restriction></xs:simpleType></xs:schema>')
+
+        validator = CFDISchemaValidator(schema_dir)
+        validator.validate(CFDI.encode('utf-8'))
+        try:
+            validator.validate(CFDI.replace('Moneda="MXN"', 'Moneda="XYZ"').encode('utf-8'))
+            assert False, "Se esperaba CFDISchemaError"
+        except CFDISchemaError:
+            pass
+        print("OK | Esquemas de XML_SCHEMA_DIR con importaciones locales")
+    finally:
+        shutil.rmtree(schema_dir)
+
+if __name__ == "__main__":
+    test_valid_cfdi()
+    test_rejected()
+    test_official_schema_dir()
+    print("\nTODAS LAS PRUEBAS PASARON")
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Test para verificar los sellos del emisor y del SAT de un CFDI
+"""
+
+import sys
+import os
+import base64
+import datetime
+import shutil
+import subprocess
+import tempfile
+sys.path.append(os.path.dirname(__file__))
+
+import pytest
+from lxml import etree
+from src.cfdi_seal import CertificateCache, SealVerificationError, SealVerifier
+from src.xml_parser import create_xml_parser
+from test_cfdi_schema import CFDI
+
+NO_CERTIFICADO = '00001000000504465028'
+NO_CERTIFICADO_SAT = '00001000000505142236'
+
+TIMBRE = ('<tfd:TimbreFiscalDigital Version="1.1" UUID="6F1E7D5A-1234-4ABC-9DEF-0123456789AB" '
+          'FechaTimbrado="2024-05-10T12:31:00" RfcProvCertif="SAT970701NN3" SelloCFD="{sello}" '
+          'NoCertificadoSAT="' + NO_CERTIFICADO_SAT + '" SelloSAT="{sello_sat}"/>')
+
+def test_cadena_original():
+    """Prueba la cadena original del comprobante y la del timbre"""
+
+    print("TEST DE VERIFICACIÓN DE SELLOS")
+    print("=" * 50)
+
+    verifier = SealVerifier(cert_dir='')
+    cadena, cadena_timbre = verifier.cadenas_originales(etree.fromstring(CFDI.encode('utf-8')))
+    assert cadena.startswith('||4.0|1234|2024-05-10T12:30:45|00001000000504465028|1000.00|MXN|1160.00|I|')
+    assert '|AAA010101AAA|EMPRESA SA DE CV|601|' in cadena
+    assert '|Servicio de mantenimiento|1000.00|1000.00|' in cadena
+    assert cadena.endswith('|160.00|160.00||')
+    assert cadena_timbre.startswith('|||6F1E7D5A-1234-4ABC-9DEF-0123456789AB|2024-05-10T12:31:00|')
+    print(f"OK | Cadena original: {cadena[:60]}...")
+
+def test_certificate_cache():
+    """Prueba que cada certificado se lea una sola vez y se descarte el menos usado"""
+
+    loads = []
+    def loader(numero):
+        return lambda: loads.append(numero) or f"certificado {numero}"
+
+    cache = CertificateCache(max_entries=2)
+    for numero in ('1', '2', '1', '3', '1', '2'):
+        assert cache.get(numero, loader(numero)) == f"certificado {numero}"
+    assert loads == ['1', '2', '3', '2']
+    assert cache.stats() == {'entries': 2, 'hits': 2, 'misses': 4}
+    print("OK | Caché LRU de certificados")
+
+def make_certificate(numero):
+    """Llave RSA y certificado autofirmado con el número de certificado como número de serie"""
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    from cryptography.x509.oid import NameOID
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, numero)])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    certificate = (x509.CertificateBuilder().subject_name(name).issuer_name(name).public_key(key.public_key())
+                   .serial_number(int.from_bytes(numero.encode('ascii'), 'big'))
+                   .not_valid_before(now).not_valid_after(now + datetime.timedelta(days=1))
+                   .sign(key, hashes.SHA256()))
+    return key, certificate.public_bytes(serialization.Encoding.DER)
+
+def sign(key, cadena):
+    """Sello en base64 (RSA PKCS#1 v1.5 con SHA-256)"""
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.asymmetric import padding
+
+    return base64.b64encode(key.sign(cadena.encode('utf-8'), padding.PKCS1v15(), hashes.SHA256())).decode('ascii')
+
+def make_signed_cfdi(verifier):
+    """CFDI sellado por el emisor y timbrado por el SAT"""
+    emisor_key, emisor_der = make_certificate(NO_CERTIFICADO)
+    sat_key, sat_der = make_certificate(NO_CERTIFICADO_SAT)
+
+    xml_content = CFDI.replace(' TipoDeComprobante="I"', ' TipoDeComprobante="I" Sello="" Certificado="{}"'.format(
+        base64.b64encode(emisor_der).decode('ascii')))
+    cadena, _ = verifier.cadenas_originales(etree.fromstring(xml_content.encode('utf-8')))
+    sello = sign(emisor_key, cadena)
+    xml_content = xml_content.replace('Sello=""', f'Sello="{sello}"')
+
+    timbre = TIMBRE.format(sello=sello, sello_sat='')
+    _, cadena_timbre = verifier.cadenas_originales(etree.fromstring(
+        xml_content.replace('<cfdi:Complemento>', '<cfdi:Complemento>' + timbre).encode('utf-8')))
+    timbre = TIMBRE.format(sello=sello, sello_sat=sign(sat_key, cadena_timbre))
+    xml_content = xml_content.replace(xml_content[xml_content.index('<tfd:'):xml_content.index('</cfdi:Complemento>')],
+                                      timbre + '\n  ')
+    return xml_content, sat_der
+
+def test_verify_seals():
+    """Prueba la verificación de sellos con certificados generados para la prueba"""
+
+    pytest.importorskip('cryptography')
+
+    cert_dir = tempfile.mkdtemp()
+    try:
+        verifier = SealVerifier(cert_dir=cert_dir)
+        xml_content, sat_der = make_signed_cfdi(verifier)
+
+        try:
+            verifier.verify(xml_content.encode('utf-8'))
+            assert False, "Se esperaba SealVerificationError"
+        except SealVerificationError as e:
+            assert 'no encontrado en SEAL_CERT_DIR' in str(e)
+
+        with open(os.path.join(cert_dir, f'{NO_CERTIFICADO_SAT}.cer'), 'wb') as f:
+            f.write(sat_der)
+        for backend in ('etree', 'lxml', 'stream'):
+            xml_parser = create_xml_parser(backend)
+            xml_parser.seal_verifier = verifier
+            assert xml_parser.parse_xml(xml_content.encode('utf-8')).uuid == '6F1E7D5A-1234-4ABC-9DEF-0123456789AB'
+        print("OK | Sellos del emisor y del SAT válidos en todos los backends")
+
+        invalid = {
+            'total modificado': xml_content.replace('Total="1160.00"', 'Total="1.00"'),
+            'timbre modificado': xml_content.replace('FechaTimbrado="2024-05-10T12:31:00"', 'FechaTimbrado="2024-05-11T12:31:00"'),
+            'número de certificado ajeno': xml_content.replace(f'NoCertificado="{NO_CERTIFICADO}"',
+                                                               'NoCertificado="00001000000504465029"'),
+            'sin timbre': xml_content[:xml_content.index('<tfd:')] + xml_content[xml_content.index('</cfdi:Complemento>'):],
+        }
+        for name, content in invalid.items():
+            try:
+                verifier.verify(content.encode('utf-8'))
+                assert False, f"Se esperaba SealVerificationError ({name})"
+            except SealVerificationError as e:
+                print(f"OK | Rechazado ({name}): {e}")
+
+        assert NO_CERTIFICADO in verifier.certificates.entries
+        assert '00001000000504465029' not in verifier.certificates.entries
+
+        stats = verifier.stats()
+        assert stats['certificates']['hits'] > 0 and stats['rejected'] == len(invalid) + 1
+        print(f"OK | Tiempos de verificación: {stats}")
+    finally:
+        shutil.rmtree(cert_dir)
+
+def test_requires_cryptography():
+    """Prueba que sin cryptography la verificación falle al crear el parser y no en cada factura"""
+
+    code = ("import sys; sys.modules['cryptography'] = None\n"
+            "from src.config import Config\n"
+            "from src.xml_parser import XMLParser\n"
+            "Config.SEAL_VERIFICATION = True\n"
+            "try:\n"
+            "    XMLParser()\n"
+            "except RuntimeError as e:\n"
+            "    assert 'cryptography' in str(e)\n"
+            "else:\n"
+            "    raise AssertionError('Se esperaba RuntimeError')\n")
+    result = subprocess.run([sys.executable, '-c', code], cwd=os.path.dirname(os.path.abspath(__file__)),
+                            capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    print("OK | Sin cryptography el parser no se crea")
+
+if __name__ == "__main__":
+    test_cadena_original()
+    test_certificate_cache()
+    test_verify_seals()
+    test_requires_cryptography()
+    print("\nTODAS LAS PRUEBAS PASARON")
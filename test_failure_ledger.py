@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Test para verificar el registro de fallos (cola de correos fallidos)
+"""
+
+import sys
+import os
+import tempfile
+from email.message import Message
+sys.path.append(os.path.dirname(__file__))
+
+from src.failure_ledger import FailureLedger
+from src.processor import FacturaProcessor
+
+class FakeEmailClient:
+    """Cliente IMAP mínimo: registra los movimientos programados"""
+
+    def __init__(self):
+        self.uidvalidity = b'1700000000'
+        self.acknowledged_uids = set()
+        self.pending_moves = {}
+
+    def move_email_to_folder(self, email_id, folder_name):
+        self.pending_moves[email_id] = folder_name
+        return True
+
+def make_processor(directory):
+    """FacturaProcessor sin conexiones, solo con el registro de fallos"""
+    processor = FacturaProcessor.__new__(FacturaProcessor)
+    processor.email_client = FakeEmailClient()
+    processor.failure_ledger = FailureLedger(os.path.join(directory, 'failure_ledger.json'), max_attempts=3)
+    processor.pending_quarantine = {}
+    return processor
+
+def failed_work(processor, email_id, extract_errors, errors):
+    """Elemento de trabajo de una factura que terminó con errores"""
+    msg = Message()
+    msg['subject'] = 'Factura'
+    work = processor._new_work(email_id, msg)
+    work.pop('msg')
+    work['kind'] = 'factura'
+    work['extract_errors'] = extract_errors
+    work['errors'] = extract_errors + errors
+    work['stats']['errors'] = len(work['errors'])
+    return work
+
+def test_quarantine_threshold():
+    """Prueba el conteo de intentos y el umbral de cuarentena"""
+
+    print("TEST DE REGISTRO DE FALLOS")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'failure_ledger.json')
+        ledger = FailureLedger(path, max_attempts=3)
+        key = FailureLedger.key(b'1700000000', b'42')
+        assert key == '1700000000_42'
+
+        for attempt in range(1, 3):
+            assert ledger.record_failure(key, 'Factura', f'error {attempt}') == attempt
+            assert not ledger.should_quarantine(key)
+
+        assert ledger.record_failure(key, 'Factura', 'XML inválido') == 3
+        assert ledger.should_quarantine(key)
+        print("OK | Cuarentena al tercer intento")
+
+        ledger.mark_quarantined(key, 'cuarentena')
+        assert not ledger.should_quarantine(key)
+        ledger.save()
+
+        # El registro sobrevive a un reinicio
+        reloaded = FailureLedger(path, max_attempts=3)
+        entry = reloaded.entries[key]
+        assert entry['attempts'] == 3
+        assert entry['last_error'] == 'XML inválido'
+        assert entry['folder'] == 'cuarentena'
+        print("OK | Registro persistido en disco")
+
+def test_clear_and_prune():
+    """Prueba que los correos confirmados y los registros antiguos se eliminen"""
+
+    with tempfile.TemporaryDirectory() as directory:
+        ledger = FailureLedger(os.path.join(directory, 'failure_ledger.json'), max_attempts=3)
+        ledger.record_failure('1_10', 'Depósito', 'timeout')
+        ledger.record_failure('1_11', 'Depósito', 'timeout')
+
+        ledger.clear('1_10')
+        assert '1_10' not in ledger.entries
+
+        ledger.entries['1_11']['last_failure'] = '2000-01-01T00:00:00'
+        ledger.record_failure('1_12', 'Transferencia', 'timeout')
+        ledger.prune(retention_days=30)
+        assert list(ledger.entries) == ['1_12']
+        print("OK | Registros confirmados y antiguos eliminados")
+
+def test_only_extraction_errors_quarantine():
+    """Prueba que los errores de Supabase no cuenten para la cuarentena y los de extracción sí"""
+
+    with tempfile.TemporaryDirectory() as directory:
+        processor = make_processor(directory)
+        stats = {'quarantined': 0}
+
+        for _ in range(5):
+            work = failed_work(processor, b'10', [], ['Error al insertar factura: 6F1E7D5A'])
+            processor._complete_work(work, {key: 0 for key in work['stats']})
+        assert processor.failure_ledger.entries == {}
+        assert processor.email_client.pending_moves == {}
+        print("OK | Errores de Supabase sin cuarentena")
+
+        for _ in range(3):
+            work = failed_work(processor, b'11', ['Error al parsear XML'], ['Error al insertar factura'])
+            processor._record_outcome(b'11', work['subject'], work['extract_errors'], stats)
+        entry = processor.failure_ledger.entries['1700000000_11']
+        assert entry['attempts'] == 3 and entry['last_error'] == 'Error al parsear XML'
+        assert processor.email_client.pending_moves == {b'11': 'cuarentena'}
+
+        # El movimiento falló en flush_pending_moves: se reintenta en el siguiente ciclo
+        processor.email_client.pending_moves = {}
+        processor._confirm_quarantine(stats)
+        assert not entry.get('quarantined') and stats['quarantined'] == 0
+
+        processor._record_outcome(b'11', work['subject'], work['extract_errors'], stats)
+        assert processor.email_client.pending_moves == {b'11': 'cuarentena'}
+        processor.email_client.acknowledged_uids.add(b'11')
+        processor._confirm_quarantine(stats)
+        assert entry['folder'] == 'cuarentena' and stats['quarantined'] == 1
+        assert not processor.failure_ledger.should_quarantine('1700000000_11')
+        print("OK | XML inválido enviado a cuarentena (reintento si el movimiento falla)")
+
+if __name__ == "__main__":
+    test_quarantine_threshold()
+    test_clear_and_prune()
+    test_only_extraction_errors_quarantine()
+    print("\nTODAS LAS PRUEBAS PASARON")
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Test para verificar el reparto de lotes entre conexiones de solo lectura (FetchPool)
+"""
+
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(__file__))
+
+from src.fetch_pool import FetchPool
+
+class FakeReader:
+    """Conexión de lectura mínima que registra los lotes que descarga"""
+
+    def __init__(self, name, fail_on=None):
+        self.name = name
+        self.fail_on = fail_on
+        self.chunks = []
+        self.logged_out = False
+
+    def fetch(self, chunk):
+        time.sleep(0.02)
+        if chunk == self.fail_on:
+            raise OSError("conexión reiniciada")
+        self.chunks.append(chunk)
+        return {uid: f"{self.name}:{uid}" for uid in chunk}
+
+    def logout(self):
+        self.logged_out = True
+
+def make_pool(readers):
+    pool = FetchPool(size=len(readers))
+    for reader in readers:
+        pool.readers.append(reader)
+        pool.idle.put(reader)
+    return pool
+
+def test_chunks_split_in_order():
+    """Prueba que los lotes se repartan entre conexiones y se entreguen en el orden pedido"""
+
+    print("TEST DE POOL DE CONEXIONES DE LECTURA")
+    print("=" * 50)
+
+    readers = [FakeReader('r0'), FakeReader('r1'), FakeReader('r2')]
+    chunks = [[uid, uid + 1] for uid in range(0, 24, 2)]
+
+    with make_pool(readers) as pool:
+        results = list(pool.map(lambda reader, chunk: reader.fetch(chunk), chunks))
+
+    assert [sorted(result) for result in results] == chunks
+    assert all(reader.chunks for reader in readers)
+    assert all(reader.logged_out for reader in readers)
+    print(f"OK | {len(chunks)} lotes repartidos: " +
+          ', '.join(f"{reader.name}={len(reader.chunks)}" for reader in readers))
+
+def test_failed_reader_is_dropped():
+    """Prueba que una conexión que falla se descarte y su lote se marque para reintentar"""
+
+    readers = [FakeReader('r0', fail_on=[4, 5]), FakeReader('r1', fail_on=[4, 5])]
+    chunks = [[0, 1], [2, 3], [4, 5], [6, 7]]
+
+    pool = make_pool(readers)
+    results = list(pool.map(lambda reader, chunk: reader.fetch(chunk), chunks))
+
+    assert results[2] is None
+    assert len(pool.readers) == 1
+    assert all(result is not None for index, result in enumerate(results) if index != 2)
+    pool.close()
+    print("OK | Lote de la conexión caída marcado para la conexión principal")
+
+def test_empty_pool():
+    """Prueba que sin conexiones todos los lotes se deleguen a la conexión principal"""
+
+    pool = FetchPool(size=0)
+    assert pool.open('INBOX', b'1') == 0
+    assert list(pool.map(lambda reader, chunk: chunk, [[1], [2]])) == [None, None]
+    print("OK | Pool desactivado")
+
+if __name__ == "__main__":
+    test_chunks_split_in_order()
+    test_failed_reader_is_dropped()
+    test_empty_pool()
+    print("\nTODAS LAS PRUEBAS PASARON")
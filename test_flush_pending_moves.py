@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Test para verificar que los movimientos del ciclo se agrupen por carpeta (UID MOVE / UIDPLUS)
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(__file__))
+
+from src.email_client import EmailClient
+
+class FakeMoveServer:
+    """Servidor mínimo que registra los comandos UID recibidos"""
+
+    def __init__(self, capabilities):
+        self.capabilities = capabilities
+        self.commands = []
+
+    def list(self):
+        return 'OK', [
+            b'(\\HasChildren) "." INBOX',
+            b'(\\HasNoChildren) "." INBOX.BanBajio.otros',
+            b'(\\HasNoChildren) "." INBOX.procesados',
+        ]
+
+    def noop(self):
+        return 'OK', [b'NOOP completed']
+
+    def select(self, mailbox):
+        self.commands.append(('SELECT', mailbox))
+        return 'OK', [b'4']
+
+    def response(self, code):
+        return code, [b'1'] if code == 'UIDVALIDITY' else [None]
+
+    def uid(self, command, *args):
+        self.commands.append((command,) + args)
+        return 'OK', [b'done']
+
+    def expunge(self):
+        self.commands.append(('EXPUNGE',))
+        return 'OK', [None]
+
+def _queue_moves(server):
+    """Programa cuatro movimientos hacia dos carpetas y los ejecuta"""
+    client = EmailClient()
+    client.imap_server = server
+    client.connected = True
+
+    for uid, folder in [(b'1', 'BanBajio/otros'), (b'2', 'BanBajio/otros'),
+                        (b'3', 'procesados'), (b'4', 'BanBajio/otros')]:
+        assert client.move_email_to_folder(uid, folder)
+
+    assert server.commands == []
+    assert client.flush_pending_moves()
+    assert client.pending_moves == {}
+    for command in server.commands:
+        print(command)
+
+    # Los UIDs son de INBOX: se selecciona una sola vez antes de mover
+    assert server.commands[0] == ('SELECT', 'INBOX')
+    return server.commands[1:]
+
+def test_uid_move():
+    """Con MOVE se emite un UID MOVE por carpeta destino"""
+
+    print("TEST DE UID MOVE")
+    print("=" * 50)
+
+    commands = _queue_moves(FakeMoveServer(('IMAP4REV1', 'MOVE', 'UIDPLUS')))
+    assert commands == [
+        ('MOVE', '1:2,4', 'INBOX.BanBajio.otros'),
+        ('MOVE', '3', 'INBOX.procesados'),
+    ]
+
+def test_uidplus_fallback():
+    """Sin MOVE se usa COPY + STORE por carpeta y un solo UID EXPUNGE"""
+
+    print("\nTEST DE COPY + UID EXPUNGE")
+    print("=" * 50)
+
+    commands = _queue_moves(FakeMoveServer(('IMAP4REV1', 'UIDPLUS')))
+    assert [command[0] for command in commands] == ['COPY', 'STORE', 'COPY', 'STORE', 'EXPUNGE']
+    assert commands[-1] == ('EXPUNGE', '1:4')
+
+    commands = _queue_moves(FakeMoveServer(('IMAP4REV1',)))
+    assert commands[-1] == ('EXPUNGE',)
+
+if __name__ == "__main__":
+    test_uid_move()
+    test_uidplus_fallback()
+    print("\nTODAS LAS PRUEBAS PASARON")
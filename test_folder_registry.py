@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Test para verificar la resolución de carpetas con FolderRegistry (un solo LIST por conexión)
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(__file__))
+
+from src.folder_registry import FolderRegistry
+
+class FakeListServer:
+    """Servidor mínimo que solo responde LIST y cuenta las llamadas"""
+
+    def __init__(self, folders):
+        self.folders = folders
+        self.list_calls = 0
+
+    def list(self):
+        self.list_calls += 1
+        return 'OK', self.folders
+
+def test_folder_resolution():
+    """Prueba la resolución de nombres lógicos contra carpetas reales del servidor"""
+
+    print("TEST DE RESOLUCIÓN DE CARPETAS")
+    print("=" * 50)
+
+    # Carpetas disponibles según el log de Hostinger
+    server = FakeListServer([
+        b'(\\HasChildren) "." INBOX',
+        b'(\\HasChildren \\Marked) "." INBOX.BanBajio',
+        b'(\\HasNoChildren \\UnMarked) "." INBOX.BanBajio.otros',
+        b'(\\HasNoChildren \\UnMarked) "." "INBOX.procesados"',
+        b'(\\HasNoChildren \\UnMarked \\Trash) "." INBOX.Trash',
+    ])
+    registry = FolderRegistry()
+
+    test_cases = [
+        ('BanBajio/otros', 'INBOX.BanBajio.otros'),
+        ('procesados', 'INBOX.procesados'),
+        ('INBOX.BanBajio', 'INBOX.BanBajio'),
+        ('BanBajio/subcarpeta', None),
+    ]
+
+    for folder_name, expected in test_cases:
+        result = registry.resolve(server, folder_name)
+        print(f"{'OK' if result == expected else 'ERROR'} | {folder_name:<25} -> {result}")
+        assert result == expected
+
+    print(f"Llamadas a LIST: {server.list_calls}")
+    assert server.list_calls == 1
+    assert registry.to_server_name('BanBajio/subcarpeta') == 'INBOX.BanBajio.subcarpeta'
+
+    # Tras un CREATE el listado se recarga
+    registry.invalidate()
+    registry.resolve(server, 'procesados')
+    assert server.list_calls == 2
+
+def test_slash_delimiter():
+    """Prueba un servidor con delimitador '/' y carpetas al nivel raíz"""
+
+    server = FakeListServer([
+        b'(\\HasChildren) "/" INBOX',
+        b'(\\HasChildren) "/" BanBajio',
+        b'(\\HasNoChildren) "/" BanBajio/otros',
+    ])
+    registry = FolderRegistry()
+
+    assert registry.resolve(server, 'BanBajio/otros') == 'BanBajio/otros'
+    assert registry.to_server_name('procesados') == 'procesados'
+    print("OK | Delimitador '/' sin prefijo INBOX")
+
+if __name__ == "__main__":
+    test_folder_resolution()
+    test_slash_delimiter()
+    print("\nTODAS LAS PRUEBAS PASARON")
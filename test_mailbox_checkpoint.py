@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Test para verificar el punto de control de buzón (último UID, HIGHESTMODSEQ y pendientes)
+"""
+
+import sys
+import os
+import tempfile
+sys.path.append(os.path.dirname(__file__))
+
+from src.mailbox_checkpoint import MailboxCheckpoint
+
+def test_checkpoint_roundtrip():
+    """Prueba que la revisión confirmada se guarde y se recupere de disco"""
+
+    print("TEST DE PUNTO DE CONTROL")
+    print("=" * 50)
+
+    directory = tempfile.mkdtemp()
+    checkpoint = MailboxCheckpoint('inbox', directory)
+    assert checkpoint.last_uid == 0 and not checkpoint.matches('42')
+
+    checkpoint.reset('42')
+    # UIDNEXT 120: el buzón llega hasta el UID 119 aunque solo 3 correos estén sin leer
+    checkpoint.begin_scan([b'101', b'105', b'110'], 120, 900)
+    checkpoint.commit([b'105'])
+
+    restored = MailboxCheckpoint('inbox', directory)
+    print(f"UIDVALIDITY {restored.uidvalidity} | último UID {restored.last_uid} | "
+          f"HIGHESTMODSEQ {restored.highestmodseq} | pendientes {restored.pending_uids}")
+    assert restored.matches('42')
+    assert restored.last_uid == 119
+    assert restored.highestmodseq == 900
+    assert restored.pending_uids == [b'105']
+
+def test_commit_without_scan():
+    """Sin una búsqueda exitosa el estado anterior no se modifica"""
+
+    directory = tempfile.mkdtemp()
+    checkpoint = MailboxCheckpoint('inbox', directory)
+    checkpoint.reset('42')
+    checkpoint.begin_scan([b'7'], None, None)
+    checkpoint.commit([])
+    assert checkpoint.last_uid == 7
+
+    checkpoint.commit([b'1'])
+    assert checkpoint.last_uid == 7 and checkpoint.pending_uids == []
+    print("OK | commit sin búsqueda conserva el estado")
+
+if __name__ == "__main__":
+    test_checkpoint_roundtrip()
+    test_commit_without_scan()
+    print("\nTODAS LAS PRUEBAS PASARON")
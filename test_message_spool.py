@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Test para verificar el spool local de correos (lectura, confirmación y depuración)
+"""
+
+import sys
+import os
+import time
+import tempfile
+sys.path.append(os.path.dirname(__file__))
+
+from src.message_spool import MessageSpool
+
+RAW_EMAIL = b'From: banco@bb.com.mx\r\nSubject: Prueba\r\n\r\nhola'
+
+def test_spool_roundtrip():
+    """Prueba guardar, leer y descartar correos por UIDVALIDITY + UID"""
+
+    print("TEST DE SPOOL DE CORREOS")
+    print("=" * 50)
+
+    spool = MessageSpool(tempfile.mkdtemp(), max_bytes=10 * 1024, max_age=3600)
+    assert spool.get(b'42', b'7') is None
+
+    spool.put(b'42', b'7', RAW_EMAIL)
+    assert spool.get(b'42', b'7') == RAW_EMAIL
+    # Otro UIDVALIDITY es otro buzón: no debe reutilizarse
+    assert spool.get(b'43', b'7') is None
+    print(f"Aciertos: {spool.hits} | Fallos: {spool.misses}")
+    assert (spool.hits, spool.misses) == (1, 2)
+
+    messages = list(spool.iter_messages())
+    assert [(uid, msg['subject']) for uid, msg in messages] == [(b'7', 'Prueba')]
+
+    spool.discard(b'42', [b'7', b'8'])
+    assert spool.get(b'42', b'7') is None
+
+def test_spool_eviction():
+    """Prueba la depuración por antigüedad y por tamaño total"""
+
+    print("\nTEST DE DEPURACIÓN DEL SPOOL")
+    print("=" * 50)
+
+    directory = tempfile.mkdtemp()
+    spool = MessageSpool(directory, max_bytes=len(RAW_EMAIL) * 2, max_age=3600)
+    now = time.time()
+    for uid, age in [(b'1', 7200), (b'2', 30), (b'3', 20), (b'4', 10)]:
+        spool.put(b'42', uid, RAW_EMAIL)
+        os.utime(os.path.join(directory, f"42_{uid.decode()}.eml"), (now - age, now - age))
+
+    removed = spool.evict()
+    remaining = sorted(os.listdir(directory))
+    print(f"Eliminados: {removed} | Restantes: {remaining}")
+    # UID 1 por antigüedad y UID 2 por tamaño (el más antiguo de los restantes)
+    assert removed == 2
+    assert remaining == ['42_3.eml', '42_4.eml']
+
+if __name__ == "__main__":
+    test_spool_roundtrip()
+    test_spool_eviction()
+    print("\nTODAS LAS PRUEBAS PASARON")
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Test para verificar el parseo de ENVELOPE/BODYSTRUCTURE y el armado de correos parciales
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(__file__))
+
+from src.message_structure import MessageStructure, parse_fetch_items
+from src.email_client import EmailClient
+
+# Respuesta FETCH de un correo con cuerpo de texto, un PDF grande y el XML de la factura
+STRUCTURE_RESPONSE = [
+    (b'1 (UID 42 ENVELOPE ("Mon, 1 Jan 2024 10:00:00 -0600" {33}',
+     b'=?UTF-8?Q?Factura_electr=C3=B3nica?='),
+    b' (("Proveedor" NIL "facturas" "proveedor.com")) NIL NIL NIL NIL NIL NIL "<id@x>") '
+    b'BODYSTRUCTURE (("text" "plain" ("charset" "utf-8") NIL NIL "7bit" 4 1 NIL NIL NIL NIL)'
+    b'("application" "pdf" ("name" "factura.pdf") NIL NIL "base64" 250000 NIL '
+    b'("attachment" ("filename" "factura.pdf")) NIL NIL)'
+    b'("application" "xml" ("name" "factura.xml") NIL NIL "base64" 3000 NIL '
+    b'("attachment" ("filename" "factura.xml")) NIL NIL) "mixed" ("boundary" "BB") NIL NIL NIL))',
+    b'2 (UID 43 ENVELOPE (NIL "Instrucci\\"on" (("BanBajio" NIL "avisos" "bb.com.mx")) NIL NIL NIL NIL NIL NIL NIL) '
+    b'BODYSTRUCTURE ("text" "html" ("charset" "utf-8") NIL NIL "quoted-printable" 1200 30 NIL NIL NIL NIL))',
+]
+
+def test_parse_structure():
+    """Prueba la clasificación de partes a partir del BODYSTRUCTURE"""
+
+    print("TEST DE PARSEO DE BODYSTRUCTURE")
+    print("=" * 50)
+
+    items = parse_fetch_items(STRUCTURE_RESPONSE)
+    assert [item[b'UID'] for item in items] == [b'42', b'43']
+
+    factura = MessageStructure(items[0][b'UID'], items[0][b'ENVELOPE'], items[0][b'BODYSTRUCTURE'])
+    print(f"Asunto: {factura.subject} | De: {factura.from_addr} | Partes: {factura.parts}")
+    assert factura.subject == '=?UTF-8?Q?Factura_electr=C3=B3nica?='
+    assert factura.from_addr == 'facturas@proveedor.com'
+    assert factura.is_multipart
+    assert [part.section for part in factura.xml_attachments()] == ['3']
+    assert [part.section for part in factura.text_parts()] == ['1']
+
+    aviso = MessageStructure(items[1][b'UID'], items[1][b'ENVELOPE'], items[1][b'BODYSTRUCTURE'])
+    print(f"Asunto: {aviso.subject} | De: {aviso.from_addr} | Partes: {aviso.parts}")
+    assert aviso.subject == 'Instrucci"on'
+    assert aviso.from_addr == 'avisos@bb.com.mx'
+    assert not aviso.is_multipart
+    assert [part.section for part in aviso.text_parts()] == ['1']
+
+def test_build_partial_message():
+    """Prueba que el correo parcial exponga el XML igual que el correo completo"""
+
+    print("\nTEST DE CORREO PARCIAL")
+    print("=" * 50)
+
+    header = b'From: facturas@proveedor.com\r\nSubject: Factura\r\nContent-Type: multipart/mixed; boundary="BB"\r\n\r\n'
+    mime = b'Content-Type: application/xml\r\nContent-Disposition: attachment; filename="factura.xml"\r\nContent-Transfer-Encoding: base64\r\n\r\n'
+    body = b'PGNmZGk6Q29tcHJvYmFudGUvPg=='
+
+    fetch_items = parse_fetch_items([
+        (b'1 (UID 42 BODY[HEADER] {%d}' % len(header), header),
+        (b' BODY[3.MIME] {%d}' % len(mime), mime),
+        (b' BODY[3] {%d}' % len(body), body),
+        b')',
+    ])[0]
+
+    client = EmailClient()
+    msg = client._build_partial_message(fetch_items, ('3',))
+    xml_files = client.get_xml_attachments(msg)
+    print(f"Asunto: {msg['subject']} | XML: {xml_files}")
+    assert msg['subject'] == 'Factura'
+    assert xml_files == [b'<cfdi:Comprobante/>']
+
+if __name__ == "__main__":
+    test_parse_structure()
+    test_build_partial_message()
+    print("\nTODAS LAS PRUEBAS PASARON")
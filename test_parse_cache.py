@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Test para verificar la caché de XML parseados y de UUID conocidos (ParseCache)
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(__file__))
+
+from src.parse_cache import ParseCache
+
+class CountingParser:
+    """Parser mínimo que cuenta cuántas veces se llama"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def parse_xml(self, xml_content):
+        self.calls += 1
+        if xml_content.startswith(b'<'):
+            return {'uuidCFDI': xml_content.decode()}
+        return None
+
+def test_same_content_parsed_once():
+    """Prueba que un adjunto idéntico devuelva el resultado ya parseado"""
+
+    print("TEST DE CACHÉ DE PARSEO")
+    print("=" * 50)
+
+    cache = ParseCache(max_entries=2, max_uuids=2)
+    parser = CountingParser()
+
+    first = cache.parse(b'<a/>', parser.parse_xml)
+    second = cache.parse(b'<a/>', parser.parse_xml)
+    assert first is second
+    assert parser.calls == 1
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+    print("OK | Adjunto repetido no se vuelve a parsear")
+
+    # XML inválido: no se guarda
+    assert cache.parse(b'basura', parser.parse_xml) is None
+    assert cache.parse(b'basura', parser.parse_xml) is None
+    assert parser.calls == 3
+    print("OK | XML inválido no se guarda en caché")
+
+    # LRU: <a/> se usó más recientemente que <b/>, así que <b/> sale primero
+    cache.parse(b'<b/>', parser.parse_xml)
+    cache.parse(b'<a/>', parser.parse_xml)
+    cache.parse(b'<c/>', parser.parse_xml)
+    calls = parser.calls
+    cache.parse(b'<a/>', parser.parse_xml)
+    assert parser.calls == calls
+    cache.parse(b'<b/>', parser.parse_xml)
+    assert parser.calls == calls + 1
+    assert cache.stats()['entries'] == 2
+    print("OK | Límite LRU respetado")
+
+def test_known_uuids():
+    """Prueba el registro de UUID ya existentes en Supabase"""
+
+    cache = ParseCache(max_entries=2, max_uuids=2)
+    assert not cache.is_known_uuid('U-1')
+    cache.add_known_uuid('U-1')
+    cache.add_known_uuid('U-2')
+    assert cache.is_known_uuid('U-1')
+    cache.add_known_uuid('U-3')
+    assert not cache.is_known_uuid('U-2')
+    assert cache.is_known_uuid('U-1') and cache.is_known_uuid('U-3')
+    assert not cache.is_known_uuid('') and not cache.is_known_uuid(None)
+    assert cache.stats()['uuid_hits'] == 3
+    print("OK | UUID conocidos")
+
+def test_disabled():
+    """Prueba que con tamaño 0 la caché no guarde nada"""
+
+    cache = ParseCache(max_entries=0, max_uuids=0)
+    parser = CountingParser()
+    cache.parse(b'<a/>', parser.parse_xml)
+    cache.parse(b'<a/>', parser.parse_xml)
+    cache.add_known_uuid('U-1')
+    assert parser.calls == 2
+    assert not cache.is_known_uuid('U-1')
+    print("OK | Caché desactivada")
+
+if __name__ == "__main__":
+    test_same_content_parsed_once()
+    test_known_uuids()
+    test_disabled()
+    print("\nTODAS LAS PRUEBAS PASARON")
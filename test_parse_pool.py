@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Test para verificar el parseo de lotes de XML en procesos separados (parse_many)
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(__file__))
+
+from src import parse_pool
+from src.config import Config
+from src.factura_mapper import FacturaMapper
+from src.xml_parser import XMLParser
+
+CFDI = '''<?xml version="1.0" encoding="UTF-8"?>
+<cfdi:Comprobante xmlns:cfdi="http://www.sat.gob.mx/cfd/4" xmlns:tfd="http://www.sat.gob.mx/TimbreFiscalDigital" Version="4.0" Folio="{n}" Fecha="2024-05-10T12:30:45" SubTotal="100.00" Moneda="MXN" Total="116.00">
+  <cfdi:Emisor Rfc="AAA010101AAA" Nombre="EMPRESA" RegimenFiscal="601"/>
+  <cfdi:Complemento>
+    <tfd:TimbreFiscalDigital UUID="UUID-{n}" FechaTimbrado="2024-05-10T12:31:00" SelloSAT="xyz=="/>
+  </cfdi:Complemento>
+</cfdi:Comprobante>'''
+
+def make_batch(size):
+    """Lote de XML distintos con un XML inválido en medio"""
+    batch = [CFDI.replace('{n}', str(n)).encode('utf-8') for n in range(size)]
+    batch[size // 2] = b'<cfdi:Comprobante'
+    return batch
+
+def test_pool_keeps_order():
+    """Prueba que el pool devuelva lo mismo que el parseo en serie y en el mismo orden"""
+
+    print("TEST DE PARSEO XML EN PROCESOS SEPARADOS")
+    print("=" * 50)
+
+    original = (Config.XML_PARSE_POOL_WORKERS, Config.XML_PARSE_POOL_MIN_BATCH)
+    Config.XML_PARSE_POOL_WORKERS, Config.XML_PARSE_POOL_MIN_BATCH = 2, 4
+    try:
+        parser = XMLParser()
+        batch = make_batch(12)
+        expected = [parser.parse_xml(xml_content) for xml_content in batch]
+        results = parser.parse_many(batch)
+
+        assert parse_pool._executor is not None
+        assert results == expected
+        assert results[6] is None
+        assert [data.folio for data in results if data] == [str(n) for n in range(12) if n != 6]
+        print(f"OK | {len(batch)} XML parseados en el pool en orden")
+    finally:
+        parse_pool.shutdown()
+        Config.XML_PARSE_POOL_WORKERS, Config.XML_PARSE_POOL_MIN_BATCH = original
+
+def test_small_batch_in_process():
+    """Prueba que un lote pequeño se parsee en el proceso actual"""
+
+    original = (Config.XML_PARSE_POOL_WORKERS, Config.XML_PARSE_POOL_MIN_BATCH)
+    Config.XML_PARSE_POOL_WORKERS, Config.XML_PARSE_POOL_MIN_BATCH = 2, 16
+    try:
+        results = XMLParser().parse_many(make_batch(3))
+        assert parse_pool._executor is None
+        assert [data.uuid if data else None for data in results] == ['UUID-0', None, 'UUID-2']
+        print("OK | Lote pequeño parseado sin pool")
+    finally:
+        Config.XML_PARSE_POOL_WORKERS, Config.XML_PARSE_POOL_MIN_BATCH = original
+
+def test_map_many():
+    """Prueba que map_many conserve la posición de los XML inválidos"""
+
+    mapped = FacturaMapper().map_many(XMLParser().parse_many(make_batch(3)))
+    assert mapped[1] is None
+    assert [factura['uuidCFDI'] for factura in (mapped[0], mapped[2])] == ['UUID-0', 'UUID-2']
+    print("OK | map_many")
+
+if __name__ == "__main__":
+    test_pool_keeps_order()
+    test_small_batch_in_process()
+    test_map_many()
+    print("\nTODAS LAS PRUEBAS PASARON")
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Test para verificar el pipeline por etapas con colas acotadas
+"""
+
+import sys
+import os
+import threading
+import time
+sys.path.append(os.path.dirname(__file__))
+
+from src.pipeline import StagedPipeline
+
+def test_stages_run_concurrently():
+    """Prueba que todos los elementos pasen por las etapas y que la etapa lenta use varios hilos"""
+
+    print("TEST DE PIPELINE POR ETAPAS")
+    print("=" * 50)
+
+    owner = threading.get_ident()
+    stage_threads = set()
+
+    def extract(item):
+        stage_threads.add(threading.get_ident())
+        item['extracted'] = True
+        return item
+
+    def persist(item):
+        time.sleep(0.05)  # Simula la latencia de Supabase
+        item['persisted'] = True
+        return item
+
+    finished = []
+    start = time.monotonic()
+    with StagedPipeline([('extraccion', extract, 1), ('guardado', persist, 4)], queue_size=2) as pipeline:
+        for number in range(12):
+            finished += pipeline.submit({'id': number})
+            finished += pipeline.drain()
+        finished += pipeline.finish()
+    elapsed = time.monotonic() - start
+
+    print(f"Elementos terminados: {len(finished)} en {elapsed:.2f}s")
+    assert sorted(item['id'] for item in finished) == list(range(12))
+    assert all(item['extracted'] and item['persisted'] for item in finished)
+    assert owner not in stage_threads
+    # 12 elementos x 50 ms en serie serían 0.6 s; con 4 hilos de guardado debe tardar bastante menos
+    assert elapsed < 0.45
+    print("OK | Etapa de guardado en paralelo")
+
+def test_stage_error():
+    """Prueba que un error en una etapa entregue el elemento sin pasar por las siguientes"""
+
+    def extract(item):
+        if item['id'] == 1:
+            raise ValueError("XML inválido")
+        return item
+
+    def persist(item):
+        item['persisted'] = True
+        return item
+
+    def on_error(item, error):
+        item['error'] = str(error)
+
+    with StagedPipeline([('extraccion', extract, 1), ('guardado', persist, 1)], queue_size=1,
+                        on_error=on_error) as pipeline:
+        finished = []
+        for number in range(3):
+            finished += pipeline.submit({'id': number})
+        finished += pipeline.finish()
+
+    by_id = {item['id']: item for item in finished}
+    assert by_id[1] == {'id': 1, 'error': 'XML inválido'}
+    assert by_id[0]['persisted'] and by_id[2]['persisted']
+    print("OK | Error de etapa entregado sin perder el elemento")
+
+if __name__ == "__main__":
+    test_stages_run_concurrently()
+    test_stage_error()
+    print("\nTODAS LAS PRUEBAS PASARON")
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Test para verificar la compilación del plan de búsqueda del servidor y el agrupamiento de UIDs
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(__file__))
+
+from src.search_plan import SearchClass, SearchPlan
+
+class FakeSearchClient:
+    """Cliente mínimo que responde búsquedas por tipo con resultados fijos"""
+
+    def __init__(self, results):
+        self.results = results
+
+    def search_class_uids(self, search_class, uids):
+        matched = self.results.get(search_class.name)
+        return None if matched is None else set(matched) & set(uids)
+
+def test_build_searches():
+    """Prueba que las alternativas ASCII se unan con OR y las acentuadas usen literal"""
+
+    print("TEST DE COMPILACIÓN DE CRITERIOS")
+    print("=" * 50)
+
+    transferencia = SearchClass('transferencia', [
+        [('SUBJECT', 'transferencia interbancaria')],
+        [('SUBJECT', 'spei'), ('SUBJECT', 'transferencia')],
+    ])
+    searches = transferencia.build_searches()
+    print(searches)
+    assert searches == [(['OR', 'SUBJECT "transferencia interbancaria"',
+                          '(SUBJECT "spei" SUBJECT "transferencia")'], None)]
+
+    deposito = SearchClass('deposito', [[('FROM', '@bb.com.mx'), ('SUBJECT', 'Instrucción de depósito')]])
+    searches = deposito.build_searches()
+    print(searches)
+    assert searches == [(['FROM', '"@bb.com.mx"', 'SUBJECT'], 'Instrucción de depósito'.encode('utf-8'))]
+
+    try:
+        SearchClass('invalido', [[('SUBJECT', 'depósito'), ('FROM', 'banco@méxico')]])
+        assert False, "Se esperaba ValueError"
+    except ValueError:
+        print("OK | Más de un valor no ASCII por alternativa es rechazado")
+
+def test_bucket_priority():
+    """Prueba que cada UID quede en el primer tipo que cumple y el resto sin clasificar"""
+
+    print("\nTEST DE AGRUPAMIENTO POR TIPO")
+    print("=" * 50)
+
+    plan = SearchPlan([
+        SearchClass('transferencia', [[('SUBJECT', 'spei')]]),
+        SearchClass('deposito', [[('SUBJECT', 'deposito')]]),
+        SearchClass('bancario', [[('FROM', '@bb.com.mx')]], header_only=True),
+    ])
+    client = FakeSearchClient({'transferencia': [b'5'], 'bancario': [b'5', b'3']})
+
+    buckets = plan.bucket(client, [b'5', b'4', b'3', b'1'])
+    result = [(search_class.name if search_class else None, uids) for search_class, uids in buckets]
+    print(result)
+    # 'deposito' falló en el servidor: sus correos se clasifican al descargarlos
+    assert result == [('transferencia', [b'5']), ('bancario', [b'3']), (None, [b'4', b'1'])]
+
+if __name__ == "__main__":
+    test_build_searches()
+    test_bucket_priority()
+    print("\nTODAS LAS PRUEBAS PASARON")
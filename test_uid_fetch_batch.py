@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Test para verificar la construcción de conjuntos de UIDs y el parseo de respuestas FETCH por lotes
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(__file__))
+
+from src.email_client import build_uid_set, parse_fetch_response
+
+def test_build_uid_set():
+    """Prueba que los UIDs consecutivos se colapsen en rangos"""
+
+    print("TEST DE CONJUNTOS DE UIDs")
+    print("=" * 50)
+
+    test_cases = [
+        ([b'1', b'2', b'3', b'7', b'9', b'10'], '1:3,7,9:10'),
+        ([b'15', b'12', b'13', b'14'], '12:15'),
+        ([b'5'], '5'),
+        ([b'8', b'8', b'4'], '4,8'),
+    ]
+
+    for uids, expected in test_cases:
+        result = build_uid_set(uids)
+        print(f"{'OK' if result == expected else 'ERROR'} | {uids} -> {result}")
+        assert result == expected
+
+def test_parse_fetch_response():
+    """Prueba el agrupamiento por mensaje de una respuesta UID FETCH multi-mensaje"""
+
+    print("\nTEST DE PARSEO DE RESPUESTA FETCH")
+    print("=" * 50)
+
+    msg_data = [
+        (b'1 (UID 101 BODY[] {5}', b'hola1'),
+        b')',
+        # Algunos servidores envían el UID después del literal
+        (b'2 (BODY[] {5}', b'hola2'),
+        b' UID 102)',
+        (b'3 (UID 103 BODY[HEADER] {7}', b'Subj: x'),
+        b')',
+        # Respuesta FETCH no solicitada (cambio de banderas) sin literal
+        b'4 (FLAGS (\\Seen))',
+    ]
+
+    result = parse_fetch_response(msg_data)
+    for uid, literals in result:
+        print(f"UID {uid}: {literals}")
+
+    assert result == [
+        (b'101', {b'BODY[]': b'hola1'}),
+        (b'102', {b'BODY[]': b'hola2'}),
+        (b'103', {b'BODY[HEADER]': b'Subj: x'}),
+    ]
+
+if __name__ == "__main__":
+    test_build_uid_set()
+    test_parse_fetch_response()
+    print("\nTODAS LAS PRUEBAS PASARON")
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Test para verificar que el parser lxml produzca el mismo resultado que XMLParser
+"""
+
+import sys
+import os
+import subprocess
+from datetime import datetime
+from decimal import Decimal
+sys.path.append(os.path.dirname(__file__))
+
+from src.factura_mapper import FacturaMapper
+from src.xml_parser import XMLParser, create_xml_parser
+from src.xml_parser_lxml import LxmlXMLParser
+
+CFDI = '''<?xml version="1.0" encoding="UTF-8"?>
+<cfdi:Comprobante xmlns:cfdi="http://www.sat.gob.mx/cfd/4" xmlns:tfd="http://www.sat.gob.mx/TimbreFiscalDigital" Version="4.0" Folio="1234" Fecha="2024-05-10T12:30:45" SubTotal="1,000.00" Moneda="MXN" Total="1160.00" NoCertificado="00001000000504465028">
+  <cfdi:Emisor Rfc="AAA010101AAA" Nombre="EMPRESA &amp; ASOCIADOS" RegimenFiscal="601"/>
+  <cfdi:Receptor Rfc="XAXX010101000" Nombre="PÚBLICO EN GENERAL"/>
+  <cfdi:Conceptos>
+    <cfdi:Concepto Cantidad="2" Descripcion="" ValorUnitario="250.00" Importe="500.00"/>
+    <cfdi:Concepto Cantidad="1" Descripcion="Servicio de mantenimiento" ValorUnitario="500.00" Importe="500.00"/>
+  </cfdi:Conceptos>
+  <cfdi:Impuestos TotalTraslados="160.00"/>
+  <cfdi:Complemento>
+    <tfd:TimbreFiscalDigital UUID="6F1E7D5A-1234-4ABC-9DEF-0123456789AB" FechaTimbrado="2024-05-10T12:31:00" SelloSAT="xyz=="/>
+  </cfdi:Complemento>
+</cfdi:Comprobante>'''
+
+def test_same_output():
+    """Prueba que ambos backends produzcan exactamente los mismos datos"""
+
+    print("TEST DE PARSER LXML")
+    print("=" * 50)
+
+    samples = {
+        'completo': CFDI.encode('utf-8'),
+        'con BOM': b'\xef\xbb\xbf' + CFDI.encode('utf-8'),
+        'sin timbre': CFDI.split('<cfdi:Complemento>')[0].encode('utf-8') + b'</cfdi:Comprobante>',
+        'malformado': CFDI.encode('utf-8')[:300],
+        'no UTF-8': CFDI.encode('latin-1'),
+        'timbre en un concepto': CFDI.replace('<cfdi:Conceptos>', '<cfdi:Conceptos><cfdi:Concepto Descripcion="Otro">'
+                                              '<cfdi:ComplementoConcepto><tfd:TimbreFiscalDigital UUID="OTRO-UUID"/>'
+                                              '</cfdi:ComplementoConcepto></cfdi:Concepto>').encode('utf-8'),
+    }
+
+    etree_parser = XMLParser()
+    lxml_parser = LxmlXMLParser()
+    for name, xml_content in samples.items():
+        expected = etree_parser.parse_xml(xml_content)
+        result = lxml_parser.parse_xml(xml_content)
+        print(f"{'OK' if result == expected else 'ERROR'} | {name}")
+        assert result == expected
+
+    data = lxml_parser.parse_xml(samples['completo'])
+    assert data.uuid == '6F1E7D5A-1234-4ABC-9DEF-0123456789AB'
+    assert data.concepto == 'Servicio de mantenimiento'
+    assert data.subtotal == 1000.0
+    # Vale el timbre de cfdi:Complemento aunque antes aparezca otro
+    assert lxml_parser.parse_xml(samples['timbre en un concepto']).uuid == data.uuid
+
+def test_declared_encoding():
+    """Prueba que todos los backends respeten el BOM y la codificación declarada"""
+
+    samples = {
+        'ISO-8859-1': CFDI.replace('UTF-8', 'ISO-8859-1').encode('latin-1'),
+        'UTF-16': CFDI.replace('UTF-8', 'UTF-16').encode('utf-16'),
+        'UTF-8 con BOM': b'\xef\xbb\xbf' + CFDI.encode('utf-8'),
+    }
+    for backend in ('etree', 'lxml', 'stream'):
+        xml_parser = create_xml_parser(backend)
+        for name, xml_content in samples.items():
+            data = xml_parser.parse_xml(xml_content)
+            assert data is not None
+            assert data.nombre_receptor == 'PÚBLICO EN GENERAL'
+            assert data.nombre_emisor == 'EMPRESA & ASOCIADOS'
+    print("OK | Codificación declarada respetada")
+
+def test_cfdi_33():
+    """Prueba que un CFDI 3.3 se lea con las rutas de su versión en todos los backends"""
+
+    cfdi_33 = CFDI.replace('http://www.sat.gob.mx/cfd/4', 'http://www.sat.gob.mx/cfd/3').replace('Version="4.0"', 'Version="3.3"')
+    for backend in ('etree', 'lxml', 'stream'):
+        xml_parser = create_xml_parser(backend)
+        expected = xml_parser.parse_xml(CFDI.encode('utf-8'))
+        assert xml_parser.parse_xml(cfdi_33.encode('utf-8')) == expected
+        assert expected.rfc_emisor == 'AAA010101AAA'
+    print("OK | CFDI 3.3")
+
+def test_parse_values():
+    """Prueba el camino rápido de fechas, los importes exactos y los valores mal formados"""
+
+    xml_parser = XMLParser()
+    assert xml_parser._parse_date('2024-05-10T12:30:45.25') == datetime(2024, 5, 10, 12, 30, 45, 250000)
+    assert xml_parser._parse_date('2024-05-10') == datetime(2024, 5, 10)
+    for value in ('', '2024-02-30', '2024-05-10T12:30:45Z', '10/05/2024', '2024-05-10 12:30:45'):
+        assert xml_parser._parse_date(value) is None
+
+    assert xml_parser._parse_amount('0.10') + xml_parser._parse_amount('0.20') == Decimal('0.30')
+    assert xml_parser._parse_amount('1,160.00') == Decimal('1160.00')
+    assert xml_parser._parse_amount('N/A') == 0 and xml_parser._parse_amount('') == 0
+
+    factura = FacturaMapper().map_to_catfacturas(xml_parser.parse_xml(CFDI.encode('utf-8')))
+    assert type(factura['totalCFDI']) is float
+    print("OK | Fechas e importes")
+
+def test_external_entities_not_resolved():
+    """Prueba que no se lean entidades externas (XXE)"""
+
+    xml_content = (b'<?xml version="1.0"?><!DOCTYPE c [<!ENTITY x SYSTEM "file:///etc/hostname">]>'
+                   b'<cfdi:Comprobante xmlns:cfdi="http://www.sat.gob.mx/cfd/4">'
+                   b'<cfdi:Emisor Nombre="&x;" Rfc="X"/></cfdi:Comprobante>')
+    assert LxmlXMLParser().parse_xml(xml_content) is None
+    print("OK | Entidades externas rechazadas")
+
+def test_without_lxml():
+    """Prueba que sin lxml create_xml_parser use xml.etree"""
+
+    code = ("import sys; sys.modules['lxml'] = None\n"
+            "from src.xml_parser import XMLParser, create_xml_parser\n"
+            "for backend in ('lxml', 'stream'):\n"
+            "    xml_parser = create_xml_parser(backend)\n"
+            "    assert type(xml_parser) is XMLParser\n"
+            "    assert xml_parser.parse_xml(sys.argv[1].encode('utf-8')).uuid\n")
+    result = subprocess.run([sys.executable, '-c', code, CFDI], cwd=os.path.dirname(os.path.abspath(__file__)),
+                            capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    print("OK | Sin lxml se usa xml.etree")
+
+def test_factory():
+    """Prueba la selección de backend"""
+
+    assert type(create_xml_parser('lxml')) is LxmlXMLParser
+    assert type(create_xml_parser('etree')) is XMLParser
+    print("OK | create_xml_parser")
+
+if __name__ == "__main__":
+    test_same_output()
+    test_declared_encoding()
+    test_cfdi_33()
+    test_parse_values()
+    test_external_entities_not_resolved()
+    test_without_lxml()
+    test_factory()
+    print("\nTODAS LAS PRUEBAS PASARON")
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Test para verificar el parser CFDI en una sola pasada (iterparse)
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(__file__))
+
+from src.xml_parser import XMLParser, create_xml_parser
+from src.xml_parser_stream import StreamingXMLParser
+from test_xml_parser_lxml import CFDI
+
+TIMBRE_CONCEPTO = '<cfdi:ComplementoConcepto><tfd:TimbreFiscalDigital UUID="OTRO-UUID"/></cfdi:ComplementoConcepto>'
+CONCEPTO = '<cfdi:Concepto Cantidad="1" Descripcion="Pieza" ValorUnitario="1.00" Importe="1.00"/>'
+
+def test_same_output():
+    """Prueba que el recorrido en una pasada produzca los mismos datos que XMLParser"""
+
+    print("TEST DE PARSER EN UNA SOLA PASADA")
+    print("=" * 50)
+
+    samples = {
+        'completo': CFDI.encode('utf-8'),
+        'con BOM': b'\xef\xbb\xbf' + CFDI.encode('utf-8'),
+        'sin timbre': CFDI.split('<cfdi:Complemento>')[0].encode('utf-8') + b'</cfdi:Comprobante>',
+        'malformado': CFDI.encode('utf-8')[:300],
+        'no UTF-8': CFDI.encode('latin-1'),
+        'timbre fuera de cfdi:Complemento': CFDI.replace('cfdi:Complemento>', 'cfdi:Complementos>').encode('utf-8'),
+        'timbre en un concepto': CFDI.replace('<cfdi:Conceptos>', '<cfdi:Conceptos><cfdi:Concepto Descripcion="Otro">' + TIMBRE_CONCEPTO + '</cfdi:Concepto>').encode('utf-8'),
+        'muchos conceptos': CFDI.replace('<cfdi:Conceptos>', '<cfdi:Conceptos>' + CONCEPTO * 5000).encode('utf-8'),
+    }
+
+    etree_parser = XMLParser()
+    stream_parser = StreamingXMLParser()
+    for name, xml_content in samples.items():
+        expected = etree_parser.parse_xml(xml_content)
+        result = stream_parser.parse_xml(xml_content)
+        print(f"{'OK' if result == expected else 'ERROR'} | {name}")
+        assert result == expected
+
+    # Vale el timbre de cfdi:Complemento aunque antes aparezca otro
+    assert stream_parser.parse_xml(samples['timbre en un concepto']).uuid == '6F1E7D5A-1234-4ABC-9DEF-0123456789AB'
+
+    data = stream_parser.parse_xml(samples['muchos conceptos'])
+    assert len(data.conceptos) == 5002
+    assert data.concepto == 'Pieza'
+
+def test_stops_at_addenda():
+    """Prueba que el recorrido termine al llegar a la addenda si ya se encontró el timbre"""
+
+    addenda = '<cfdi:Addenda><proveedor><sin cerrar></cfdi:Addenda>'
+    xml_content = CFDI.replace('</cfdi:Comprobante>', addenda + '</cfdi:Comprobante>').encode('utf-8')
+
+    # XMLParser rechaza el documento completo; el recorrido ya terminó antes del error
+    assert XMLParser().parse_xml(xml_content) is None
+    data = StreamingXMLParser().parse_xml(xml_content)
+    assert data.uuid == '6F1E7D5A-1234-4ABC-9DEF-0123456789AB'
+    assert data.total_traslados == 160.0
+    print("OK | Addenda no recorrida")
+
+def test_stops_after_complemento():
+    """Prueba que el recorrido termine al cerrar cfdi:Complemento si ya tiene todas las secciones"""
+
+    xml_content = CFDI.replace('</cfdi:Comprobante>', '<otro><sin cerrar></otro></cfdi:Comprobante>').encode('utf-8')
+
+    # El resto del documento no se lee: el error de sintaxis posterior no se alcanza
+    assert XMLParser().parse_xml(xml_content) is None
+    data = StreamingXMLParser().parse_xml(xml_content)
+    assert data == XMLParser().parse_xml(CFDI.encode('utf-8'))
+    print("OK | Recorrido terminado al cerrar cfdi:Complemento")
+
+def test_factory():
+    """Prueba la selección del backend 'stream'"""
+
+    assert type(create_xml_parser('stream')) is StreamingXMLParser
+    print("OK | create_xml_parser('stream')")
+
+if __name__ == "__main__":
+    test_same_output()
+    test_stops_at_addenda()
+    test_stops_after_complemento()
+    test_factory()
+    print("\nTODAS LAS PRUEBAS PASARON")